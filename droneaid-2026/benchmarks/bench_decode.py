@@ -0,0 +1,103 @@
+"""
+DroneAid 2026 - Decode Benchmark
+Compares full-resolution and reduced (DCT-scaled) JPEG decoding
+
+For each frame size, both variants run in a fresh subprocess so peak RSS is
+not polluted by the other; peak RSS growth is read from VmHWM after resetting
+it through /proc/self/clear_refs, so this benchmark needs Linux.
+  
+  full     cv2.imdecode at full resolution (previous behaviour)
+  reduced  decode_for_model at the model input size
+
+Usage:
+    python benchmarks/bench_decode.py --megapixels 2 12 20 --target-size 640
+"""
+
+import argparse
+import gc
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'inference'))
+
+from imaging import decode_for_model, decode_image  # noqa: E402
+from bench_payload_memory import _reset_peak_rss, _status_kb  # noqa: E402
+
+def make_jpeg(megapixels: float) -> bytes:
+    """Encode a smooth 4:3 test frame with some texture, similar to aerial imagery"""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(0)
+    coarse = rng.integers(0, 256, (height // 32 + 1, width // 32 + 1, 3), dtype=np.uint8)
+    image = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_LINEAR)
+    image = cv2.add(image, rng.integers(0, 24, image.shape, dtype=np.uint8))
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+def run_variant(variant: str, megapixels: float, target_size: int, repeats: int):
+    """Measure one variant in the current process and print a JSON result"""
+    jpeg = make_jpeg(megapixels)
+    if variant == 'full':
+        decode = decode_image
+    else:
+        def decode(data):
+            return decode_for_model(data, target_size)[0]
+    
+    # Warm up codec state on a tiny frame
+    decode(make_jpeg(0.01))
+    gc.collect()
+    baseline_rss = _status_kb('VmRSS')
+    _reset_peak_rss()
+    
+    image = decode(jpeg)
+    peak_rss = _status_kb('VmHWM')
+    shape = image.shape
+    del image
+    
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        decode(jpeg)
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    print(json.dumps({
+        "variant": variant,
+        "megapixels": megapixels,
+        "jpeg_mb": round(len(jpeg) / 1e6, 2),
+        "decoded": f"{shape[1]}x{shape[0]}",
+        "decode_ms": round(statistics.median(timings), 2),
+        "rss_growth_mb": round((peak_rss - baseline_rss) / 1024, 2),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--megapixels', type=float, nargs='+', default=[2, 12, 20])
+    parser.add_argument('--target-size', type=int, default=640)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--variant', choices=['full', 'reduced'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.variant:
+        run_variant(args.variant, args.megapixels[0], args.target_size, args.repeats)
+        return
+    
+    print(f"{'MP':>5} {'JPEG MB':>8} {'variant':>8} {'decoded':>10} {'ms':>8} {'RSS +MB':>8}")
+    for megapixels in args.megapixels:
+        for variant in ('full', 'reduced'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--variant', variant, '--megapixels', str(megapixels),
+                 '--target-size', str(args.target_size), '--repeats', str(args.repeats)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{megapixels:>5} {result['jpeg_mb']:>8} {variant:>8} {result['decoded']:>10} "
+                  f"{result['decode_ms']:>8} {result['rss_growth_mb']:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+DroneAid 2026 - Geo Store Benchmark
+Times ingesting geo-referenced detections and querying them back
+
+Ingest: the same frames of detections are added to a new DetectionStore at
+each batch size; batch size 1 commits every frame on its own, as storing
+each result in its request would. Queries then run against a store of
+--detections detections:
+  
+  bbox       detections overlapping a 1 km square (R-tree)
+  bbox+time  a 10 km square within a one-day window
+  radius     detections within 500 m of a point (R-tree, then haversine)
+  time       one hour anywhere (timestamp index)
+  grid       64x64 heat map cells over a 10 km square
+
+Usage:
+    python benchmarks/bench_geostore.py --detections 1000000 --ingest-detections 100000 --batch-sizes 1 500 5000
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'inference'))
+
+from geostore import DetectionStore, GeoBounds  # noqa: E402
+
+CLASS_NAMES = ["sos", "shelter", "water", "food", "firstaid", "children", "elderly", "pets"]
+
+# Puerto Rico, as in assets/samples/manifest.csv
+CENTER = (18.22, -66.45)
+
+# Frames are spread over 30 days
+TIME_SPAN_S = 30 * 86400
+START_TIME = 1_767_225_600.0  # 2026-01-01
+
+def make_frames(frames: int, per_frame: int, area_km: float, seed: int = 0):
+    """
+    (result, bounds, ts) tuples: 1 km frames at random places in an area_km square, per_frame boxes each
+    
+    Results are columnar with NumPy arrays, so generating them costs little
+    next to storing them.
+    """
+    rng = np.random.default_rng(seed)
+    area = GeoBounds.around(*CENTER, area_km * 1000, area_km * 1000)
+    for i in range(frames):
+        lat = rng.uniform(area.min_lat, area.max_lat)
+        lon = rng.uniform(area.min_lon, area.max_lon)
+        boxes = np.hstack([rng.uniform(0, 1200, (per_frame, 2)), rng.uniform(20, 80, (per_frame, 2))])
+        result = {
+            "boxes": boxes,
+            "scores": rng.uniform(0.25, 1, per_frame),
+            "class_ids": rng.integers(0, len(CLASS_NAMES), per_frame),
+            "class_names": CLASS_NAMES,
+            "image_width": 1280,
+            "image_height": 1280,
+        }
+        yield result, GeoBounds.around(lat, lon, 1000, 1000), START_TIME + TIME_SPAN_S * i / frames
+
+def ingest(path: Path, frames, batch_size: int) -> float:
+    """Detections per second from the first add to the last commit"""
+    store = DetectionStore(str(path), batch_size=batch_size)
+    count = 0
+    start = time.perf_counter()
+    for result, bounds, ts in frames:
+        count += store.add(result, bounds, ts)
+    store.flush()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return count / elapsed
+
+def measure(fn, repeats: int):
+    """(median milliseconds per call, size of the last result)"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    size = result["total"] if isinstance(result, dict) else len(result)
+    return statistics.median(timings), size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--detections', type=int, default=1_000_000)
+    parser.add_argument('--per-frame', type=int, default=10)
+    parser.add_argument('--area-km', type=float, default=100.0)
+    parser.add_argument('--ingest-detections', type=int, default=100_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 500, 5000])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'batch':>6} {'det/s':>10} {'speedup':>8}")
+        baseline = None
+        for batch_size in args.batch_sizes:
+            frames = make_frames(args.ingest_detections // args.per_frame, args.per_frame, args.area_km)
+            rate = ingest(Path(tmp) / f'batch{batch_size}.db', frames, batch_size)
+            baseline = baseline or rate
+            print(f"{batch_size:>6} {rate:>10.0f} {rate / baseline:>7.1f}x")
+        
+        path = Path(tmp) / 'store.db'
+        rate = ingest(path, make_frames(args.detections // args.per_frame, args.per_frame, args.area_km), 5000)
+        print(f"\nStore of {args.detections} detections built at {rate:.0f} det/s")
+        store = DetectionStore(str(path))
+        square = GeoBounds.around(*CENTER, 1000, 1000)
+        wide = GeoBounds.around(*CENTER, 10_000, 10_000)
+        day = (START_TIME + 10 * 86400, START_TIME + 11 * 86400)
+        queries = {
+            "bbox": lambda: store.query(square, limit=100_000),
+            "bbox+time": lambda: store.query(wide, start=day[0], end=day[1], limit=100_000),
+            "radius": lambda: store.query_radius(*CENTER, 500, limit=100_000),
+            "time": lambda: store.query(start=day[0], end=day[0] + 3600, limit=100_000),
+            "grid": lambda: store.grid(wide, cells=64),
+        }
+        print(f"\n{'query':>10} {'ms':>9} {'rows':>7}")
+        for name, query in queries.items():
+            query()  # Warm up
+            elapsed, size = measure(query, args.repeats)
+            print(f"{name:>10} {elapsed:>9.2f} {size:>7}")
+        store.close()
+
+if __name__ == '__main__':
+    main()
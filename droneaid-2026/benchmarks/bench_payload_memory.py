@@ -0,0 +1,156 @@
+"""
+DroneAid 2026 - Payload Memory Benchmark
+Compares peak memory per request for the base64 and raw upload paths
+
+Each variant runs in a fresh subprocess so peak RSS is not polluted by the
+others; peak RSS growth is read from VmHWM after resetting it through
+/proc/self/clear_refs, so this benchmark needs Linux. Reported numbers cover the request payload handling up to and
+including the OpenCV decode (no model inference):
+  
+  query   legacy /detect/base64: base64 in the query string, URL-decoded,
+          split on ',' and decoded with base64.b64decode
+  json    /detect/base64 with a JSON body: streamed into one buffer, base64
+          decoded from a view in aligned slices
+  raw     /detect/raw: body streamed into a buffer preallocated from
+          Content-Length and decoded in place
+
+Usage:
+    python benchmarks/bench_payload_memory.py --megapixels 2 12 20
+"""
+
+import argparse
+import asyncio
+import base64
+import gc
+import json
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+from urllib.parse import parse_qsl, quote
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'inference'))
+
+from payloads import decode_base64, read_body, split_base64_json  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024
+
+class _FakeRequest:
+    """Minimal stand-in for a Starlette request streaming a body in chunks"""
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {"content-length": str(len(body))}
+    
+    async def stream(self):
+        for start in range(0, len(self.body), CHUNK_SIZE):
+            yield self.body[start:start + CHUNK_SIZE]
+
+def make_jpeg(megapixels: float) -> bytes:
+    """Encode a noisy 4:3 test frame of roughly the given size"""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+def prepare_query(jpeg: bytes) -> str:
+    """Query string as received by the legacy /detect/base64 handler"""
+    return "image_data=" + quote("data:image/jpeg;base64," + base64.b64encode(jpeg).decode())
+
+def handle_query(query: str):
+    """Legacy path: base64 carried in the URL query string"""
+    image_data = dict(parse_qsl(query))["image_data"]
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    image_bytes = base64.b64decode(image_data)
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def prepare_json(jpeg: bytes) -> bytes:
+    """JSON request body for /detect/base64"""
+    return json.dumps({"image_data": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode(),
+                       "conf_threshold": 0.5}).encode()
+
+def handle_json(body: bytes):
+    """JSON body path: streamed body, base64 decoded from a view"""
+    buffer = asyncio.run(read_body(_FakeRequest(body)))
+    encoded, _ = split_base64_json(buffer)
+    return cv2.imdecode(np.frombuffer(decode_base64(encoded), np.uint8), cv2.IMREAD_COLOR)
+
+def handle_raw(body: bytes):
+    """Raw body path: streamed into a preallocated buffer and decoded in place"""
+    buffer = asyncio.run(read_body(_FakeRequest(body)))
+    return cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+
+# variant -> (build the payload as the server receives it, handle it)
+VARIANTS = {
+    "query": (prepare_query, handle_query),
+    "json": (prepare_json, handle_json),
+    "raw": (bytes, handle_raw),
+}
+
+def _status_kb(field: str) -> int:
+    """Read a memory field (e.g. VmRSS, VmHWM) from /proc/self/status in KiB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+def _reset_peak_rss():
+    """Reset the kernel's RSS high-water mark so VmHWM covers only what follows"""
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+def run_variant(variant: str, megapixels: float):
+    """Measure one variant in the current process and print a JSON result"""
+    prepare, handle = VARIANTS[variant]
+    jpeg = make_jpeg(megapixels)
+    payload = prepare(jpeg)
+    # Warm up imports and allocator arenas on a tiny payload first
+    handle(prepare(make_jpeg(0.01)))
+    gc.collect()
+    baseline_rss = _status_kb('VmRSS')
+    _reset_peak_rss()
+    
+    tracemalloc.start()
+    handle(payload)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    peak_rss = _status_kb('VmHWM')
+    print(json.dumps({
+        "variant": variant,
+        "megapixels": megapixels,
+        "jpeg_mb": round(len(jpeg) / 1e6, 2),
+        "python_peak_mb": round(traced_peak / 1e6, 2),
+        "rss_growth_mb": round((peak_rss - baseline_rss) / 1024, 2),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--megapixels', type=float, nargs='+', default=[2, 12, 20])
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.variant:
+        run_variant(args.variant, args.megapixels[0])
+        return
+    
+    print(f"{'MP':>5} {'JPEG MB':>8} {'variant':>8} {'py peak MB':>11} {'RSS +MB':>8}")
+    for megapixels in args.megapixels:
+        for variant in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, __file__, '--variant', variant, '--megapixels', str(megapixels)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{megapixels:>5} {result['jpeg_mb']:>8} {variant:>8} "
+                  f"{result['python_peak_mb']:>11} {result['rss_growth_mb']:>8}")
+
+if __name__ == '__main__':
+    main()
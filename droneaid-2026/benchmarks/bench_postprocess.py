@@ -0,0 +1,119 @@
+"""
+DroneAid 2026 - Post-processing Microbenchmark
+Times turning model output arrays into a JSON response body
+
+Variants, for N boxes per image:
+  
+  loop       previous per-box Python loop building detection dicts, then
+             Pydantic validation against the response model and JSON rendering
+  objects    vectorized DroneAidDetector._format_result building detection
+             dicts, then JSON rendering (no re-validation)
+  columnar   vectorized parallel arrays (format=columnar), then JSON rendering
+
+Usage:
+    python benchmarks/bench_postprocess.py --boxes 1 50 500
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'inference'))
+
+from model import DroneAidDetector  # noqa: E402
+
+# Same fields as the response models in inference/main.py
+class Detection(BaseModel):
+    class_name: str
+    confidence: float
+    bbox: List[float]
+
+class DetectionResponse(BaseModel):
+    detections: List[Detection]
+    image_width: int
+    image_height: int
+    processing_time_ms: float
+
+def make_predictions(count: int, seed: int = 0):
+    """Random (xyxy, confidence, class_id) arrays as returned by the backends"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 600, (count, 2)).astype(np.float32)
+    wh = rng.uniform(10, 100, (count, 2)).astype(np.float32)
+    xyxy = np.concatenate([xy, xy + wh], axis=1)
+    confidence = rng.uniform(0.25, 1.0, count).astype(np.float32)
+    class_ids = rng.integers(0, 8, count)
+    return xyxy, confidence, class_ids
+
+def format_loop(detector: DroneAidDetector, xyxy, confidence, class_ids):
+    """The original per-box post-processing loop"""
+    detections = []
+    for box, conf, cls in zip(xyxy, confidence, class_ids):
+        x1, y1, x2, y2 = box
+        detections.append({
+            "class_name": detector.class_names[int(cls)],
+            "confidence": float(conf),
+            "bbox": [float(x1), float(y1), float(x2 - x1), float(y2 - y1)],
+        })
+    return {"detections": detections}
+
+def run_loop(detector, prediction):
+    result = {**format_loop(detector, *prediction), "image_width": 640, "image_height": 640,
+              "processing_time_ms": 1.0}
+    validated = DetectionResponse.model_validate(result)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+def run_objects(detector, prediction):
+    result = {**detector._format_result(*prediction), "image_width": 640, "image_height": 640,
+              "processing_time_ms": 1.0}
+    return JSONResponse(result).body
+
+def run_columnar(detector, prediction):
+    result = {**detector._format_result(*prediction, columnar=True), "image_width": 640, "image_height": 640,
+              "processing_time_ms": 1.0}
+    return JSONResponse(result).body
+
+VARIANTS = {
+    "loop": run_loop,
+    "objects": run_objects,
+    "columnar": run_columnar,
+}
+
+def measure(fn, repeats: int) -> float:
+    """Median microseconds per call"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boxes', type=int, nargs='+', default=[1, 50, 500])
+    parser.add_argument('--repeats', type=int, default=2000)
+    args = parser.parse_args()
+    
+    # No model is needed: only the class names are used
+    detector = DroneAidDetector(model_path='none.pt')
+    
+    print(f"{'boxes':>6} {'variant':>9} {'us/image':>10} {'speedup':>8} {'bytes':>8}")
+    for count in args.boxes:
+        prediction = make_predictions(count)
+        baseline = None
+        for name, run in VARIANTS.items():
+            run(detector, prediction)  # Warm up
+            elapsed = measure(lambda: run(detector, prediction), args.repeats)
+            baseline = baseline or elapsed
+            size = len(run(detector, prediction))
+            print(f"{count:>6} {name:>9} {elapsed:>10.1f} {baseline / elapsed:>7.1f}x {size:>8}")
+
+if __name__ == '__main__':
+    main()
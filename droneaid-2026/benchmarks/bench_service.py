@@ -0,0 +1,389 @@
+"""
+DroneAid 2026 - Service Benchmark
+End-to-end latency, throughput and memory of the inference service, saved as JSON
+
+Three levels, each run over the same corpus at every resolution:
+  
+  detector  DroneAidDetector.detect on decoded images, in-process (model,
+            pre- and post-processing only)
+  asgi      POST /detect through httpx's in-process ASGI transport, one
+            request at a time (adds decoding, the worker pool, validation
+            and JSON rendering, but no network)
+  load      --concurrency clients posting to /detect of a server started
+            with serve.py (or --url) over HTTP for --duration seconds
+
+The corpus is rendered with training/prepare_data.py's scene generator from
+a fixed seed, scaled to each resolution and JPEG-encoded, so two runs with
+the same arguments send identical bytes; its hash is stored with the
+results. detector and asgi run in fresh subprocesses, so their peak RSS
+(VmHWM, reset through /proc/self/clear_refs after warm-up) is not polluted
+by each other; for load it is summed over the server's worker processes.
+This benchmark needs Linux.
+
+Usage:
+    python benchmarks/bench_service.py --model inference/models/best.onnx -o before.json
+    python benchmarks/bench_service.py --model inference/models/best.onnx -o after.json
+    python benchmarks/bench_service.py --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+INFERENCE_DIR = ROOT / 'inference'
+sys.path.insert(0, str(ROOT / 'training'))
+
+from bench_payload_memory import _reset_peak_rss, _status_kb  # noqa: E402
+from bench_workers import free_port  # noqa: E402
+
+LEVELS = ('detector', 'asgi', 'load')
+
+# Metrics compared by --compare, and whether a higher value is better
+COMPARED = {
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'img_per_s': True,
+    'peak_rss_mb': False,
+}
+
+def parse_resolution(value: str):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def make_corpus(directory: Path, resolutions, images: int, seed: int) -> str:
+    """
+    Write the corpus as <directory>/<WxH>/<index>.jpg; returns a hash of all files
+    
+    Each image is a multi-symbol scene from prepare_data.py, rendered once
+    and scaled to every resolution, so the resolutions differ only in size.
+    """
+    from prepare_data import CLASSES, image_seed, render_scene, scene_symbols
+    from synthesis import Synthesizer
+    
+    icons = [(i, str(ROOT / 'assets' / 'icons' / f'icon-{name}.png')) for i, name in enumerate(CLASSES)]
+    synthesizer = Synthesizer()
+    digest = hashlib.sha256()
+    scenes = [render_scene(synthesizer, icons, image_seed(seed, 0, i), scene_symbols())[0].copy()
+              for i in range(images)]
+    for width, height in resolutions:
+        folder = directory / f'{width}x{height}'
+        folder.mkdir(parents=True)
+        for i, scene in enumerate(scenes):
+            image = cv2.resize(scene, (width, height), interpolation=cv2.INTER_LINEAR)
+            data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+            (folder / f'{i:04d}.jpg').write_bytes(data)
+            digest.update(data)
+    return digest.hexdigest()
+
+def summarize(latencies, elapsed_s: float, errors: int = 0) -> dict:
+    """Latency percentiles in ms and throughput from per-request latencies"""
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if not len(latencies):
+        return {"requests": 0, "errors": errors}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": int(len(latencies)),
+        "errors": errors,
+        "mean_ms": round(float(latencies.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "img_per_s": round(len(latencies) / elapsed_s, 2),
+    }
+
+def run_detector(corpus: Path, model: str, repeats: int, conf: float) -> dict:
+    """detector level (runs in its own subprocess)"""
+    sys.path.insert(0, str(INFERENCE_DIR))
+    from imaging import decode_image
+    from model import DroneAidDetector
+    
+    detector = DroneAidDetector(model)
+    images = [decode_image(path.read_bytes()) for path in sorted(corpus.glob('*.jpg'))]
+    for image in images[:2]:
+        detector.detect(image, conf)
+    
+    _reset_peak_rss()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for image in images:
+            request_start = time.perf_counter()
+            detector.detect(image, conf)
+            latencies.append((time.perf_counter() - request_start) * 1000)
+    elapsed = time.perf_counter() - start
+    return {**summarize(latencies, elapsed), "peak_rss_mb": round(_status_kb('VmHWM') / 1024, 1),
+            "model_id": detector.model_id, "backend": detector.backend}
+
+async def _asgi(corpus: Path, repeats: int, conf: float) -> dict:
+    import main
+    
+    bodies = [path.read_bytes() for path in sorted(corpus.glob('*.jpg'))]
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app), httpx.AsyncClient(transport=transport, base_url='http://bench') as http:
+        while (await http.get('/ready')).status_code != 200:
+            if main.startup.error:
+                raise RuntimeError(f"Model failed to load: {main.startup.error}")
+            await asyncio.sleep(0.05)
+        
+        async def post(body):
+            return await http.post('/detect', params={'conf_threshold': conf},
+                                   files={'file': ('frame.jpg', body, 'image/jpeg')})
+        
+        for body in bodies[:2]:
+            await post(body)
+        
+        _reset_peak_rss()
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for body in bodies:
+                request_start = time.perf_counter()
+                response = await post(body)
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - request_start) * 1000)
+                else:
+                    errors += 1
+        elapsed = time.perf_counter() - start
+        return {**summarize(latencies, elapsed, errors), "peak_rss_mb": round(_status_kb('VmHWM') / 1024, 1)}
+
+def run_asgi(corpus: Path, model: str, repeats: int, conf: float) -> dict:
+    """asgi level (runs in its own subprocess)"""
+    os.environ['MODEL_PATH'] = model
+    sys.path.insert(0, str(INFERENCE_DIR))
+    return asyncio.run(_asgi(corpus, repeats, conf))
+
+def run_isolated(level: str, corpus: Path, args) -> dict:
+    """Run the detector or asgi level for one resolution in a fresh interpreter"""
+    command = [sys.executable, __file__, '--run-level', level, '--corpus', str(corpus), '--model', args.model,
+               '--repeats', str(args.repeats), '--conf', str(args.conf)]
+    env = {**os.environ, 'CACHE_MAX_ENTRIES': '0'}
+    output = subprocess.run(command, env=env, cwd=INFERENCE_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def server_peak_rss_mb(server_pid: int, reset: bool = False):
+    """Sum of VmHWM over the server's worker processes, optionally resetting it first"""
+    total_kb = 0
+    for pid in Path(f'/proc/{server_pid}/task/{server_pid}/children').read_text().split():
+        if reset:
+            try:
+                Path(f'/proc/{pid}/clear_refs').write_text('5')
+            except OSError:
+                return None
+            continue
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                total_kb += int(line.split()[1])
+    return None if reset else round(total_kb / 1024, 1)
+
+async def drive(url: str, bodies, conf: float, concurrency: int, duration_s: float):
+    """Post the corpus round-robin from `concurrency` clients; returns (latencies in ms, errors, elapsed s)"""
+    latencies, errors = [], 0
+    next_body = 0
+    deadline = time.perf_counter() + duration_s
+    
+    async def client(http: httpx.AsyncClient):
+        nonlocal next_body, errors
+        while time.perf_counter() < deadline:
+            body = bodies[next_body % len(bodies)]
+            next_body += 1
+            start = time.perf_counter()
+            response = await http.post(url, params={'conf_threshold': conf},
+                                       files={'file': ('frame.jpg', body, 'image/jpeg')})
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+    
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=120) as http:
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+def start_server(args):
+    """Start serve.py on a free port; returns (process, base URL)"""
+    port = free_port()
+    env = {**os.environ, 'CACHE_MAX_ENTRIES': '0'}
+    command = [sys.executable, str(INFERENCE_DIR / 'serve.py'), '--host', '127.0.0.1', '--port', str(port),
+               '--workers', str(args.server_workers), '--model', args.model, '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=INFERENCE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    for _ in range(600):
+        if server.poll() is not None:
+            raise RuntimeError(f"serve.py exited with status {server.returncode}")
+        try:
+            if httpx.get(f'{base}/ready', timeout=1).status_code == 200:
+                return server, base
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("serve.py did not become ready within 60 s")
+
+def run_load(corpus: Path, base: str, server, args) -> dict:
+    """load level for one resolution against a running server"""
+    bodies = [path.read_bytes() for path in sorted(corpus.glob('*.jpg'))]
+    url = f'{base}/detect'
+    asyncio.run(drive(url, bodies, args.conf, args.concurrency, 2.0))  # Warm up every worker
+    if server is not None:
+        server_peak_rss_mb(server.pid, reset=True)
+    latencies, errors, elapsed = asyncio.run(drive(url, bodies, args.conf, args.concurrency, args.duration))
+    return {**summarize(latencies, elapsed, errors),
+            "peak_rss_mb": server_peak_rss_mb(server.pid) if server is not None else None}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline_path: Path, current_path: Path, threshold: float) -> int:
+    """
+    Print the change of every compared metric between two runs
+    
+    Returns:
+        Number of metrics that got worse by more than threshold (a fraction)
+    """
+    baseline, current = (json.loads(Path(path).read_text()) for path in (baseline_path, current_path))
+    for key in ('corpus_sha256', 'model_id', 'cpus'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print(f"Note: {key} differs ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+    
+    previous = {(r['level'], r['resolution']): r for r in baseline['results']}
+    regressions = 0
+    print(f"{'level':>8} {'resolution':>10} {'metric':>11} {'before':>10} {'after':>10} {'change':>8}")
+    for result in current['results']:
+        before = previous.get((result['level'], result['resolution']))
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ''
+            if worse > threshold:
+                flag = 'REGRESSION'
+                regressions += 1
+            elif worse < -threshold:
+                flag = 'improved'
+            print(f"{result['level']:>8} {result['resolution']:>10} {metric:>11} {old:>10.2f} {new:>10.2f} "
+                  f"{change:>+8.1%} {flag}")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', help='Model to benchmark (.pt or .onnx)')
+    parser.add_argument('--synthetic', action='store_true',
+                        help="Benchmark bench_workers.py's generated YOLOv8-shaped model (needs onnx)")
+    parser.add_argument('--levels', nargs='+', choices=LEVELS, default=list(LEVELS))
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+',
+                        default=[(1280, 720), (1920, 1080), (4000, 3000)], help='Frame sizes as WxH')
+    parser.add_argument('--images', type=int, default=16, help='Corpus images per resolution')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus seed')
+    parser.add_argument('--repeats', type=int, default=3, help='Passes over the corpus for detector and asgi')
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients for load')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per resolution for load')
+    parser.add_argument('--server-workers', type=int, default=1, help='serve.py workers for load')
+    parser.add_argument('--url', help='Run load against this server instead of starting serve.py')
+    parser.add_argument('-o', '--output', type=Path, help='Write the results to this JSON file')
+    parser.add_argument('--compare', type=Path, nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative change that counts as a regression (default: 0.10)')
+    parser.add_argument('--run-level', choices=LEVELS[:2], help=argparse.SUPPRESS)
+    parser.add_argument('--corpus', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    
+    if args.run_level:
+        run = run_detector if args.run_level == 'detector' else run_asgi
+        print(json.dumps(run(args.corpus, args.model, args.repeats, args.conf)))
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            from bench_workers import make_synthetic_model
+            args.model = str(Path(tmp) / 'synthetic.onnx')
+            make_synthetic_model(Path(args.model))
+        if args.model is None:
+            parser.error('pass --model or --synthetic')
+        args.model = str(Path(args.model).resolve())
+        
+        corpus_sha256 = make_corpus(Path(tmp) / 'corpus', args.resolutions, args.images, args.seed)
+        meta = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": len(os.sched_getaffinity(0)),
+            "model": args.model,
+            "model_id": None,
+            "backend": None,
+            "corpus_images": args.images,
+            "corpus_seed": args.seed,
+            "corpus_sha256": corpus_sha256,
+            "concurrency": args.concurrency,
+            "server_workers": None if args.url else args.server_workers,
+        }
+        
+        results = []
+        print(f"{'level':>8} {'resolution':>10} {'img/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+        
+        def report(level, resolution, result):
+            result = {"level": level, "resolution": resolution, **result}
+            results.append(result)
+            print(f"{level:>8} {resolution:>10} {result.get('img_per_s', '-'):>8} {result.get('p50_ms', '-'):>9} "
+                  f"{result.get('p95_ms', '-'):>9} {result.get('p99_ms', '-'):>9} {result.get('peak_rss_mb') or '-':>8}",
+                  flush=True)
+        
+        for level in args.levels:
+            server, base = None, args.url
+            if level == 'load' and not args.url:
+                server, base = start_server(args)
+            try:
+                for width, height in args.resolutions:
+                    resolution = f'{width}x{height}'
+                    corpus = Path(tmp) / 'corpus' / resolution
+                    if level == 'load':
+                        result = run_load(corpus, base, server, args)
+                    else:
+                        result = run_isolated(level, corpus, args)
+                        meta['model_id'] = result.pop('model_id', meta['model_id'])
+                        meta['backend'] = result.pop('backend', meta['backend'])
+                    report(level, resolution, result)
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(timeout=30)
+    
+    output = {"meta": meta, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(output, indent=2) + '\n')
+        print(f"\nResults written to {args.output}")
+    else:
+        print(json.dumps(output, indent=2))
+
+if __name__ == '__main__':
+    main()
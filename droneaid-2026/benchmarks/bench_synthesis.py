@@ -0,0 +1,200 @@
+"""
+DroneAid 2026 - Synthetic Image Rendering Benchmark
+Times each stage of rendering one training image in training/prepare_data.py
+
+Variants, rendering the same sequence of random choices:
+  
+  pil     previous PIL pipeline: new background image per sample, LANCZOS
+          resize of the full-size icon, rotate, ImageEnhance fading, a
+          full-size overlay image blended for fog/haze, PIL JPEG encoder
+  numpy   training/synthesis.py: one reused canvas, broadcast gradients,
+          cached icon pyramid with one affine warp, in-place OpenCV
+          arithmetic for fading and weather, OpenCV JPEG encoder
+
+A third run renders multi-symbol scenes (Synthesizer.compose) and is
+compared with single-icon images by labelled instances per second.
+
+Single process; multiply by the worker count for prepare_data.py throughput.
+
+Usage:
+    python benchmarks/bench_synthesis.py --images 200
+"""
+
+import argparse
+import random
+import sys
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'training'))
+
+from prepare_data import CLASSES, image_seed  # noqa: E402
+from synthesis import BG_SIZES, STAGES, IconAtlas, Synthesizer  # noqa: E402
+
+ICONS_DIR = ROOT / 'assets' / 'icons'
+
+def render_pil(icons, icon_path, rng, np_rng, timings):
+    """The previous PIL implementation, split into the same stages"""
+    @contextmanager
+    def stage(name):
+        start = time.perf_counter()
+        yield
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    
+    icon = icons[icon_path]
+    with stage('background'):
+        bg_width, bg_height = rng.choice(BG_SIZES)
+        bg_type = rng.choice(['solid', 'gradient', 'noisy'])
+        if bg_type == 'solid':
+            bg_color = rng.randint(40, 220)
+            background = Image.new('RGB', (bg_width, bg_height), (bg_color, bg_color, bg_color))
+        elif bg_type == 'gradient':
+            pixels = np.zeros((bg_height, bg_width, 3), dtype=np.uint8)
+            for y in range(bg_height):
+                color = int(100 + (y / bg_height) * 100)
+                pixels[y, :] = [color, color, color]
+            background = Image.fromarray(pixels)
+        else:
+            bg_base = rng.randint(80, 180)
+            pixels = np_rng.integers(-30, 30, (bg_height, bg_width, 3)) + bg_base
+            background = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    
+    scale = rng.uniform(0.5, 1.5)
+    degrade = None
+    if rng.random() < 0.5:
+        degrade = [rng.uniform(0.3, 0.7), rng.uniform(0.7, 1.3), None]
+        if rng.random() < 0.3:
+            degrade[2] = rng.uniform(0.5, 0.8)
+    angle = rng.uniform(-30, 30)
+    
+    with stage('icon'):
+        scaled_icon = icon.resize((int(icon.width * scale), int(icon.height * scale)), Image.LANCZOS)
+    with stage('degrade'):
+        if degrade is not None:
+            scaled_icon = ImageEnhance.Color(scaled_icon).enhance(degrade[0])
+            scaled_icon = ImageEnhance.Brightness(scaled_icon).enhance(degrade[1])
+            if degrade[2] is not None:
+                scaled_icon = ImageEnhance.Contrast(scaled_icon).enhance(degrade[2])
+    with stage('icon'):
+        rotated_icon = scaled_icon.rotate(angle, expand=True, fillcolor=(0, 0, 0, 0))
+    
+    max_x = max(0, bg_width - rotated_icon.width)
+    max_y = max(0, bg_height - rotated_icon.height)
+    x = rng.randint(0, max_x) if max_x > 0 else 0
+    y = rng.randint(0, max_y) if max_y > 0 else 0
+    
+    with stage('paste'):
+        background.paste(rotated_icon, (x, y), rotated_icon)
+    
+    with stage('weather'):
+        if rng.random() < 0.3:
+            effect_type = rng.choice(['fog', 'haze', 'sunglare'])
+            if effect_type == 'fog':
+                fog_layer = Image.new('RGB', (bg_width, bg_height), (255, 255, 255))
+                background = Image.blend(background, fog_layer, alpha=rng.uniform(0.2, 0.4))
+            elif effect_type == 'haze':
+                haze_color = rng.randint(180, 220)
+                haze_layer = Image.new('RGB', (bg_width, bg_height), (haze_color, haze_color, haze_color))
+                background = Image.blend(background, haze_layer, alpha=rng.uniform(0.15, 0.35))
+            else:
+                background = ImageEnhance.Brightness(background).enhance(rng.uniform(1.2, 1.5))
+    
+    with stage('blur'):
+        if rng.random() < 0.2:
+            background = background.filter(ImageFilter.GaussianBlur(radius=rng.uniform(0.5, 2.0)))
+    
+    with stage('edges'):
+        if rng.random() < 0.2:
+            bg_array = np.array(background)
+            edges_colored = cv2.cvtColor(cv2.Canny(bg_array, 50, 150), cv2.COLOR_GRAY2RGB)
+            background = Image.fromarray(cv2.addWeighted(bg_array, 0.9, edges_colored, 0.1, 0))
+    
+    return background
+
+def encode_pil(image) -> bytes:
+    buffer = BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+def encode_numpy(image) -> bytes:
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+
+def run(variant: str, count: int):
+    """Render `count` images cycling through the classes; return (seconds per stage, total seconds)"""
+    icon_paths = [str(ICONS_DIR / f'icon-{name}.png') for name in CLASSES]
+    timings = {}
+    
+    # Setup (icon loading, pyramids, canvas) is once per worker and not timed
+    if variant == 'pil':
+        icons = {path: Image.open(path).convert('RGBA') for path in icon_paths}
+        render = lambda path, rng, np_rng: render_pil(icons, path, rng, np_rng, timings)  # noqa: E731
+        encode = encode_pil
+    else:
+        synthesizer = Synthesizer()
+        for path in icon_paths:
+            synthesizer.icon(path)
+        render = lambda path, rng, np_rng: synthesizer.render(path, rng, np_rng, timings)[0]  # noqa: E731
+        encode = encode_numpy
+    
+    start = time.perf_counter()
+    for i in range(count):
+        class_idx = i % len(CLASSES)
+        sequence = image_seed(0, class_idx, i)
+        rng = random.Random(int(sequence.generate_state(1)[0]))
+        image = render(icon_paths[class_idx], rng, np.random.default_rng(sequence))
+        encode_start = time.perf_counter()
+        encode(image)
+        timings['encode'] = timings.get('encode', 0.0) + time.perf_counter() - encode_start
+    return timings, time.perf_counter() - start
+
+def run_scenes(count: int, symbols_per_scene=(2, 8)):
+    """Render `count` scenes; return (labelled instances, total seconds)"""
+    icons = [(class_idx, str(ICONS_DIR / f'icon-{name}.png')) for class_idx, name in enumerate(CLASSES)]
+    synthesizer = Synthesizer(atlas=IconAtlas(path for _, path in icons))
+    
+    instances = 0
+    start = time.perf_counter()
+    for i in range(count):
+        sequence = image_seed(0, len(CLASSES), i)
+        rng = random.Random(int(sequence.generate_state(1)[0]))
+        image, boxes = synthesizer.compose(icons, rng.randint(*symbols_per_scene), rng,
+                                           np.random.default_rng(sequence))
+        encode_numpy(image)
+        instances += len(boxes)
+    return instances, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=200)
+    args = parser.parse_args()
+    
+    cv2.setNumThreads(1)
+    results = {variant: run(variant, args.images) for variant in ('pil', 'numpy')}
+    
+    print(f"{'stage':>10} {'pil ms':>8} {'numpy ms':>9} {'speedup':>8}   (mean per image)")
+    for stage in STAGES + ('encode',):
+        before = results['pil'][0].get(stage, 0.0) * 1000 / args.images
+        after = results['numpy'][0].get(stage, 0.0) * 1000 / args.images
+        speedup = f"{before / after:>7.1f}x" if after else f"{'-':>8}"
+        print(f"{stage:>10} {before:>8.2f} {after:>9.2f} {speedup}")
+    
+    before = args.images / results['pil'][1]
+    after = args.images / results['numpy'][1]
+    print(f"{'images/s':>10} {before:>8.1f} {after:>9.1f} {after / before:>7.1f}x")
+    
+    # Single-icon images carry one instance each
+    instances, seconds = run_scenes(args.images)
+    print(f"\n{'':>10} {'single':>8} {'scenes':>9}")
+    print(f"{'images/s':>10} {after:>8.1f} {args.images / seconds:>9.1f}")
+    print(f"{'inst/img':>10} {1.0:>8.1f} {instances / args.images:>9.1f}")
+    print(f"{'inst/s':>10} {after:>8.1f} {instances / seconds:>9.1f} {instances / seconds / after:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
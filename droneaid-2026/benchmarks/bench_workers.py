@@ -0,0 +1,202 @@
+"""
+DroneAid 2026 - Worker Scaling Benchmark
+Measures throughput and memory of inference/serve.py against worker count
+
+For each worker count the server is started with `serve.py`, warmed up,
+and driven by concurrent clients posting the same JPEG to /detect/raw for a
+fixed duration. Reported per run:
+  
+  img/s       completed requests per second
+  p50/p99 ms  client-side request latency
+  PSS MB      proportional set size summed over the worker processes
+              (shared pages such as memory-mapped weights are split between
+              the processes that map them, so this is the real footprint)
+
+Use an exported YOLOv8 ONNX model for representative numbers. Without one,
+--synthetic writes a YOLOv8-shaped convolutional model (requires the `onnx`
+package) that exercises the same pipeline with comparable weight size.
+
+Usage:
+    python benchmarks/bench_workers.py --model inference/models/best.onnx --workers 1 2 4 8
+    python benchmarks/bench_workers.py --synthetic --workers 1 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import httpx
+import numpy as np
+
+INFERENCE_DIR = Path(__file__).resolve().parents[1] / 'inference'
+
+def make_synthetic_model(path: Path, width: int = 32):
+    """
+    Write a convolutional model with the YOLOv8 input/output layout
+    
+    Input [batch, 3, 640, 640]; output [batch, 12, 8400] from three detection
+    scales (80x80, 40x40, 20x20), so the service's letterbox, NMS and
+    response code run exactly as with a real export.
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    
+    rng = np.random.default_rng(0)
+    nodes, initializers = [], []
+    
+    def conv(name, source, in_ch, out_ch, stride, activation=True):
+        weight = (rng.standard_normal((out_ch, in_ch, 3, 3)) * (2 / (9 * in_ch)) ** 0.5).astype(np.float32)
+        initializers.extend([numpy_helper.from_array(weight, f'{name}.w'),
+                             numpy_helper.from_array(np.zeros(out_ch, np.float32), f'{name}.b')])
+        output = f'{name}.conv' if activation else name
+        nodes.append(helper.make_node('Conv', [source, f'{name}.w', f'{name}.b'], [output],
+                                      pads=[1, 1, 1, 1], strides=[stride, stride]))
+        if activation:
+            nodes.append(helper.make_node('Relu', [output], [name]))
+        return name
+    
+    x = 'images'
+    channels = 3
+    for i, out_ch in enumerate([width // 2, width, width * 2]):
+        x = conv(f'stem{i}', x, channels, out_ch, 2)
+        channels = out_ch
+    
+    heads = []
+    for scale in range(3):
+        for block in range(2):
+            x = conv(f's{scale}b{block}', x, channels, channels, 1)
+        head = conv(f'head{scale}', x, channels, 12, 1, activation=False)
+        initializers.append(numpy_helper.from_array(np.array([0, 12, -1], np.int64), f'head{scale}.shape'))
+        nodes.append(helper.make_node('Reshape', [head, f'head{scale}.shape'], [f'head{scale}.flat']))
+        heads.append(f'head{scale}.flat')
+        if scale < 2:
+            x = conv(f'down{scale}', x, channels, channels * 2, 2)
+            channels *= 2
+    
+    # Scores stay below 0.5 so responses carry few detections, as in real frames
+    nodes.append(helper.make_node('Concat', heads, ['raw'], axis=2))
+    nodes.append(helper.make_node('Sigmoid', ['raw'], ['squashed']))
+    initializers.append(numpy_helper.from_array(np.array(0.55, np.float32), 'scale'))
+    nodes.append(helper.make_node('Mul', ['squashed', 'scale'], ['output0']))
+    
+    graph = helper.make_graph(
+        nodes, 'synthetic-yolo',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, ['batch', 3, 640, 640])],
+        [helper.make_tensor_value_info('output0', TensorProto.FLOAT, ['batch', 12, 8400])],
+        initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 17)])
+    model.ir_version = 8
+    names = ['children', 'elderly', 'firstaid', 'food', 'ok', 'shelter', 'sos', 'water']
+    entry = model.metadata_props.add()
+    entry.key, entry.value = 'names', str(dict(enumerate(names)))
+    onnx.save(model, str(path))
+
+def make_jpeg(width: int = 1920, height: int = 1080) -> bytes:
+    rng = np.random.default_rng(0)
+    coarse = rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8)
+    image = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_LINEAR)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def worker_pss_mb(server_pid: int) -> float:
+    """Sum PSS over the server's child processes"""
+    total_kb = 0
+    children = Path(f'/proc/{server_pid}/task/{server_pid}/children').read_text().split()
+    for pid in children:
+        for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+            if line.startswith('Pss:'):
+                total_kb += int(line.split()[1])
+    return round(total_kb / 1024, 1)
+
+async def drive(url: str, body: bytes, concurrency: int, duration_s: float):
+    """Post frames from `concurrency` clients for duration_s; return latencies in ms"""
+    latencies = []
+    deadline = time.perf_counter() + duration_s
+    
+    async def client(http: httpx.AsyncClient):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await http.post(url, content=body, headers={'Content-Type': 'application/octet-stream'})
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+    
+    async with httpx.AsyncClient(timeout=60) as http:
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+    return latencies
+
+def run(model: Path, workers: int, threads: int, affinity: str, concurrency: int,
+        duration_s: float, body: bytes) -> dict:
+    port = free_port()
+    env = {**os.environ, 'CACHE_MAX_ENTRIES': '0'}
+    command = [sys.executable, str(INFERENCE_DIR / 'serve.py'), '--host', '127.0.0.1', '--port', str(port),
+               '--workers', str(workers), '--affinity', affinity, '--model', str(model), '--log-level', 'warning']
+    if threads:
+        command += ['--threads', str(threads)]
+    server = subprocess.Popen(command, cwd=INFERENCE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(600):
+            try:
+                if httpx.get(f'{base}/ready', timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        url = f'{base}/detect/raw'
+        asyncio.run(drive(url, body, concurrency, 2.0))  # Warm up every worker
+        latencies = asyncio.run(drive(url, body, concurrency, duration_s))
+        return {
+            "workers": workers,
+            "img_per_s": round(len(latencies) / duration_s, 2),
+            "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1) if latencies else None,
+            "pss_mb": worker_pss_mb(server.pid),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', type=Path, help='Exported .onnx model')
+    parser.add_argument('--synthetic', action='store_true', help='Benchmark a generated YOLOv8-shaped model')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=0, help='Threads per worker (default: serve.py default)')
+    parser.add_argument('--affinity', default='auto')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20.0)
+    args = parser.parse_args()
+    
+    model = args.model
+    if args.synthetic:
+        model = Path(tempfile.mkdtemp()) / 'synthetic.onnx'
+        make_synthetic_model(model)
+    if model is None:
+        parser.error('pass --model or --synthetic')
+    
+    body = make_jpeg()
+    print(f"CPUs: {len(os.sched_getaffinity(0))}  model: {model}")
+    print(f"{'workers':>7} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'PSS MB':>8}")
+    for workers in args.workers:
+        result = run(model.resolve(), workers, args.threads, args.affinity, args.concurrency, args.duration, body)
+        print(f"{result['workers']:>7} {result['img_per_s']:>8} {result['p50_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['pss_mb']:>8}")
+        print(json.dumps(result), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
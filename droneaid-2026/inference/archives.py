@@ -0,0 +1,83 @@
+"""
+DroneAid 2026 - Batch Upload Sources
+Expands multipart uploads and zip/tar archives into individual images
+"""
+
+import tarfile
+import zipfile
+from functools import partial
+from pathlib import PurePosixPath
+from typing import BinaryIO, Callable, List, Tuple
+
+from payloads import MAX_BODY_SIZE, PayloadTooLargeError
+
+# File extensions treated as images inside archives
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+
+# A batch source is (display name, callable returning the encoded image bytes)
+ImageSource = Tuple[str, Callable[[], bytes]]
+
+def is_archive(filename: str) -> bool:
+    """Return True if the upload name looks like a zip or tar archive"""
+    name = (filename or '').lower()
+    return name.endswith(('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz'))
+
+def _is_image(name: str) -> bool:
+    return PurePosixPath(name).suffix.lower() in IMAGE_EXTENSIONS
+
+def _read_file(fileobj: BinaryIO) -> bytes:
+    fileobj.seek(0)
+    return fileobj.read()
+
+def _read_member(open_member: Callable[[], BinaryIO], name: str, size: int, max_size: int) -> bytes:
+    """Read one archive member, refusing members that expand beyond max_size bytes"""
+    if size > max_size:
+        # Rejected from the archive header, without decompressing anything
+        raise PayloadTooLargeError(f"{name} is larger than {max_size} bytes")
+    with open_member() as stream:
+        # Bounded read: the size in the header may not match the compressed data
+        data = stream.read(max_size + 1)
+    if len(data) > max_size:
+        raise PayloadTooLargeError(f"{name} is larger than {max_size} bytes")
+    return data
+
+def file_source(name: str, fileobj: BinaryIO) -> ImageSource:
+    """Wrap a single uploaded image file as a batch source"""
+    return name, partial(_read_file, fileobj)
+
+def archive_sources(fileobj: BinaryIO, filename: str, max_member_size: int = MAX_BODY_SIZE) -> List[ImageSource]:
+    """
+    List the images inside a zip or tar archive, in archive order
+    
+    Members are read lazily by calling each source's loader. Loaders share
+    the archive handle, so they must be called from one thread at a time.
+    The loader of a member larger than max_member_size raises
+    PayloadTooLargeError, so a small archive cannot expand into gigabytes.
+    
+    Args:
+        fileobj: Seekable file object holding the archive
+        filename: Upload name, used to pick the archive format
+        max_member_size: Largest accepted uncompressed member, in bytes
+    
+    Returns:
+        List of (member name, loader) pairs
+    
+    Raises:
+        ValueError: If the archive cannot be read
+    """
+    fileobj.seek(0)
+    try:
+        if filename.lower().endswith('.zip'):
+            archive = zipfile.ZipFile(fileobj)
+            return [(info.filename, partial(_read_member, partial(archive.open, info), info.filename,
+                                            info.file_size, max_member_size))
+                    for info in archive.infolist()
+                    if not info.is_dir() and _is_image(info.filename)]
+        
+        archive = tarfile.open(fileobj=fileobj, mode='r:*')
+        return [(member.name, partial(_read_member, partial(archive.extractfile, member), member.name,
+                                      member.size, max_member_size))
+                for member in archive.getmembers()
+                if member.isfile() and _is_image(member.name)]
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise ValueError(f"Invalid archive {filename}: {e}")
@@ -0,0 +1,188 @@
+"""
+DroneAid 2026 - Micro-batching Scheduler
+Coalesces concurrent detection requests into batched forward passes
+"""
+
+import asyncio
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+def percentile(values, q: float) -> Optional[float]:
+    """Return the q-th percentile of a sequence, or None when it is empty"""
+    if not values:
+        return None
+    return round(float(np.percentile(np.fromiter(values, dtype=np.float64), q)), 2)
+
+class MicroBatcher:
+    """
+    Collects detection requests for a short window and runs them as one batch
+    
+    Requests are queued by `submit()`. A single background task takes the
+    first pending request, then keeps collecting until either `max_batch_size`
+    requests are waiting or `max_wait_ms` has elapsed, runs one call to
+    `detector.detect_batch()` and resolves each request's future.
+    
+    Requests with different confidence thresholds or response formats share
+    a batch: the model runs at the lowest threshold in the batch and each
+    result is filtered to its caller's threshold and formatted as requested.
+    Requests routed to different models (see `ModelRegistry`) are collected
+    together and run as one forward pass per model.
+    """
+    
+    def __init__(self, detector, max_batch_size: int = 8, max_wait_ms: float = 5.0,
+                 executor: Optional[Executor] = None, latency_window: int = 2048):
+        """
+        Initialize the batcher
+        
+        Args:
+            detector: Default DroneAidDetector used for the batched forward pass
+            max_batch_size: Maximum number of images per forward pass
+            max_wait_ms: Maximum time to hold the first request while waiting for more
+            executor: Executor the forward pass runs on (None uses the loop default)
+            latency_window: Number of recent requests kept for latency percentiles
+        """
+        self.detector = detector
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.executor = executor
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        
+        # Statistics
+        self.batch_size_histogram: Counter = Counter()
+        self.total_batches = 0
+        self.total_requests = 0
+        self._latencies_ms = deque(maxlen=latency_window)
+        self._queue_waits_ms = deque(maxlen=latency_window)
+    
+    async def start(self):
+        """Start the background batching task on the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background task and fail any request still waiting"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, _, _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Batcher stopped"))
+            self._queue = None
+    
+    async def submit(self, image: np.ndarray, conf_threshold: float = 0.5, columnar: bool = False,
+                     detector=None) -> Dict[str, Any]:
+        """
+        Queue an image for detection and wait for its result
+        
+        Args:
+            image: OpenCV image (BGR format)
+            conf_threshold: Confidence threshold for detections
+            columnar: Return parallel arrays instead of detection objects
+            detector: Detector to run the image on (None uses the batcher's detector)
+        
+        Returns:
+            Detection result dictionary, as returned by `DroneAidDetector.detect`
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((image, conf_threshold, columnar, detector or self.detector, future,
+                                time.perf_counter()))
+        return await future
+    
+    async def _collect(self) -> List[tuple]:
+        """Wait for one request, then gather more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Window closed; still take anything that is already queued
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        return batch
+    
+    async def _run(self):
+        """Background loop: collect a batch, run it, fan results back out"""
+        while True:
+            batch = await self._collect()
+            # Skip requests whose callers already went away
+            batch = [item for item in batch if not item[4].done()]
+            if not batch:
+                continue
+            
+            groups: Dict[int, List[tuple]] = {}
+            for item in batch:
+                groups.setdefault(id(item[3]), []).append(item)
+            for group in groups.values():
+                await self._run_group(group)
+    
+    async def _run_group(self, batch: List[tuple]):
+        """Run one forward pass for requests that share a detector"""
+        loop = asyncio.get_running_loop()
+        detector = batch[0][3]
+        images = [item[0] for item in batch]
+        thresholds = [item[1] for item in batch]
+        formats = [item[2] for item in batch]
+        dispatched = time.perf_counter()
+        
+        try:
+            results = await loop.run_in_executor(
+                self.executor, detector.detect_batch, images, thresholds, formats
+            )
+        except Exception as e:
+            for *_, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        finished = time.perf_counter()
+        self.batch_size_histogram[len(batch)] += 1
+        self.total_batches += 1
+        self.total_requests += len(batch)
+        
+        for (*_, future, enqueued), result in zip(batch, results):
+            self._queue_waits_ms.append((dispatched - enqueued) * 1000)
+            self._latencies_ms.append((finished - enqueued) * 1000)
+            if not future.done():
+                future.set_result(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return batch-size histogram and latency percentiles for tuning the window"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "total_batches": self.total_batches,
+            "total_requests": self.total_requests,
+            "mean_batch_size": round(self.total_requests / self.total_batches, 2) if self.total_batches else None,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_size_histogram.items())},
+            "queue_wait_ms": {
+                "p50": percentile(self._queue_waits_ms, 50),
+                "p99": percentile(self._queue_waits_ms, 99),
+            },
+            "latency_ms": {
+                "p50": percentile(self._latencies_ms, 50),
+                "p99": percentile(self._latencies_ms, 99),
+            },
+        }
@@ -0,0 +1,352 @@
+"""
+DroneAid 2026 - Bulk Processing
+Runs the detector over a directory of post-flight imagery into one JSONL or Parquet file
+
+Usage:
+    python bulk.py /media/flight-0412 -o flight-0412.jsonl
+    python bulk.py /media/flight-0412 -o flight-0412.parquet --batch-size 16
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+
+# EXIF tags: GPS IFD pointer, Exif IFD pointer and DateTimeOriginal inside it
+_GPS_IFD = 0x8825
+_EXIF_IFD = 0x8769
+_DATETIME_ORIGINAL = 0x9003
+
+def list_images(root: Path, recursive: bool = False) -> List[str]:
+    """Image paths under root, relative to it and sorted, so every run sees the same order"""
+    paths = root.rglob('*') if recursive else root.iterdir()
+    return sorted(path.relative_to(root).as_posix() for path in paths
+                  if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file())
+
+def _degrees(value) -> float:
+    """Degrees from an EXIF (degrees, minutes, seconds) rational triple"""
+    degrees, minutes, seconds = (float(v) for v in value)
+    return degrees + minutes / 60 + seconds / 3600
+
+def read_exif(data: bytes) -> Tuple[Optional[Dict[str, float]], Optional[str]]:
+    """
+    GPS position and capture time from a JPEG's EXIF metadata
+    
+    Reads the GPSLatitude/GPSLatitudeRef and GPSLongitude/GPSLongitudeRef
+    tags that exiftool writes (see assets/samples/sample-generator.py), plus
+    GPSAltitude when present. Only the metadata is parsed, not the pixels.
+    
+    Returns:
+        Tuple of ({"lat", "lon"[, "alt"]} or None, DateTimeOriginal in ISO 8601 or None)
+    """
+    from PIL import Image
+    
+    try:
+        exif = Image.open(io.BytesIO(data)).getexif()
+        gps_tags = exif.get_ifd(_GPS_IFD)
+        taken = exif.get_ifd(_EXIF_IFD).get(_DATETIME_ORIGINAL)
+    except Exception:
+        return None, None
+    
+    gps = None
+    try:
+        if 2 in gps_tags and 4 in gps_tags:
+            lat = _degrees(gps_tags[2]) * (-1 if gps_tags.get(1) == 'S' else 1)
+            lon = _degrees(gps_tags[4]) * (-1 if gps_tags.get(3) == 'W' else 1)
+            gps = {"lat": round(lat, 7), "lon": round(lon, 7)}
+            if 6 in gps_tags:
+                # GPSAltitudeRef 1 means below sea level
+                gps["alt"] = round(float(gps_tags[6]) * (-1 if gps_tags.get(5) in (1, b'\x01') else 1), 2)
+    except (TypeError, ValueError, ZeroDivisionError):
+        gps = None
+    
+    captured_at = None
+    if isinstance(taken, str):
+        try:
+            captured_at = datetime.strptime(taken.strip('\x00 '), '%Y:%m:%d %H:%M:%S').isoformat()
+        except ValueError:
+            pass
+    
+    return gps, captured_at
+
+def _init_decoder():
+    """Decode workers each use one core; parallelism comes from the pool"""
+    import cv2
+    cv2.setNumThreads(1)
+    # Ctrl+C is handled by the parent, which checkpoints and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def load_image(root: str, name: str, target_size: int) -> Dict[str, Any]:
+    """
+    Read, decode and extract metadata for one image (runs in a decode worker)
+    
+    Returns:
+        Dictionary with "file", "image", "original_size", "gps" and
+        "captured_at", or "file" and "error" if the image cannot be read
+    """
+    from imaging import decode_for_model
+    
+    try:
+        data = (Path(root) / name).read_bytes()
+        image, original_size = decode_for_model(data, target_size)
+    except Exception as e:
+        # One unreadable file (truncated, zero bytes, not an image) must not stop the run:
+        # it gets an error record and counts as done, so a resumed run does not retry it
+        return {"file": name, "error": str(e) or type(e).__name__}
+    
+    gps, captured_at = read_exif(data)
+    return {"file": name, "image": image, "original_size": original_size, "gps": gps, "captured_at": captured_at}
+
+def prefetch_batches(executor: ProcessPoolExecutor, root: Path, names: List[str], target_size: int,
+                     batch_size: int, prefetch: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield batches of loaded images while the next ones are decoded in the pool
+    
+    Up to `prefetch` batches are queued ahead of the one being run through
+    the model, so decoding overlaps inference and memory stays bounded no
+    matter how large the directory is.
+    """
+    pending = deque()
+    upcoming = iter(names)
+    
+    def submit():
+        name = next(upcoming, None)
+        if name is not None:
+            pending.append(executor.submit(load_image, str(root), name, target_size))
+    
+    for _ in range(batch_size * (prefetch + 1)):
+        submit()
+    
+    while pending:
+        batch = []
+        while pending and len(batch) < batch_size:
+            batch.append(pending.popleft().result())
+            submit()
+        yield batch
+
+class Checkpoint:
+    """
+    Append-only record of the images already written to the output
+    
+    Each line lists the files of one batch and the size of the output after
+    that batch was written and synced. On resume, the output is truncated
+    back to the last recorded size, so a batch that was written but not
+    checkpointed when the run stopped is neither lost nor duplicated.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+    
+    def resume(self, output: Path) -> Set[str]:
+        """
+        Files finished by earlier runs; truncates the output to the last checkpointed batch
+        
+        Raises:
+            ValueError: If the output is shorter than the checkpoint says it should be
+        """
+        done: Set[str] = set()
+        self.offset = 0
+        if not self.path.exists():
+            if output.exists() and output.stat().st_size:
+                raise ValueError(f"{output} exists but has no checkpoint; rerun with --fresh to overwrite it")
+            return done
+        
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line of an interrupted write
+                    break
+                done.update(entry["files"])
+                self.offset = entry["offset"]
+        
+        size = output.stat().st_size if output.exists() else 0
+        if size < self.offset:
+            raise ValueError(f"{output} is shorter than {self.path} records ({size} < {self.offset} bytes); "
+                             "rerun with --fresh to start over")
+        if size > self.offset:
+            with open(output, 'r+b') as f:
+                f.truncate(self.offset)
+        return done
+    
+    def commit(self, files: List[str], offset: int):
+        """Record a batch whose output has been synced up to offset"""
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({"files": files, "offset": offset}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.offset = offset
+
+def write_parquet(jsonl_path: Path, parquet_path: Path) -> int:
+    """Convert the staged JSONL records into one Parquet file; returns the row count"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    with open(jsonl_path) as f:
+        records = [json.loads(line) for line in f]
+    pq.write_table(pa.Table.from_pylist(records), str(parquet_path))
+    return len(records)
+
+def plan_threads(cpu_count: int, decode_workers: Optional[int]) -> Tuple[int, int]:
+    """
+    Split the CPUs between decode processes and inference threads
+    
+    Returns:
+        Tuple of (decode worker processes, inference threads)
+    """
+    if decode_workers is None:
+        # Reduced-size JPEG decoding is cheap next to a forward pass
+        decode_workers = max(1, cpu_count // 4)
+    return decode_workers, max(1, cpu_count - decode_workers)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', type=Path, help='Directory of images')
+    parser.add_argument('-o', '--output', type=Path, required=True,
+                        help='Output file; .parquet writes Parquet (needs pyarrow), anything else JSONL')
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH'))
+    parser.add_argument('--conf', type=float, default=0.5, help='Confidence threshold')
+    parser.add_argument('--batch-size', type=int, default=8, help='Images per forward pass')
+    parser.add_argument('--decode-workers', type=int, default=None,
+                        help='Decode processes (default: a quarter of the CPUs, at least one)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Inference threads (default: the CPUs not used for decoding)')
+    parser.add_argument('--prefetch', type=int, default=2, help='Batches decoded ahead of inference')
+    parser.add_argument('--tiled', action='store_true',
+                        help='Decode at full resolution and run sliced inference on each image')
+    parser.add_argument('--recursive', action='store_true', help='Include images in subdirectories')
+    parser.add_argument('--fresh', action='store_true', help='Ignore the checkpoint and start over')
+    args = parser.parse_args()
+    
+    if not args.images.is_dir():
+        parser.error(f"{args.images} is not a directory")
+    
+    parquet = args.output.suffix.lower() == '.parquet'
+    if parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Parquet output needs pyarrow (pip install pyarrow); use a .jsonl output instead")
+    staging = args.output.with_name(args.output.name + '.jsonl') if parquet else args.output
+    checkpoint = Checkpoint(args.output.with_name(args.output.name + '.checkpoint'))
+    
+    if args.fresh:
+        checkpoint.path.unlink(missing_ok=True)
+        staging.unlink(missing_ok=True)
+    try:
+        done = checkpoint.resume(staging)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    names = list_images(args.images, args.recursive)
+    todo = [name for name in names if name not in done]
+    print(f"{len(names)} images in {args.images}, {len(names) - len(todo)} already done, {len(todo)} to process")
+    
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    decode_workers, threads = plan_threads(cpu_count, args.decode_workers)
+    threads = args.threads or threads
+    
+    if todo:
+        # Thread counts must be set before numpy, torch or ONNX Runtime start their pools
+        for name in ('ORT_INTRA_OP_THREADS', 'OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            os.environ.setdefault(name, str(threads))
+        
+        import cv2
+        from imaging import restore_scale
+        from model import DroneAidDetector
+        
+        cv2.setNumThreads(threads)
+        detector = DroneAidDetector(args.model)
+        if detector.model is None:
+            sys.exit("No model found; pass --model or set MODEL_PATH")
+        target_size = 0 if args.tiled else detector.input_size
+        print(f"Model {detector.model_path} ({detector.backend}), {decode_workers} decode workers, "
+              f"{threads} inference threads, batch size {args.batch_size}")
+        
+        processed = detections = errors = 0
+        wait_s = inference_s = 0.0
+        start = last_report = time.perf_counter()
+        
+        # Spawned, not forked: the parent already runs inference thread pools
+        executor = ProcessPoolExecutor(decode_workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_decoder)
+        batches = prefetch_batches(executor, args.images, todo, target_size, max(1, args.batch_size),
+                                   max(0, args.prefetch))
+        try:
+            with open(staging, 'ab') as out:
+                while True:
+                    wait_start = time.perf_counter()
+                    batch = next(batches, None)
+                    wait_s += time.perf_counter() - wait_start
+                    if batch is None:
+                        break
+                    
+                    loaded = [item for item in batch if "error" not in item]
+                    inference_start = time.perf_counter()
+                    if args.tiled:
+                        results = [detector.detect_tiled(item["image"], args.conf, batch_size=args.batch_size)
+                                   for item in loaded]
+                    elif loaded:
+                        results = detector.detect_batch([item["image"] for item in loaded], args.conf)
+                    else:
+                        results = []
+                    inference_s += time.perf_counter() - inference_start
+                    
+                    results = iter(results)
+                    lines = []
+                    for item in batch:
+                        if "error" in item:
+                            record = {"file": item["file"], "error": item["error"]}
+                            errors += 1
+                        else:
+                            result = restore_scale(next(results), item["image"].shape, item["original_size"])
+                            record = {"file": item["file"], "gps": item["gps"], "captured_at": item["captured_at"],
+                                      **result}
+                            detections += len(result["detections"])
+                        lines.append(json.dumps(record) + '\n')
+                    
+                    out.write(''.join(lines).encode())
+                    out.flush()
+                    os.fsync(out.fileno())
+                    checkpoint.commit([item["file"] for item in batch], out.tell())
+                    processed += len(batch)
+                    
+                    now = time.perf_counter()
+                    if now - last_report >= 10:
+                        rate = processed / (now - start)
+                        print(f"{processed}/{len(todo)} images, {rate:.1f} images/s, "
+                              f"ETA {(len(todo) - processed) / rate:.0f}s", flush=True)
+                        last_report = now
+        except KeyboardInterrupt:
+            print(f"\nInterrupted after {processed} images; run again to resume")
+            executor.shutdown(wait=False, cancel_futures=True)
+            sys.exit(130)
+        executor.shutdown()
+        
+        elapsed = time.perf_counter() - start
+        print(f"Processed {processed} images in {elapsed:.1f}s: {processed / elapsed:.1f} images/s, "
+              f"{detections} detections, {errors} unreadable")
+        # Time spent waiting for decoded images means more decode workers would help
+        print(f"Inference {inference_s:.1f}s, waiting for decode {wait_s:.1f}s")
+    
+    if parquet and staging.exists():
+        rows = write_parquet(staging, args.output)
+        print(f"Wrote {rows} rows to {args.output}")
+    else:
+        print(f"Results in {args.output}")
+
+if __name__ == '__main__':
+    main()
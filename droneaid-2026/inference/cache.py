@@ -0,0 +1,144 @@
+"""
+DroneAid 2026 - Result Cache
+Content-addressed LRU cache of detection results
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+def content_key(data, variant: str = "") -> str:
+    """Hash encoded image bytes (plus a request variant such as "tiled") into a cache key"""
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f"{digest}:{variant}" if variant else digest
+
+class ResultCache:
+    """
+    LRU cache of detection results keyed on image content
+    
+    Entries remember the confidence threshold they were computed at. A request
+    at the same or a higher threshold is served from the entry by filtering
+    its detections, so one low-threshold inference can answer many requests.
+    
+    Entries are tied to the model that produced them: as soon as a lookup or
+    store sees a different model identity, the whole cache is dropped.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 300.0):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries: Maximum number of cached results (0 disables the cache)
+            ttl_s: Seconds an entry stays valid
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_s = ttl_s
+        
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._model_id: Optional[str] = None
+        
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+    
+    def _check_model(self, model_id: Optional[str]):
+        """Drop every entry if the model has changed since they were stored"""
+        if model_id != self._model_id:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._model_id = model_id
+    
+    def clear(self):
+        """Remove all entries"""
+        self._entries.clear()
+    
+    def get(self, key: str, conf_threshold: float, model_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a result usable at the given threshold
+        
+        Args:
+            key: Key from `content_key`
+            conf_threshold: Confidence threshold of the request
+            model_id: Identity of the currently loaded model
+        
+        Returns:
+            A fresh result dictionary filtered to conf_threshold, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        self._check_model(model_id)
+        
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        
+        if entry is None or entry[1] > conf_threshold:
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        _, cached_conf, result = entry
+        return filter_result(result, conf_threshold if conf_threshold > cached_conf else None)
+    
+    def put(self, key: str, conf_threshold: float, model_id: Optional[str], result: Dict[str, Any]):
+        """Store a result computed at conf_threshold, keeping any lower-threshold entry"""
+        if not self.enabled:
+            return
+        self._check_model(model_id)
+        
+        existing = self._entries.get(key)
+        if existing is not None and existing[1] < conf_threshold and existing[0] >= time.monotonic():
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl_s, conf_threshold, filter_result(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+def filter_result(result: Dict[str, Any], conf_threshold: Optional[float] = None) -> Dict[str, Any]:
+    """Copy a result, optionally keeping only detections above conf_threshold"""
+    if "detections" not in result:
+        # Columnar result (parallel "boxes", "scores" and "class_ids" arrays)
+        scores = result["scores"]
+        keep = range(len(scores)) if conf_threshold is None else [i for i, s in enumerate(scores) if s > conf_threshold]
+        return {
+            **result,
+            "boxes": [list(result["boxes"][i]) for i in keep],
+            "scores": [scores[i] for i in keep],
+            "class_ids": [result["class_ids"][i] for i in keep],
+        }
+    
+    detections = result["detections"]
+    if conf_threshold is not None:
+        detections = [d for d in detections if d["confidence"] > conf_threshold]
+    return {**result, "detections": [dict(d) for d in detections]}
@@ -0,0 +1,135 @@
+"""
+DroneAid 2026 - Motion Gating
+Skips inference on live-feed frames that show the same scene as the last inferred frame
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from imaging import decode_for_model, decode_preview
+
+# Frames are compared as THUMBNAIL_SIZE x THUMBNAIL_SIZE grayscale thumbnails,
+# in blocks of BLOCK_SIZE x BLOCK_SIZE thumbnail pixels (1/256 of the frame)
+THUMBNAIL_SIZE = 192
+BLOCK_SIZE = 12
+
+_NEIGHBORHOOD = np.ones((3, 3), np.uint8)
+
+def thumbnail(image: np.ndarray) -> np.ndarray:
+    """Grayscale float32 thumbnail of a BGR or grayscale image (area-averaged, so sensor noise cancels out)"""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(image, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def thumbnail_bytes(data) -> np.ndarray:
+    """Thumbnail of an encoded image (see `decode_preview`)"""
+    return thumbnail(decode_preview(data))
+
+def decode_with_thumbnail(data, target_size: int) -> Tuple[np.ndarray, Tuple[int, int], np.ndarray]:
+    """
+    Decode for the model (see `decode_for_model`) and take the thumbnail from the same decode
+    
+    Returns:
+        Tuple of (OpenCV image (BGR format), original (width, height), thumbnail)
+    """
+    image, original_size = decode_for_model(data, target_size)
+    return image, original_size, thumbnail(image)
+
+def scene_change(reference: np.ndarray, current: np.ndarray) -> float:
+    """
+    Largest mean difference of any block, as a fraction of full scale
+    
+    A pixel only differs by how far it falls outside the range of the
+    reference's 3x3 neighborhood: a hovering camera shakes by a pixel or two,
+    which blends neighboring thumbnail pixels but never leaves their range,
+    while a symbol laid out or uncovered brings values the area did not
+    have. Taking the worst block rather than the whole-frame mean keeps a
+    change in one corner from being averaged away by an unchanged rest.
+    """
+    low = cv2.erode(reference, _NEIGHBORHOOD)
+    high = cv2.dilate(reference, _NEIGHBORHOOD)
+    diff = np.maximum(np.maximum(low - current, current - high), 0)
+    blocks = THUMBNAIL_SIZE // BLOCK_SIZE
+    return float(diff.reshape(blocks, BLOCK_SIZE, blocks, BLOCK_SIZE).mean(axis=(1, 3)).max()) / 255
+
+class MotionGate:
+    """
+    Decides per frame of one stream whether inference is needed
+    
+    Each frame's thumbnail is compared with that of the last frame that went
+    through the model, not with the previous frame, so slow drift adds up
+    until it counts as a change. While the scene stays within `threshold`,
+    the last result is reused; at least every `refresh_frames` frames the
+    model runs anyway, so a slowly appearing symbol is never missed for long.
+    """
+    
+    def __init__(self, threshold: float = 0.025, refresh_frames: int = 10):
+        """
+        Initialize the gate
+        
+        Args:
+            threshold: Block difference (fraction of full scale) that counts as a scene change
+            refresh_frames: Run inference at least once every this many frames (1 disables gating)
+        """
+        self.threshold = threshold
+        self.refresh_frames = max(1, int(refresh_frames))
+        
+        self.result: Optional[Dict[str, Any]] = None
+        self.result_frame: Optional[int] = None
+        self._reference: Optional[np.ndarray] = None
+        self._since_inference = 0
+        
+        # Statistics
+        self.frames = 0
+        self.inferred = 0
+        self.reused = 0
+        self.scene_changes = 0
+        self.refreshes = 0
+        self.inference_ms_total = 0.0
+    
+    def needs_inference(self, thumb: np.ndarray) -> bool:
+        """
+        Decide for the next frame; counts it as reused when not
+        
+        Args:
+            thumb: Thumbnail of the frame (see `thumbnail`)
+        """
+        self.frames += 1
+        if self._reference is None:
+            return True
+        if scene_change(self._reference, thumb) > self.threshold:
+            self.scene_changes += 1
+            return True
+        if self._since_inference + 1 >= self.refresh_frames:
+            self.refreshes += 1
+            return True
+        self._since_inference += 1
+        self.reused += 1
+        return False
+    
+    def record(self, thumb: np.ndarray, result: Dict[str, Any], frame: Optional[int] = None,
+               inference_ms: float = 0.0):
+        """Store an inferred frame as the new reference and its result for reuse"""
+        self._reference, self.result, self.result_frame = thumb, result, frame
+        self._since_inference = 0
+        self.inferred += 1
+        self.inference_ms_total += inference_ms
+    
+    def reset(self):
+        """Forget the reference, e.g. when the detection settings change"""
+        self._reference = self.result = self.result_frame = None
+    
+    def stats(self) -> Dict[str, Any]:
+        mean_inference_ms = self.inference_ms_total / self.inferred if self.inferred else 0.0
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "reused": self.reused,
+            "scene_changes": self.scene_changes,
+            "refreshes": self.refreshes,
+            "reuse_rate": round(self.reused / self.frames, 4) if self.frames else None,
+            # What the reused frames would have cost at the stream's mean inference time
+            "saved_ms": round(self.reused * mean_inference_ms, 1),
+        }
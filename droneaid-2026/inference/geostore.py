@@ -0,0 +1,392 @@
+"""
+DroneAid 2026 - Geo Store
+Geo-referenced detection store on SQLite with an R-tree spatial index
+"""
+
+import math
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# Mean Earth radius (m) for radius queries and meter/degree conversions
+EARTH_RADIUS_M = 6_371_008.8
+
+# Meters per degree of latitude (as in assets/samples/sample-generator.py)
+METERS_PER_DEGREE = 111_320.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    class_name TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    frame TEXT
+);
+CREATE INDEX IF NOT EXISTS detections_ts ON detections (ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS detections_rtree USING rtree (id, min_lat, max_lat, min_lon, max_lon);
+"""
+
+class GeoBounds(NamedTuple):
+    """Geographic extent of a north-up frame (degrees, WGS 84)"""
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+    
+    @classmethod
+    def parse(cls, value) -> "GeoBounds":
+        """
+        Parse "lat1,lon1,lat2,lon2" or [lat1, lon1, lat2, lon2] (two opposite corners in any order, as in manifest.csv)
+        
+        Raises:
+            ValueError: If the value is not four numbers or not a valid extent
+        """
+        parts = [float(part) for part in (value.split(",") if isinstance(value, str) else value)]
+        if len(parts) != 4:
+            raise ValueError("bounds must be lat1,lon1,lat2,lon2")
+        lat1, lon1, lat2, lon2 = parts
+        bounds = cls(min(lat1, lat2), min(lon1, lon2), max(lat1, lat2), max(lon1, lon2))
+        if not (-90 <= bounds.min_lat < bounds.max_lat <= 90 and -180 <= bounds.min_lon < bounds.max_lon <= 180):
+            raise ValueError("bounds must span a non-empty area within -90..90, -180..180")
+        return bounds
+    
+    @classmethod
+    def around(cls, lat: float, lon: float, width_m: float, height_m: float) -> "GeoBounds":
+        """Extent of a frame centered on (lat, lon) covering width_m x height_m on the ground"""
+        half_lat = height_m / 2 / METERS_PER_DEGREE
+        half_lon = width_m / 2 / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+        return cls(lat - half_lat, lon - half_lon, lat + half_lat, lon + half_lon)
+
+def parse_time(value) -> Optional[float]:
+    """Unix seconds from a number, a numeric string or an ISO 8601 date/time (UTC unless it has an offset)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+def project(result: Dict[str, Any], bounds: GeoBounds) -> Dict[str, np.ndarray]:
+    """
+    Project the pixel boxes of one detection result onto the frame's geo bounds
+    
+    Pixel x runs west to east and pixel y north to south, so a box maps
+    linearly onto longitude and (inverted) latitude; at drone and satellite
+    tile sizes the error of treating degrees as linear is negligible.
+    
+    Args:
+        result: Detection result in the "detections" or columnar layout, with image_width/image_height
+        bounds: Geographic extent of the whole frame
+    
+    Returns:
+        Arrays "min_lat", "max_lat", "min_lon", "max_lon", "lat", "lon" (box centers),
+        "confidence" and "class_name"
+    """
+    if "boxes" in result:
+        boxes = np.asarray(result["boxes"], dtype=np.float64).reshape(-1, 4)
+        confidence = np.asarray(result["scores"], dtype=np.float64)
+        names = np.asarray(result["class_names"], dtype=object)[np.asarray(result["class_ids"], dtype=np.intp)]
+    else:
+        detections = result.get("detections", [])
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float64).reshape(-1, 4)
+        confidence = np.array([d["confidence"] for d in detections], dtype=np.float64)
+        names = np.array([d["class_name"] for d in detections], dtype=object)
+    
+    lon_per_px = (bounds.max_lon - bounds.min_lon) / result["image_width"]
+    lat_per_px = (bounds.max_lat - bounds.min_lat) / result["image_height"]
+    x, y, width, height = boxes.T
+    min_lon = bounds.min_lon + x * lon_per_px
+    max_lon = min_lon + width * lon_per_px
+    max_lat = bounds.max_lat - y * lat_per_px
+    min_lat = max_lat - height * lat_per_px
+    return {
+        "min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon,
+        "lat": (min_lat + max_lat) / 2, "lon": (min_lon + max_lon) / 2,
+        "confidence": confidence, "class_name": names,
+    }
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (vectorized over NumPy arrays)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class DetectionStore:
+    """
+    Embedded store of geo-referenced detections
+    
+    Each detection is one row (center, time, class, confidence, frame) plus
+    its footprint in an R-tree, so area queries touch only the index pages
+    that overlap the area; time windows use a B-tree index on the timestamp.
+    
+    Writes are buffered: `add` only queues rows, and a writer thread commits
+    whatever has accumulated as one transaction once `batch_size` rows are
+    waiting or `flush_interval_s` has passed. Row ids are assigned by that
+    single writer, so the table and the R-tree are filled with executemany
+    instead of one statement per row. The database runs in WAL mode, so
+    queries read from their own connections while the writer commits.
+    """
+    
+    def __init__(self, path: str, batch_size: int = 500, flush_interval_s: float = 0.2):
+        """
+        Open (or create) the store and start its writer thread
+        
+        Args:
+            path: SQLite database file
+            batch_size: Rows that trigger a commit
+            flush_interval_s: Longest time a queued row waits for its commit
+        """
+        self.path = str(path)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = flush_interval_s
+        
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._next_id = (self._writer.execute("SELECT MAX(id) FROM detections").fetchone()[0] or 0) + 1
+        
+        self._queue: "queue.Queue[Optional[list]]" = queue.Queue()
+        self._readers = threading.local()
+        self._flushed = threading.Condition()
+        self._enqueued = 0
+        self._committed = 0
+        
+        # Statistics
+        self.commits = 0
+        self.rows_written = 0
+        self.commit_ms_total = 0.0
+        self.last_error: Optional[str] = None
+        
+        self._thread = threading.Thread(target=self._run, name="geostore-writer", daemon=True)
+        self._thread.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Commits survive a process crash; only a power loss can drop the last ones
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read connection"""
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = self._readers.connection = self._connect()
+        return connection
+    
+    def add(self, result: Dict[str, Any], bounds: GeoBounds, ts: Optional[float] = None,
+            frame: Optional[str] = None) -> int:
+        """
+        Queue the detections of one frame for storage
+        
+        Args:
+            result: Detection result (either layout) with image_width/image_height
+            bounds: Geographic extent of the frame
+            ts: Capture time in Unix seconds (default: now)
+            frame: Optional frame identifier (e.g. the file name)
+        
+        Returns:
+            Number of detections queued
+        """
+        geo = project(result, bounds)
+        count = len(geo["lat"])
+        if count:
+            ts = time.time() if ts is None else ts
+            rows = list(zip(
+                geo["lat"].tolist(), geo["lon"].tolist(), geo["class_name"].tolist(),
+                geo["confidence"].tolist(), geo["min_lat"].tolist(), geo["max_lat"].tolist(),
+                geo["min_lon"].tolist(), geo["max_lon"].tolist(),
+            ))
+            with self._flushed:
+                self._enqueued += 1
+                self._queue.put((ts, frame, rows))
+        return count
+    
+    def _run(self):
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                break
+            pending, rows = [item], len(item[2])
+            # Collect until the batch is full or the first row has waited long enough
+            deadline = time.monotonic() + self.flush_interval_s
+            while rows < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                pending.append(item)
+                rows += len(item[2])
+            self._commit(pending)
+        self._writer.close()
+    
+    def _commit(self, items: List[tuple]):
+        start = time.perf_counter()
+        rows, boxes = [], []
+        row_id = self._next_id
+        for ts, frame, detections in items:
+            for lat, lon, name, confidence, min_lat, max_lat, min_lon, max_lon in detections:
+                rows.append((row_id, ts, lat, lon, name, confidence, frame))
+                boxes.append((row_id, min_lat, max_lat, min_lon, max_lon))
+                row_id += 1
+        try:
+            with self._writer:
+                self._writer.executemany("INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._writer.executemany("INSERT INTO detections_rtree VALUES (?, ?, ?, ?, ?)", boxes)
+            self._next_id = row_id
+            self.commits += 1
+            self.rows_written += len(rows)
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+            print(f"Geo store commit of {len(rows)} detections failed: {e}")
+        self.commit_ms_total += (time.perf_counter() - start) * 1000
+        with self._flushed:
+            self._committed += len(items)
+            self._flushed.notify_all()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is committed; returns False on timeout"""
+        target = self._enqueued
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._committed >= target, timeout)
+    
+    def close(self):
+        """Commit what is queued and stop the writer"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+    
+    @staticmethod
+    def _filters(start: Optional[float], end: Optional[float], classes: Optional[Sequence[str]],
+                 min_confidence: Optional[float]):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("d.ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("d.ts < ?")
+            params.append(end)
+        if classes:
+            clauses.append(f"d.class_name IN ({','.join('?' * len(classes))})")
+            params.extend(classes)
+        if min_confidence is not None:
+            clauses.append("d.confidence >= ?")
+            params.append(min_confidence)
+        return clauses, params
+    
+    def _select(self, bounds: Optional[GeoBounds], clauses: List[str], params: List[Any], limit: int):
+        if bounds is not None:
+            # Footprints overlapping the area, found through the R-tree; CROSS JOIN keeps
+            # SQLite from walking a wide time range and probing the R-tree per row instead
+            sql = ("SELECT d.id, d.ts, d.lat, d.lon, d.class_name, d.confidence, d.frame "
+                   "FROM detections_rtree r CROSS JOIN detections d ON d.id = r.id "
+                   "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?")
+            params = [bounds.min_lat, bounds.max_lat, bounds.min_lon, bounds.max_lon] + params
+        else:
+            sql = "SELECT d.id, d.ts, d.lat, d.lon, d.class_name, d.confidence, d.frame FROM detections d WHERE 1"
+        sql += "".join(f" AND {clause}" for clause in clauses) + " ORDER BY d.ts DESC LIMIT ?"
+        return self._reader().execute(sql, params + [limit]).fetchall()
+    
+    @staticmethod
+    def _rows(rows) -> List[Dict[str, Any]]:
+        return [
+            {"id": row_id, "time": ts, "lat": lat, "lon": lon, "class_name": name, "confidence": confidence,
+             "frame": frame}
+            for row_id, ts, lat, lon, name, confidence, frame in rows
+        ]
+    
+    def query(self, bounds: Optional[GeoBounds] = None, start: Optional[float] = None, end: Optional[float] = None,
+              classes: Optional[Sequence[str]] = None, min_confidence: Optional[float] = None,
+              limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Detections whose footprint overlaps bounds and whose time is in [start, end), newest first
+        
+        Any filter may be omitted; without bounds the time index drives the query.
+        """
+        clauses, params = self._filters(start, end, classes, min_confidence)
+        return self._rows(self._select(bounds, clauses, params, limit))
+    
+    def query_radius(self, lat: float, lon: float, radius_m: float, start: Optional[float] = None,
+                     end: Optional[float] = None, classes: Optional[Sequence[str]] = None,
+                     min_confidence: Optional[float] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Detections whose center lies within radius_m of (lat, lon), nearest first
+        
+        The R-tree narrows the search to the bounding box of the circle; exact
+        great-circle distances are then computed for those candidates only.
+        """
+        box = GeoBounds.around(lat, lon, 2 * radius_m, 2 * radius_m)
+        clauses, params = self._filters(start, end, classes, min_confidence)
+        clauses.append("d.lat BETWEEN ? AND ? AND d.lon BETWEEN ? AND ?")
+        params.extend([box.min_lat, box.max_lat, box.min_lon, box.max_lon])
+        rows = self._select(box, clauses, params, -1)
+        if not rows:
+            return []
+        
+        distances = haversine_m(lat, lon, np.array([row[2] for row in rows]), np.array([row[3] for row in rows]))
+        order = np.argsort(distances, kind="stable")
+        order = order[distances[order] <= radius_m][:limit]
+        results = self._rows([rows[i] for i in order])
+        for result, distance in zip(results, distances[order].tolist()):
+            result["distance_m"] = round(distance, 2)
+        return results
+    
+    def grid(self, bounds: GeoBounds, cells: int = 64, start: Optional[float] = None, end: Optional[float] = None,
+             classes: Optional[Sequence[str]] = None, min_confidence: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Detection counts on a cells x cells grid over bounds, for heat maps and map clustering
+        
+        Aggregation runs inside SQLite over the R-tree matches, so only
+        non-empty cells (count, mean position, mean confidence) are returned
+        however many detections they hold.
+        """
+        cells = max(1, min(int(cells), 1024))
+        cell_lat = (bounds.max_lat - bounds.min_lat) / cells
+        cell_lon = (bounds.max_lon - bounds.min_lon) / cells
+        clauses, params = self._filters(start, end, classes, min_confidence)
+        clauses.append("d.lat BETWEEN ? AND ? AND d.lon BETWEEN ? AND ?")
+        params.extend([bounds.min_lat, bounds.max_lat, bounds.min_lon, bounds.max_lon])
+        sql = ("SELECT MIN(CAST((d.lat - ?) / ? AS INTEGER), ?) AS row, MIN(CAST((d.lon - ?) / ? AS INTEGER), ?) AS col, "
+               "COUNT(*), AVG(d.lat), AVG(d.lon), AVG(d.confidence) "
+               "FROM detections_rtree r CROSS JOIN detections d ON d.id = r.id "
+               "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?"
+               + "".join(f" AND {clause}" for clause in clauses) + " GROUP BY row, col")
+        rows = self._reader().execute(sql, [
+            bounds.min_lat, cell_lat, cells - 1, bounds.min_lon, cell_lon, cells - 1,
+            bounds.min_lat, bounds.max_lat, bounds.min_lon, bounds.max_lon, *params,
+        ]).fetchall()
+        return {
+            "bounds": list(bounds),
+            "cells": cells,
+            "cell_size_deg": [cell_lat, cell_lon],
+            "total": sum(row[2] for row in rows),
+            "grid": [
+                {"row": row, "col": col, "count": count, "lat": lat, "lon": lon, "mean_confidence": confidence}
+                for row, col, count, lat, lon, confidence in rows
+            ],
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "rows_written": self.rows_written,
+            "pending_frames": self._enqueued - self._committed,
+            "commits": self.commits,
+            "mean_commit_ms": round(self.commit_ms_total / self.commits, 2) if self.commits else None,
+            "last_error": self.last_error,
+        }
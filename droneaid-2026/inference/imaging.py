@@ -0,0 +1,167 @@
+"""
+DroneAid 2026 - Image Decoding
+Helpers for turning uploaded bytes into OpenCV images
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from metrics import stage_timer
+
+def decode_image(data) -> np.ndarray:
+    """
+    Decode encoded image bytes (JPEG, PNG) into an OpenCV image
+    
+    Args:
+        data: Encoded image as bytes or any buffer-protocol object
+    
+    Returns:
+        OpenCV image (BGR format)
+    
+    Raises:
+        ValueError: If the data cannot be decoded as an image
+    """
+    return _imdecode(data, cv2.IMREAD_COLOR)
+
+def decode_preview(data) -> np.ndarray:
+    """
+    Decode a grayscale preview at 1/8 scale (JPEG DCT scaling skips most of the decode work)
+    
+    Raises:
+        ValueError: If the data cannot be decoded as an image
+    """
+    return _imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+
+def _imdecode(data, flags: int) -> np.ndarray:
+    """Decode with OpenCV, recording the time as the "decode" stage"""
+    buffer = np.frombuffer(data, np.uint8)
+    if not buffer.size:
+        raise ValueError("Invalid image data")
+    
+    with stage_timer("decode"):
+        try:
+            image = cv2.imdecode(buffer, flags)
+        except cv2.error:
+            # OpenCV asserts instead of returning None on some malformed input
+            image = None
+    
+    if image is None:
+        raise ValueError("Invalid image data")
+    
+    return image
+
+# Reduced-size decode flags; JPEG uses libjpeg DCT scaling for these
+_REDUCED_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+# JPEG start-of-frame markers (SOF0-SOF15, excluding DHT, JPG and DAC)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """
+    Read the pixel size of a JPEG from its frame header without decoding it
+    
+    Args:
+        data: Encoded image as bytes or any buffer-protocol object
+    
+    Returns:
+        (width, height) as stored in the file, or None if data is not a readable JPEG
+    """
+    data = memoryview(data)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        if marker == 0xD9 or marker == 0xDA:  # End of image / start of scan
+            return None
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    
+    return None
+
+def reduction_factor(width: int, height: int, target_size: int) -> int:
+    """Largest supported reduction that keeps the long side at or above target_size"""
+    for factor in sorted(_REDUCED_FLAGS, reverse=True):
+        if max(width, height) // factor >= target_size:
+            return factor
+    return 1
+
+def decode_for_model(data, target_size: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Decode an image at the smallest size the model can use without losing detail
+    
+    The model letterboxes every input to `target_size`, so decoding a 20MP
+    JPEG at full resolution only to shrink it again wastes time and memory.
+    JPEGs whose long side is at least twice the target are decoded at 1/2,
+    1/4 or 1/8 scale through libjpeg DCT scaling; other images are decoded
+    normally.
+    
+    Args:
+        data: Encoded image as bytes or any buffer-protocol object
+        target_size: Model input size (long side); 0 disables reduced decoding
+    
+    Returns:
+        Tuple of (OpenCV image (BGR format), original (width, height) after EXIF orientation)
+    
+    Raises:
+        ValueError: If the data cannot be decoded as an image
+    """
+    size = jpeg_size(data) if target_size > 0 else None
+    factor = reduction_factor(*size, target_size) if size else 1
+    
+    if factor == 1:
+        image = decode_image(data)
+        return image, (image.shape[1], image.shape[0])
+    
+    image = _imdecode(data, _REDUCED_FLAGS[factor])
+    
+    width, height = size
+    if (image.shape[1] > image.shape[0]) != (width > height) and width != height:
+        # EXIF orientation rotated the image by 90 degrees during decode
+        width, height = height, width
+    return image, (width, height)
+
+def restore_scale(result: Dict[str, Any], decoded_shape: Tuple[int, ...], original_size: Tuple[int, int]) -> Dict[str, Any]:
+    """
+    Map a detection result from a reduced decode back to original image pixels
+    
+    Args:
+        result: Detection result computed on the reduced image
+        decoded_shape: Shape of the reduced image that was run through the model
+        original_size: Original (width, height) returned by `decode_for_model`
+    
+    Returns:
+        The result with bounding boxes and image size in original pixels
+    """
+    width, height = original_size
+    scale_x = width / decoded_shape[1]
+    scale_y = height / decoded_shape[0]
+    if scale_x == 1 and scale_y == 1:
+        return result
+    
+    if "boxes" in result:
+        # Columnar result: scale all boxes at once
+        if result["boxes"]:
+            result["boxes"] = (np.asarray(result["boxes"]) * [scale_x, scale_y, scale_x, scale_y]).tolist()
+    for detection in result.get("detections", ()):
+        x, y, w, h = detection["bbox"]
+        detection["bbox"] = [x * scale_x, y * scale_y, w * scale_x, h * scale_y]
+    
+    result["image_width"] = width
+    result["image_height"] = height
+    return result
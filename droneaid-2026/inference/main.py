@@ -3,19 +3,219 @@ DroneAid 2026 - Inference Service
 FastAPI-based REST API for DroneAid symbol detection
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import time
+
+# Start of the cold-start profile reported by /ready
+_IMPORT_START = time.perf_counter()
+
+from fastapi import Depends, FastAPI, File, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import cv2
-import numpy as np
-from PIL import Image
-import io
-import base64
+from typing import List, Literal, Optional, Union
+import json
+import os
+import asyncio
+import binascii
+import hmac
+import tempfile
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from functools import partial
 from pathlib import Path
 
 from model import DroneAidDetector
+from batching import MicroBatcher
+from imaging import decode_for_model, decode_image, restore_scale
+from workers import InferencePool, QueueFullError, detect_bytes
+from streaming import FrameSession
+from tracking import DetectionTracker
+from gating import MotionGate, decode_with_thumbnail, thumbnail_bytes
+from payloads import PayloadTooLargeError, decode_base64, read_body, split_base64_json
+from archives import archive_sources, file_source, is_archive
+from cache import ResultCache, content_key, filter_result
+from geostore import DetectionStore, GeoBounds, parse_time
+from metrics import (CONTENT_TYPE, QUEUE_DEPTH, REGISTRY, MetricsMiddleware, count_detections,
+                     record_stages, stage_timer)
+from registry import ModelRegistry, watch_model_file
+from startup import StartupState, parse_shapes
+
+startup = StartupState(_IMPORT_START)
+startup.record("import", time.perf_counter() - _IMPORT_START)
+
+# The model is loaded and warmed up after the server starts (see load_and_warm_up)
+MODEL_FILE = DroneAidDetector.find_model()
+detector = DroneAidDetector(MODEL_FILE, load=False)
+
+# Bounded worker pool: decode and inference never run on the event loop
+pool = InferencePool(
+    mode=os.getenv("INFERENCE_EXECUTOR", "thread"),
+    max_workers=int(os.getenv("INFERENCE_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("INFERENCE_QUEUE_SIZE", "32")),
+    model_path=MODEL_FILE,
+)
+
+# Micro-batching: concurrent requests are coalesced into one forward pass
+batcher = MicroBatcher(
+    detector,
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "8")),
+    max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "5")),
+    executor=pool.executor if pool.mode == "thread" else None,
+)
+
+# Sliced inference settings for large aerial frames (/detect?tiled=true)
+TILING = {
+    "tile_size": int(os.getenv("TILE_SIZE", "640")),
+    "overlap": float(os.getenv("TILE_OVERLAP", "0.2")),
+    "batch_size": int(os.getenv("TILE_BATCH_SIZE", "8")),
+    "max_tiles": int(os.getenv("TILE_MAX_TILES", "64")),
+}
+
+# Cross-frame tracking of streamed detections (/ws/detect?track=true)
+TRACKING = {
+    "iou_threshold": float(os.getenv("TRACK_IOU_THRESHOLD", "0.3")),
+    "max_distance": float(os.getenv("TRACK_MAX_DISTANCE", "2.0")),
+    "max_age": int(os.getenv("TRACK_MAX_AGE", "30")),
+    "min_hits": int(os.getenv("TRACK_MIN_HITS", "2")),
+    "change_iou": float(os.getenv("TRACK_CHANGE_IOU", "0")),
+}
+
+# Motion gating of streamed frames (/ws/detect?gate=true)
+GATING = {
+    "threshold": float(os.getenv("GATE_THRESHOLD", "0.025")),
+    "refresh_frames": int(os.getenv("GATE_REFRESH_FRAMES", "10")),
+}
+
+# Decode JPEGs at reduced size down to this long side (0 disables; default: input size of the serving model,
+# updated whenever the serving model changes)
+DECODE_TARGET_SIZE_SETTING = int(os.getenv("DECODE_TARGET_SIZE")) if os.getenv("DECODE_TARGET_SIZE") else None
+DECODE_TARGET_SIZE = DECODE_TARGET_SIZE_SETTING
+
+# Warm-up run before /ready reports ready: frame sizes such as "1920x1080,640x640"
+# (default: the model input size) at single and full micro-batch sizes
+WARMUP = {
+    "shapes": parse_shapes(os.getenv("WARMUP_SHAPES", "")) or None,
+    "batch_sizes": sorted({1, batcher.max_batch_size}) if pool.mode == "thread" else [1],
+    "runs": int(os.getenv("WARMUP_RUNS", "2")),
+}
+
+# Serving model plus optional A/B candidate; models can be swapped without a restart
+models = ModelRegistry(detector, warmup=WARMUP)
+
+# Content-addressed cache of detection results
+cache = ResultCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    ttl_s=float(os.getenv("CACHE_TTL_S", "300")),
+)
+
+# Optional threshold to run cache misses at, so later requests at higher thresholds hit
+CACHE_BASE_CONF = float(os.getenv("CACHE_BASE_CONF")) if os.getenv("CACHE_BASE_CONF") else None
+
+# Maximum number of images accepted by one /detect/batch request
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "1000"))
+
+# Reload the model automatically when its file changes
+MODEL_WATCH = os.getenv("MODEL_WATCH", "0") == "1"
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "5"))
+
+# Token required in the X-Admin-Token header of /admin requests (unset: no check)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Geo-referenced detection store (unset GEOSTORE_PATH: disabled)
+GEOSTORE_PATH = os.getenv("GEOSTORE_PATH")
+geostore = DetectionStore(
+    GEOSTORE_PATH,
+    batch_size=int(os.getenv("GEOSTORE_BATCH_SIZE", "500")),
+    flush_interval_s=float(os.getenv("GEOSTORE_FLUSH_MS", "200")) / 1000,
+) if GEOSTORE_PATH else None
+
+# Maximum number of detections returned by one /geo/detections query
+GEO_MAX_RESULTS = int(os.getenv("GEO_MAX_RESULTS", "100000"))
+
+async def reload_model(model_path: Optional[str] = None):
+    """
+    Load and warm up a model in the background, then swap it in for new requests
+    
+    A service whose startup failed (e.g. no model yet) becomes ready once a
+    reload succeeds.
+    """
+    if pool.mode == "process":
+        new = await models.reload(model_path, load=load_in_workers)
+    else:
+        new = await models.reload(model_path)
+    serve_model(new)
+    return new
+
+def serve_model(new: DroneAidDetector):
+    """Take a new serving model into use and report ready"""
+    global DECODE_TARGET_SIZE
+    if DECODE_TARGET_SIZE_SETTING is None:
+        # Reduced decodes must not go below what this model's input size needs
+        DECODE_TARGET_SIZE = new.input_size
+    if not startup.ready:
+        startup.mark_ready()
+
+async def load_in_workers(model_path: str) -> DroneAidDetector:
+    """
+    Replace the worker processes with ones serving model_path (process mode)
+    
+    Only the workers hold the model; the returned detector carries its
+    metadata for routing, the cache and /classes.
+    """
+    new = DroneAidDetector(load=False)
+    new.adopt(await pool.reload(model_path, WARMUP))
+    return new
+
+async def load_and_warm_up():
+    """
+    Load the model and run warm-up inferences, then report ready
+    
+    Runs after the server has started, so /health answers while the model
+    loads; /ready and the detection endpoints return 503 until this finishes.
+    """
+    try:
+        if MODEL_FILE is None:
+            raise FileNotFoundError("No model found; set MODEL_PATH")
+        if pool.mode == "process":
+            # Only the worker processes load the model; this process keeps its metadata,
+            # so the server does not hold one more copy of the weights than it has workers
+            with startup.phase("warmup"):
+                detector.adopt(await pool.warmup(WARMUP))
+        else:
+            await asyncio.to_thread(detector.load_model, MODEL_FILE)
+            startup.record("backend_import", detector.load_timings["import_s"])
+            startup.record("model_load", detector.load_timings["load_s"])
+            with startup.phase("warmup"):
+                startup.record("first_inference", await asyncio.to_thread(partial(detector.warmup, **WARMUP)))
+        serve_model(detector)
+    except Exception as e:
+        if not startup.ready:
+            # Unless a reload already brought up another model meanwhile
+            startup.mark_failed(str(e))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the application"""
+    await batcher.start()
+    loader = asyncio.create_task(load_and_warm_up())
+    watcher = None
+    if MODEL_WATCH and MODEL_FILE:
+        watcher = asyncio.create_task(watch_model_file(MODEL_FILE, reload_model, MODEL_WATCH_INTERVAL_S))
+    yield
+    loader.cancel()
+    if watcher is not None:
+        watcher.cancel()
+    await batcher.stop()
+    pool.shutdown()
+    if geostore is not None:
+        # Commits the detections still queued
+        await asyncio.to_thread(geostore.close)
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response that records rendering time as the "serialize" stage"""
+    
+    def render(self, content) -> bytes:
+        with stage_timer("serialize"):
+            return super().render(content)
 
 # Initialize FastAPI app with increased body size limit
 app = FastAPI(
@@ -23,9 +223,14 @@ app = FastAPI(
     description="Real-time detection API for DroneAid disaster response symbols",
     version="2.0.0",
     # Increase max request body size to 50MB
-    max_request_size=50 * 1024 * 1024
+    max_request_size=50 * 1024 * 1024,
+    default_response_class=TimedJSONResponse,
+    lifespan=lifespan
 )
 
+# Request counters, latency and in-flight gauge for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -35,9 +240,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize model
-detector = DroneAidDetector()
-
 # Response models
 class Detection(BaseModel):
     class_name: str
@@ -49,12 +251,163 @@ class DetectionResponse(BaseModel):
     image_width: int
     image_height: int
     processing_time_ms: float
+    cached: bool = False  # Served from the result cache
 
 class HealthResponse(BaseModel):
     status: str
+    ready: bool
     model_loaded: bool
     model_path: Optional[str]
 
+class ReloadRequest(BaseModel):
+    model_path: Optional[str] = None  # Defaults to the standard model search
+
+class CandidateRequest(BaseModel):
+    model_path: Optional[str] = None  # Omit to only change the traffic split
+    percent: float = 10.0
+
+class GeoFrame(BaseModel):
+    bounds: List[float]  # [lat1, lon1, lat2, lon2] of the whole frame
+    image_width: int
+    image_height: int
+    detections: List[Detection]
+    captured_at: Optional[Union[float, str]] = None  # Unix seconds or ISO 8601; default: now
+    frame: Optional[str] = None
+
+class GeoIngestRequest(BaseModel):
+    frames: List[GeoFrame]
+
+async def run_detection(contents, conf_threshold: float, tiled: bool = False, columnar: bool = False,
+                        decoded=None, admitted: bool = False):
+    """
+    Decode and detect on the worker pool, subject to admission control
+    
+    Results are served from the content-addressed cache when the same image
+    bytes were already processed by the current model at the same or a lower
+    threshold; such results carry "cached": true and the time of the lookup
+    as processing_time_ms. Tiled requests are already batched internally, so
+    they bypass the micro-batcher and run directly on the pool. With
+    columnar=True the result holds parallel arrays instead of detection objects.
+    
+    Each request runs on the model picked by the registry; requests routed to
+    an A/B candidate bypass the cache so its statistics reflect real work.
+    
+    `decoded` is the (image, original size) pair `decode_for_model` returned
+    for these bytes, if the caller already decoded them; thread mode then
+    skips its own decode. `admitted` means the caller already holds an
+    admission slot covering this call (as /detect/batch does for all its images).
+    
+    Raises:
+        QueueFullError: If the pool is at capacity
+        ValueError: If the bytes are not a decodable image
+    """
+    detector = models.select()
+    key = None
+    if cache.enabled and not models.is_candidate(detector):
+        lookup_start = time.perf_counter()
+        variant = "+".join(name for name, enabled in (("tiled", tiled), ("columnar", columnar)) if enabled)
+        if len(contents) > 256 * 1024:
+            key = await asyncio.to_thread(content_key, contents, variant)
+        else:
+            key = content_key(contents, variant)
+        
+        cached = cache.get(key, conf_threshold, detector.model_id)
+        if cached is not None:
+            # Report what this request cost, not the time of the inference that produced the entry
+            cached["processing_time_ms"] = round((time.perf_counter() - lookup_start) * 1000, 2)
+            cached["cached"] = True
+            count_detections(cached)
+            return cached
+    
+    run_conf = conf_threshold
+    if key is not None and CACHE_BASE_CONF is not None:
+        run_conf = min(conf_threshold, CACHE_BASE_CONF)
+    
+    async with nullcontext() if admitted else pool.admit():
+        start = time.perf_counter()
+        try:
+            if pool.mode == "process":
+                # Buffers are copied to the worker process anyway; memoryviews cannot be pickled
+                results, stages = await pool.run(detect_bytes, bytes(contents), run_conf,
+                                                 TILING if tiled else None, DECODE_TARGET_SIZE, columnar)
+                record_stages(stages)
+            elif tiled:
+                # Sliced inference needs the full-resolution frame
+                image = await pool.run(decode_image, contents)
+                results = await pool.run(partial(detector.detect_tiled, columnar=columnar, **TILING),
+                                         image, run_conf)
+            else:
+                image, original_size = decoded or await pool.run(decode_for_model, contents, DECODE_TARGET_SIZE)
+                results = await batcher.submit(image, conf_threshold=run_conf, columnar=columnar,
+                                               detector=detector)
+                results = restore_scale(results, image.shape, original_size)
+        except ValueError:
+            raise
+        except Exception:
+            models.record(detector, (time.perf_counter() - start) * 1000)
+            raise
+        models.record(detector, (time.perf_counter() - start) * 1000, results)
+    
+    if key is not None:
+        cache.put(key, run_conf, detector.model_id, results)
+    
+    if run_conf < conf_threshold:
+        results = filter_result(results, conf_threshold)
+    count_detections(results)
+    return results
+
+def detection_response(results) -> TimedJSONResponse:
+    """
+    Send detection results without validating them against DetectionResponse
+    
+    The detector already builds results in the documented layout; running
+    every detection back through the Pydantic model only adds latency.
+    """
+    return TimedJSONResponse(results)
+
+def require_ready():
+    """Reject detection requests until the model is loaded and warmed up"""
+    if not startup.ready:
+        raise HTTPException(status_code=503, detail="Model is not ready", headers={"Retry-After": "5"})
+
+def require_admin(request: Request):
+    """Reject /admin requests without the configured ADMIN_TOKEN"""
+    if ADMIN_TOKEN and not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def geo_reference(bounds, captured_at=None):
+    """
+    Parse the optional geo-referencing of a detection request
+    
+    Returns:
+        (GeoBounds, capture time) to store the detections with, or None when no bounds were given
+    
+    Raises:
+        HTTPException: 400 if bounds are given while the store is disabled, or are invalid
+    """
+    if bounds is None:
+        return None
+    if geostore is None:
+        raise HTTPException(status_code=400, detail="Geo store is disabled; set GEOSTORE_PATH")
+    try:
+        return GeoBounds.parse(bounds), parse_time(captured_at)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bounds or captured_at: {e}")
+
+def store_detections(results, geo, frame: Optional[str] = None):
+    """Queue a frame's detections in the geo store (no-op without geo-referencing)"""
+    if geo is not None:
+        bounds, captured_at = geo
+        geostore.add(results, bounds, captured_at, frame)
+
+def queue_full_response(e: QueueFullError) -> HTTPException:
+    """Build the 503 returned when the inference queue is full"""
+    return HTTPException(
+        status_code=503,
+        detail="Inference queue is full, retry later",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 @app.get("/", response_model=dict)
 async def root():
     """Root endpoint with API information"""
@@ -64,8 +417,16 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "detect": "/detect (POST with image file)",
             "detect_base64": "/detect/base64 (POST with base64 image)",
+            "detect_raw": "/detect/raw (POST with raw image body)",
+            "detect_batch": "/detect/batch (POST with many images or a zip/tar archive)",
+            "detect_stream": "/ws/detect (WebSocket with binary JPEG frames)",
+            "geo_detections": "/geo/detections (GET by area, radius and time; POST to ingest)",
+            "geo_grid": "/geo/grid (GET detection counts per cell for heat maps)",
+            "stats": "/stats",
+            "admin_models": "/admin/models",
             "docs": "/docs"
         }
     }
@@ -73,81 +434,615 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health():
     """Health check endpoint"""
+    detector = models.primary
     return {
         "status": "healthy",
-        "model_loaded": detector.model is not None,
+        "ready": startup.ready,
+        "model_loaded": detector.model_id is not None,
         "model_path": str(detector.model_path) if detector.model_path else None
     }
 
-@app.post("/detect", response_model=DetectionResponse)
-async def detect_image(file: UploadFile = File(...), conf_threshold: float = 0.5):
+@app.get("/ready")
+async def ready():
+    """
+    Readiness check: 200 once the model is loaded and warmed up, 503 before
+    
+    The body carries the startup profile (seconds per phase).
+    """
+    return TimedJSONResponse(startup.to_dict(), status_code=200 if startup.ready else 503)
+
+@app.post("/detect", response_model=DetectionResponse, dependencies=[Depends(require_ready)])
+async def detect_image(file: UploadFile = File(...), conf_threshold: float = 0.5, tiled: bool = False,
+                       format: Literal["objects", "columnar"] = "objects", bounds: Optional[str] = None,
+                       captured_at: Optional[str] = None):
     """
     Detect DroneAid symbols in an uploaded image
     
     Args:
         file: Image file (JPEG, PNG)
         conf_threshold: Confidence threshold (0.0-1.0)
+        tiled: Use sliced inference for large aerial frames
+        format: "objects" (list of detections) or "columnar" (parallel arrays)
+        bounds: "lat1,lon1,lat2,lon2" of the frame; stores the detections in the geo store
+        captured_at: Capture time of the frame (Unix seconds or ISO 8601; default: now)
     
     Returns:
         Detection results with bounding boxes and classifications
     """
+    geo = geo_reference(bounds, captured_at)
     try:
         # Read image file
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        with stage_timer("read"):
+            contents = await file.read()
         
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image file")
+        # Decode and run detection off the event loop
+        results = await run_detection(contents, conf_threshold, tiled=tiled, columnar=format == "columnar")
+        store_detections(results, geo, file.filename)
         
-        # Run detection
-        results = detector.detect(image, conf_threshold=conf_threshold)
-        
-        return results
+        return detection_response(results)
         
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image file")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
-@app.post("/detect/base64", response_model=DetectionResponse)
-async def detect_base64(image_data: str, conf_threshold: float = 0.5):
+@app.post("/detect/base64", response_model=DetectionResponse, dependencies=[Depends(require_ready)])
+async def detect_base64(request: Request, image_data: Optional[str] = None, conf_threshold: float = 0.5,
+                        format: Literal["objects", "columnar"] = "objects", bounds: Optional[str] = None,
+                        captured_at: Optional[str] = None):
     """
     Detect DroneAid symbols in a base64-encoded image
     
+    The image is normally sent as a JSON body
+    ({"image_data": "...", "conf_threshold": 0.5, "format": "objects"}). The body is streamed into
+    one buffer and the base64 string is decoded from a view into it, so the
+    payload is never parsed as a Python string. Passing `image_data` in the
+    query string is still accepted for older clients.
+    
     Args:
-        image_data: Base64-encoded image string
+        request: Incoming request (JSON body)
+        image_data: Base64-encoded image string (deprecated query parameter)
         conf_threshold: Confidence threshold (0.0-1.0)
+        format: "objects" (list of detections) or "columnar" (parallel arrays)
+        bounds: "lat1,lon1,lat2,lon2" of the frame; stores the detections in the geo store
+        captured_at: Capture time of the frame (Unix seconds or ISO 8601; default: now)
     
     Returns:
         Detection results with bounding boxes and classifications
     """
     try:
-        # Decode base64 image
-        if ',' in image_data:  # Handle data URL format
-            image_data = image_data.split(',')[1]
+        with stage_timer("read"):
+            if image_data is not None:
+                encoded = memoryview(image_data.encode("ascii"))
+            else:
+                body = await read_body(request)
+                try:
+                    encoded, fields = split_base64_json(body)
+                except ValueError as e:
+                    # Not the image: a bad body must not be reported as "Invalid image data"
+                    raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+                if encoded is None:
+                    raise HTTPException(status_code=400, detail="Missing image_data")
+                try:
+                    conf_threshold = float(fields.get("conf_threshold", conf_threshold))
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="conf_threshold must be a number")
+                format = fields.get("format", format)
+                if format not in ("objects", "columnar"):
+                    raise HTTPException(status_code=400, detail="format must be 'objects' or 'columnar'")
+                bounds = fields.get("bounds", bounds)
+                captured_at = fields.get("captured_at", captured_at)
+            geo = geo_reference(bounds, captured_at)
+            
+            # Decode base64 image (data URL prefixes are handled) off the event loop
+            image_bytes = await asyncio.to_thread(decode_base64, encoded)
+        
+        # Decode and run detection off the event loop
+        results = await run_detection(image_bytes, conf_threshold, columnar=format == "columnar")
+        store_detections(results, geo)
         
-        image_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        return detection_response(results)
         
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image data")
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    except PayloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Invalid base64 data")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image data")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+@app.post("/detect/raw", response_model=DetectionResponse, dependencies=[Depends(require_ready)])
+async def detect_raw(request: Request, conf_threshold: float = 0.5, tiled: bool = False,
+                     format: Literal["objects", "columnar"] = "objects", bounds: Optional[str] = None,
+                     captured_at: Optional[str] = None):
+    """
+    Detect DroneAid symbols in a raw image body (Content-Type: application/octet-stream)
+    
+    The upload is streamed into a buffer preallocated from Content-Length and
+    decoded in place, without multipart parsing or base64 overhead.
+    
+    Args:
+        request: Incoming request whose body is the encoded image
+        conf_threshold: Confidence threshold (0.0-1.0)
+        tiled: Use sliced inference for large aerial frames
+        format: "objects" (list of detections) or "columnar" (parallel arrays)
+        bounds: "lat1,lon1,lat2,lon2" of the frame; stores the detections in the geo store
+        captured_at: Capture time of the frame (Unix seconds or ISO 8601; default: now)
+    
+    Returns:
+        Detection results with bounding boxes and classifications
+    """
+    geo = geo_reference(bounds, captured_at)
+    try:
+        with stage_timer("read"):
+            body = await read_body(request)
         
-        # Run detection
-        results = detector.detect(image, conf_threshold=conf_threshold)
+        # Decode and run detection off the event loop
+        results = await run_detection(body, conf_threshold, tiled=tiled, columnar=format == "columnar")
+        store_detections(results, geo)
         
-        return results
+        return detection_response(results)
         
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    except PayloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image data")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
+async def load_chunk(sources):
+    """
+    Read a chunk of batch sources and, in thread mode, decode them in parallel on the pool
+    
+    Returns:
+        (bytes, decoded) per source, where decoded is what `decode_for_model`
+        returned, the exception reading or decoding raised, or None in process mode
+    """
+    def read_all():
+        contents = []
+        for _, load in sources:
+            try:
+                contents.append(load())
+            except Exception as e:
+                # E.g. an archive member over the size limit; reported for that image only
+                contents.append(e)
+        return contents
+    
+    # Archive members share one file handle, so they are read sequentially
+    with stage_timer("read"):
+        contents = await asyncio.to_thread(read_all)
+    
+    async def decode(data):
+        if isinstance(data, Exception):
+            return b"", data
+        if pool.mode == "process":
+            return data, None
+        try:
+            return data, await pool.run(decode_for_model, data, DECODE_TARGET_SIZE)
+        except Exception as e:
+            return data, e
+    
+    return await asyncio.gather(*(decode(data) for data in contents))
+
+async def detect_chunk(loaded, conf_threshold: float):
+    """
+    Run detection on one loaded chunk, yielding (position, result) as results finish
+    
+    Each image goes through `run_detection` like a single-image request, so it
+    is routed by the model registry and served from the cache when possible;
+    in thread mode the images of a chunk reach the micro-batcher together and
+    share forward passes. A failing image yields an error record instead of
+    ending the stream.
+    """
+    async def detect_one(position, data, decoded):
+        try:
+            if isinstance(decoded, Exception):
+                raise decoded
+            # The whole batch request holds one admission slot
+            return position, await run_detection(data, conf_threshold, decoded=decoded, admitted=True)
+        except PayloadTooLargeError as e:
+            return position, {"error": str(e)}
+        except ValueError:
+            return position, {"error": "Invalid image data"}
+        except Exception as e:
+            return position, {"error": f"Detection failed: {e}"}
+    
+    for next_result in asyncio.as_completed([detect_one(i, *item) for i, item in enumerate(loaded)]):
+        yield await next_result
+
+@app.post("/detect/batch", dependencies=[Depends(require_ready)])
+async def detect_batch(files: List[UploadFile] = File(...), conf_threshold: float = 0.5):
+    """
+    Detect DroneAid symbols in many images with one request
+    
+    Accepts several image files and/or zip/tar archives of images. Images are
+    decoded in parallel and run through the model in batches; results are
+    streamed back as newline-delimited JSON, one line per image, as each
+    batch finishes.
+    
+    Args:
+        files: Image files (JPEG, PNG) and/or .zip/.tar archives of images
+        conf_threshold: Confidence threshold (0.0-1.0)
+    
+    Returns:
+        NDJSON stream of {"index", "filename", ...detection results or "error"}
+    """
+    cleanup = AsyncExitStack()
+    sources = []
+    
+    try:
+        for upload in files:
+            # Results are streamed after this handler returns, when FastAPI has
+            # already closed the uploads; keep the spooled files open ourselves
+            fileobj, upload.file = upload.file, tempfile.SpooledTemporaryFile()
+            cleanup.callback(fileobj.close)
+            
+            if is_archive(upload.filename):
+                sources.extend(await asyncio.to_thread(archive_sources, fileobj, upload.filename))
+            else:
+                sources.append(file_source(upload.filename, fileobj))
+        
+        if not sources:
+            raise HTTPException(status_code=400, detail="No images found in upload")
+        if len(sources) > BATCH_MAX_IMAGES:
+            raise HTTPException(status_code=413, detail=f"Too many images (maximum {BATCH_MAX_IMAGES})")
+        
+        # One admission slot covers the whole batch
+        await cleanup.enter_async_context(pool.admit())
+        
+    except BaseException as e:
+        await cleanup.aclose()
+        if isinstance(e, QueueFullError):
+            raise queue_full_response(e)
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise
+    
+    chunk_size = batcher.max_batch_size
+    chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+    
+    async def stream_results():
+        next_chunk = None
+        try:
+            offset = 0
+            next_chunk = asyncio.ensure_future(load_chunk(chunks[0]))
+            for k, chunk in enumerate(chunks):
+                loaded = await next_chunk
+                # Read and decode the next chunk while this one runs through the model
+                next_chunk = asyncio.ensure_future(load_chunk(chunks[k + 1])) if k + 1 < len(chunks) else None
+                
+                async for position, result in detect_chunk(loaded, conf_threshold):
+                    with stage_timer("serialize"):
+                        line = json.dumps({"index": offset + position, "filename": chunk[position][0], **result})
+                    yield line + "\n"
+                offset += len(chunk)
+        finally:
+            if next_chunk is not None:
+                next_chunk.cancel()
+            await cleanup.aclose()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.websocket("/ws/detect")
+async def detect_stream(websocket: WebSocket, conf_threshold: float = 0.5, track: bool = False,
+                        gate: bool = False):
+    """
+    Detect DroneAid symbols in a continuous stream of frames
+    
+    The client sends binary JPEG/PNG frames and receives one JSON result per
+    processed frame. Only the newest unprocessed frame is kept, so when
+    inference falls behind stale frames are dropped instead of queued.
+    A text message of the form {"conf_threshold": 0.6} updates the threshold.
+    
+    With track=true detections are followed across frames, and a message is
+    sent only for frames that start, change or end a track (see DetectionTracker).
+    
+    With gate=true frames that show the same scene as the last inferred frame
+    reuse its result instead of running the model (see MotionGate).
+    
+    Args:
+        websocket: WebSocket connection
+        conf_threshold: Initial confidence threshold (0.0-1.0)
+        track: Send track events instead of every frame's detections
+        gate: Skip inference while the scene does not change
+    """
+    if not startup.ready:
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    
+    await websocket.accept()
+    session = FrameSession()
+    settings = {"conf_threshold": conf_threshold}
+    tracker = DetectionTracker(**TRACKING) if track else None
+    motion_gate = MotionGate(**GATING) if gate else None
+    
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    session.offer(message["bytes"])
+                elif message.get("text"):
+                    try:
+                        settings["conf_threshold"] = float(json.loads(message["text"])["conf_threshold"])
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                    else:
+                        if motion_gate is not None:
+                            # The stored result was filtered at the old threshold
+                            motion_gate.reset()
+        finally:
+            session.close()
+    
+    receiver = asyncio.create_task(receive_frames())
+    
+    try:
+        while True:
+            frame = await session.next_frame()
+            if frame is None:
+                break
+            
+            sequence, data, received_at = frame
+            reused = False
+            if not len(data):
+                # Nothing to decode; answer without taking a worker slot
+                await websocket.send_json({"frame": sequence, "error": "Invalid image data"})
+                continue
+            try:
+                decoded = None
+                if motion_gate is not None:
+                    if pool.mode == "thread":
+                        # The model gets the same decode the thumbnail was taken from
+                        image, original_size, thumb = await pool.run(decode_with_thumbnail, data,
+                                                                     DECODE_TARGET_SIZE)
+                        decoded = (image, original_size)
+                    else:
+                        thumb = await pool.run(thumbnail_bytes, bytes(data))
+                    reused = not motion_gate.needs_inference(thumb)
+                
+                if reused:
+                    results = motion_gate.result
+                else:
+                    start = time.perf_counter()
+                    results = await run_detection(data, settings["conf_threshold"], decoded=decoded)
+                    if motion_gate is not None:
+                        motion_gate.record(thumb, results, sequence, (time.perf_counter() - start) * 1000)
+            except QueueFullError:
+                # Server is saturated: drop this frame and wait for a newer one
+                session.dropped += 1
+                continue
+            except ValueError:
+                await websocket.send_json({"frame": sequence, "error": "Invalid image data"})
+                continue
+            
+            session.mark_processed()
+            stats = session.stats()
+            if motion_gate is not None:
+                stats["gating"] = motion_gate.stats()
+            if tracker is not None:
+                # Reused frames hold no new information for the tracks
+                events = [] if reused else tracker.update(results, sequence)
+                if events:
+                    await websocket.send_json({
+                        "frame": sequence,
+                        "tracks": events,
+                        "counts": tracker.counts(),
+                        "latency_ms": round((time.monotonic() - received_at) * 1000, 2),
+                        "session": {**stats, "tracking": tracker.stats()}
+                    })
+                continue
+            
+            message = {"frame": sequence, **results}
+            if reused:
+                message["reused_from"] = motion_gate.result_frame
+            await websocket.send_json({
+                **message,
+                "latency_ms": round((time.monotonic() - received_at) * 1000, 2),
+                "session": stats
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+
+@app.get("/stats")
+async def get_stats():
+    """Get runtime statistics for tuning the inference pipeline"""
+    return {
+        "workers": pool.stats(),
+        "batching": batcher.stats(),
+        "cache": cache.stats(),
+        "models": models.stats(),
+        "geostore": geostore.stats() if geostore is not None else None,
+        "startup": startup.to_dict()
+    }
+
+def require_geostore():
+    """Reject /geo requests while the geo store is disabled"""
+    if geostore is None:
+        raise HTTPException(status_code=404, detail="Geo store is disabled; set GEOSTORE_PATH")
+
+def geo_filters(start: Optional[str], end: Optional[str], class_name: Optional[str]):
+    """Parse the time window and comma-separated class names shared by the /geo queries"""
+    try:
+        return {
+            "start": parse_time(start),
+            "end": parse_time(end),
+            "classes": [name for name in class_name.split(",") if name] if class_name else None,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {e}")
+
+def parse_area(bbox: str) -> GeoBounds:
+    try:
+        return GeoBounds.parse(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+
+@app.post("/geo/detections", dependencies=[Depends(require_geostore)])
+async def geo_ingest(body: GeoIngestRequest):
+    """
+    Store detections computed elsewhere (e.g. by an offline run) in the geo store
+    
+    Args:
+        body: {"frames": [{"bounds": [lat1, lon1, lat2, lon2], "image_width": ..., "image_height": ...,
+              "detections": [...], "captured_at": ..., "frame": "..."}]}
+    
+    Returns:
+        Number of frames and detections queued for the next batched commit
+    """
+    geo = [geo_reference(frame.bounds, frame.captured_at) for frame in body.frames]
+    stored = sum(
+        geostore.add(frame.model_dump(include={"image_width", "image_height", "detections"}), bounds, captured_at,
+                     frame.frame)
+        for frame, (bounds, captured_at) in zip(body.frames, geo)
+    )
+    return {"frames": len(body.frames), "detections": stored}
+
+@app.get("/geo/detections", dependencies=[Depends(require_geostore)])
+async def geo_query(bbox: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None,
+                    radius_m: Optional[float] = None, start: Optional[str] = None, end: Optional[str] = None,
+                    class_name: Optional[str] = None, min_confidence: Optional[float] = None, limit: int = 1000):
+    """
+    Query stored detections by area, distance and time
+    
+    With lat, lon and radius_m the detections within that distance are
+    returned nearest first; otherwise those overlapping bbox (or anywhere,
+    without bbox) newest first.
+    
+    Args:
+        bbox: "lat1,lon1,lat2,lon2" area
+        lat, lon, radius_m: Circle to search instead of bbox
+        start, end: Time window [start, end) (Unix seconds or ISO 8601)
+        class_name: Comma-separated class names to include
+        min_confidence: Minimum detection confidence
+        limit: Maximum number of detections (at most GEO_MAX_RESULTS)
+    """
+    filters = geo_filters(start, end, class_name)
+    limit = max(1, min(limit, GEO_MAX_RESULTS))
+    if lat is not None or lon is not None or radius_m is not None:
+        if lat is None or lon is None or radius_m is None or radius_m <= 0:
+            raise HTTPException(status_code=400, detail="Radius queries need lat, lon and a positive radius_m")
+        query = partial(geostore.query_radius, lat, lon, radius_m, min_confidence=min_confidence, limit=limit,
+                        **filters)
+    else:
+        area = parse_area(bbox) if bbox is not None else None
+        query = partial(geostore.query, area, min_confidence=min_confidence, limit=limit, **filters)
+    
+    detections = await asyncio.to_thread(query)
+    return {"count": len(detections), "detections": detections}
+
+@app.get("/geo/grid", dependencies=[Depends(require_geostore)])
+async def geo_grid(bbox: str, cells: int = 64, start: Optional[str] = None, end: Optional[str] = None,
+                   class_name: Optional[str] = None, min_confidence: Optional[float] = None):
+    """
+    Count stored detections on a cells x cells grid over bbox, for heat maps and map clustering
+    
+    Only non-empty cells are returned, each with its count, mean position and
+    mean confidence; the mean position is where a map cluster marker goes.
+    """
+    area = parse_area(bbox)
+    filters = geo_filters(start, end, class_name)
+    return await asyncio.to_thread(geostore.grid, area, cells, min_confidence=min_confidence, **filters)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Export request, stage latency and model metrics in the Prometheus text format"""
+    QUEUE_DEPTH.set(pool.queue_depth)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/classes")
 async def get_classes():
     """Get list of detectable symbol classes"""
+    detector = models.primary
     return {
         "classes": detector.class_names,
         "count": len(detector.class_names)
     }
 
+@app.get("/admin/models")
+async def get_models(request: Request):
+    """Get the serving and candidate models with per-model latency and detection counts"""
+    require_admin(request)
+    return models.stats()
+
+@app.post("/admin/reload")
+async def admin_reload(request: Request, body: Optional[ReloadRequest] = None):
+    """
+    Load a model in the background and swap it in without dropping requests
+    
+    The new model is warmed up before it takes traffic; requests already
+    running finish on the previous model.
+    
+    Args:
+        body: {"model_path": "..."}; omit to reload from the standard locations
+    """
+    require_admin(request)
+    try:
+        await reload_model(body.model_path if body else None)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+    return models.stats()
+
+@app.post("/admin/candidate")
+async def admin_candidate(request: Request, body: CandidateRequest):
+    """
+    Load a candidate model and route a percentage of requests to it
+    
+    Args:
+        body: {"model_path": "...", "percent": 10}; without model_path only the split changes
+    """
+    require_admin(request)
+    if pool.mode == "process":
+        raise HTTPException(status_code=400, detail="A/B routing requires INFERENCE_EXECUTOR=thread")
+    if not 0 <= body.percent <= 100:
+        raise HTTPException(status_code=400, detail="percent must be between 0 and 100")
+    
+    if body.model_path is None:
+        if models.candidate is None:
+            raise HTTPException(status_code=400, detail="No candidate model loaded")
+        models.set_split(body.percent)
+        return models.stats()
+    
+    try:
+        await models.load_candidate(body.model_path, body.percent)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Candidate load failed: {str(e)}")
+    return models.stats()
+
+@app.post("/admin/candidate/promote")
+async def admin_promote(request: Request):
+    """Make the candidate model the serving model"""
+    require_admin(request)
+    try:
+        serve_model(await models.promote())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return models.stats()
+
+@app.delete("/admin/candidate")
+async def admin_drop_candidate(request: Request):
+    """Stop routing traffic to the candidate model and unload it"""
+    require_admin(request)
+    models.drop_candidate()
+    return models.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
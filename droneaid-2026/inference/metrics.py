@@ -0,0 +1,256 @@
+"""
+DroneAid 2026 - Metrics
+Prometheus-style counters, gauges and histograms with text exposition
+"""
+
+import bisect
+import collections
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond decode to multi-second tiled frames
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class _Metric:
+    """Base class holding one value (or bucket set) per label combination"""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            # Unlabelled metrics are exported as 0 before their first update
+            items = [((), 0)]
+        for key, value in sorted(items):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    
+    kind = "counter"
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed cumulative buckets"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+    
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in sorted(items):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class Registry:
+    """Collection of metrics rendered together"""
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+    
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "droneaid_stage_duration_seconds",
+    "Time spent in each request pipeline stage (read, decode, preprocess, forward, postprocess, serialize)",
+    ("stage",),
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "droneaid_request_duration_seconds", "End-to-end HTTP request latency", ("endpoint",),
+))
+REQUESTS = REGISTRY.register(Counter(
+    "droneaid_requests_total", "HTTP requests by endpoint and status code", ("endpoint", "status"),
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "droneaid_requests_in_flight", "HTTP requests currently being handled",
+))
+DETECTIONS = REGISTRY.register(Counter(
+    "droneaid_detections_total", "Detections returned to clients by symbol class", ("class_name",),
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "droneaid_inference_queue_depth", "Requests admitted to the inference pool and not yet finished",
+))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    "droneaid_model_load_seconds", "Time taken by the most recent model load",
+))
+MODEL_LOADS = REGISTRY.register(Counter(
+    "droneaid_model_loads_total", "Model loads by backend", ("backend",),
+))
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    "droneaid_startup_seconds", "Duration of each startup phase of this process", ("phase",),
+))
+MODEL_RELOADS = REGISTRY.register(Counter(
+    "droneaid_model_reloads_total", "Background model reloads and candidate loads by result", ("result",),
+))
+
+# Per-thread buffer used to ship stage timings out of worker processes
+_capture = threading.local()
+
+def observe_stage(stage: str, seconds: float):
+    """Record the duration of one pipeline stage"""
+    buffer = getattr(_capture, "stages", None)
+    if buffer is not None:
+        buffer.append((stage, seconds))
+    else:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+def record_stages(stages: Iterable[Tuple[str, float]]):
+    """Record stage timings captured elsewhere (see `capture_stages`)"""
+    for stage, seconds in stages:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+@contextmanager
+def capture_stages():
+    """
+    Collect stage timings into a list instead of the registry
+    
+    Worker processes have their own registry that /metrics never sees; they
+    capture timings during a call and return them to the parent, which
+    passes them to `record_stages`.
+    """
+    previous = getattr(_capture, "stages", None)
+    _capture.stages = stages = []
+    try:
+        yield stages
+    finally:
+        _capture.stages = previous
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time the enclosed block as one pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+def count_detections(result: Optional[Dict[str, Any]]):
+    """Count the detections of one result (object or columnar layout) by class"""
+    result = result or {}
+    if "class_ids" in result:
+        names = [result["class_names"][class_id] for class_id in result["class_ids"]]
+    else:
+        names = [detection["class_name"] for detection in result.get("detections", ())]
+    for class_name, count in collections.Counter(names).items():
+        DETECTIONS.inc(count, class_name=class_name)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting HTTP requests by endpoint and status
+    
+    Latency covers the full response, including streamed bodies. Endpoints
+    are labelled with their route template (e.g. "/detect") rather than the
+    raw path, so unknown URLs cannot create unbounded label sets.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = {"code": 500}
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            REQUESTS.inc(endpoint=endpoint, status=status["code"])
@@ -4,24 +4,37 @@ Handles model loading and inference
 """
 
 import cv2
+import itertools
 import numpy as np
+import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import time
-from ultralytics import YOLO
+
+from metrics import MODEL_LOAD_SECONDS, MODEL_LOADS, observe_stage
+from tiling import merge_tile_predictions, tile_grid
+
+# Numbers every model load in this process, so each load gets its own model_id even when
+# a reload replaces the file with one of the same path and modification time
+_LOAD_SEQUENCE = itertools.count(1)
 
 class DroneAidDetector:
     """DroneAid symbol detector using YOLOv8"""
     
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, load: bool = True):
         """
         Initialize the detector
         
         Args:
             model_path: Path to the YOLO model (.pt or .onnx)
+            load: Load the model now; with False, call `load_model` later
         """
         self.model = None
         self.model_path = None
+        self.model_id = None
+        self._adopted_input_size: Optional[int] = None
+        self.backend = None
+        self.load_timings: Dict[str, float] = {}
         self.class_names = [
             'children',
             'elderly',
@@ -33,100 +46,377 @@ class DroneAidDetector:
             'water'
         ]
         
+        if not load:
+            return
+        
         # Try to load model
         if model_path is None:
-            # Search for model in standard locations
-            search_paths = [
-                './models/droneaid/weights/best.pt',
-                './models/best.pt',
-                './models/droneaid.pt',
-                '../training/models/droneaid/weights/best.pt',
-            ]
-            
-            for path in search_paths:
-                if Path(path).exists():
-                    model_path = path
-                    break
+            model_path = self.find_model()
         
         if model_path and Path(model_path).exists():
             self.load_model(model_path)
         else:
             print("Warning: No model found. Model will need to be loaded before inference.")
     
-    def load_model(self, model_path: str):
-        """Load a YOLO model"""
+    @staticmethod
+    def find_model() -> Optional[str]:
+        """
+        Search for a model in MODEL_PATH and the standard locations
+        
+        When the ONNX backend is requested through INFERENCE_BACKEND, an
+        exported .onnx file next to each candidate is preferred.
+        """
+        search_paths = [
+            os.getenv('MODEL_PATH'),
+            './models/droneaid/weights/best.pt',
+            './models/best.pt',
+            './models/droneaid.pt',
+            '../training/models/droneaid/weights/best.pt',
+        ]
+        prefer_onnx = os.getenv('INFERENCE_BACKEND', '').lower() == 'onnx'
+        
+        for path in filter(None, search_paths):
+            candidates = [Path(path).with_suffix('.onnx'), Path(path)] if prefer_onnx else [Path(path)]
+            for candidate in candidates:
+                if candidate.exists():
+                    return str(candidate)
+        
+        return None
+    
+    def load_model(self, model_path: str, backend: Optional[str] = None):
+        """
+        Load a YOLO model
+        
+        Args:
+            model_path: Path to the YOLO model (.pt or .onnx)
+            backend: "onnx" or "ultralytics"; defaults to INFERENCE_BACKEND, then the file extension
+        """
+        backend = (backend or os.getenv('INFERENCE_BACKEND') or
+                   ('onnx' if Path(model_path).suffix == '.onnx' else 'ultralytics')).lower()
+        
         try:
-            print(f"Loading model from {model_path}...")
-            self.model = YOLO(model_path)
+            print(f"Loading model from {model_path} ({backend} backend)...")
+            load_start = time.perf_counter()
+            if backend == 'onnx':
+                # ONNX Runtime path: no torch or ultralytics import
+                from onnx_backend import OnnxYoloModel
+                import_time = time.perf_counter() - load_start
+                self.model = OnnxYoloModel(
+                    model_path,
+                    intra_op_threads=int(os.getenv('ORT_INTRA_OP_THREADS', '0')),
+                    inter_op_threads=int(os.getenv('ORT_INTER_OP_THREADS', '0')),
+                    shared_weights=os.getenv('ORT_SHARED_WEIGHTS') == '1'
+                )
+            else:
+                # Imports torch; by far the slowest part of a cold start
+                from ultralytics import YOLO
+                import_time = time.perf_counter() - load_start
+                self.model = YOLO(model_path)
             self.model_path = Path(model_path)
+            self.backend = backend
+            
+            # Identity of the loaded weights; changes on every (re)load, also across detector instances
+            self.model_id = f"{self.model_path.resolve()}:{self.model_path.stat().st_mtime_ns}:{next(_LOAD_SEQUENCE)}"
             
             # Get class names from model if available
-            if hasattr(self.model, 'names'):
+            if getattr(self.model, 'names', None):
                 self.class_names = list(self.model.names.values())
             
-            print(f"Model loaded successfully!")
+            load_time = time.perf_counter() - load_start
+            self.load_timings = {"import_s": import_time, "load_s": load_time - import_time}
+            MODEL_LOAD_SECONDS.set(load_time)
+            MODEL_LOADS.inc(backend=backend)
+            
+            print(f"Model loaded successfully in {load_time:.2f}s (backend import {import_time:.2f}s)!")
             print(f"Classes: {self.class_names}")
             
         except Exception as e:
             print(f"Error loading model: {e}")
             self.model = None
+            self.model_id = None
             raise
     
-    def detect(self, image: np.ndarray, conf_threshold: float = 0.5) -> Dict[str, Any]:
+    def describe(self) -> Dict[str, Any]:
+        """Metadata of the loaded model, for a process that does not load it itself (see `adopt`)"""
+        return {
+            "model_path": str(self.model_path),
+            "backend": self.backend,
+            "class_names": list(self.class_names),
+            "input_size": self.input_size
+        }
+    
+    def adopt(self, description: Dict[str, Any]):
+        """
+        Stand in for a model loaded in other processes, without loading it here
+        
+        Takes the path, backend, class names and input size from `describe`
+        and gives the model a model_id of this process. Inference still needs
+        `load_model`; in process mode only the workers run the model.
+        
+        Args:
+            description: Result of `describe` on a detector that loaded the model
+        """
+        self.model = None
+        self.model_path = Path(description["model_path"])
+        self.backend = description["backend"]
+        self.class_names = list(description["class_names"])
+        self._adopted_input_size = description["input_size"]
+        self.model_id = f"{self.model_path.resolve()}:{self.model_path.stat().st_mtime_ns}:{next(_LOAD_SEQUENCE)}"
+    
+    @property
+    def input_size(self) -> int:
+        """Long side of the model input in pixels"""
+        if self.model is None and self._adopted_input_size:
+            return self._adopted_input_size
+        # ONNX models carry their export size; ultralytics keeps the training imgsz in overrides
+        imgsz = getattr(self.model, 'imgsz', None) or getattr(self.model, 'overrides', {}).get('imgsz')
+        if isinstance(imgsz, (list, tuple)):
+            return max(imgsz)
+        return int(imgsz) if imgsz else 640
+    
+    def warmup(self, shapes: Optional[Sequence[Tuple[int, int]]] = None, batch_sizes: Sequence[int] = (1,),
+               runs: int = 2) -> Optional[float]:
+        """
+        Run a few inferences on blank frames at the shapes requests will have
+        
+        The first calls on a freshly loaded model pay for lazy initialization
+        (memory arenas, kernel selection, graph setup), and the ultralytics
+        backend letterboxes each aspect ratio to its own input shape; doing
+        these calls here keeps that cost out of real requests.
+        
+        Args:
+            shapes: (width, height) frame sizes (default: the square model input)
+            batch_sizes: Batch sizes to run for each shape
+            runs: Inferences per shape and batch size
+        
+        Returns:
+            Duration of the first inference in seconds, or None without a model
+        """
+        if self.model is None:
+            return None
+        
+        first_inference = None
+        for width, height in shapes or [(self.input_size, self.input_size)]:
+            frame = np.full((height, width, 3), 114, dtype=np.uint8)
+            for batch_size in batch_sizes:
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    self._predict([frame] * batch_size, 0.99, {})
+                    if first_inference is None:
+                        first_inference = time.perf_counter() - start
+        return first_inference
+    
+    def detect(self, image: np.ndarray, conf_threshold: float = 0.5, columnar: bool = False) -> Dict[str, Any]:
         """
         Run detection on an image
         
         Args:
             image: OpenCV image (BGR format)
             conf_threshold: Confidence threshold for detections
+            columnar: Return parallel arrays instead of detection objects (see `_format_result`)
         
         Returns:
             Dictionary with detection results
         """
+        return self.detect_batch([image], conf_threshold=conf_threshold, columnar=columnar)[0]
+    
+    def detect_batch(self, images: List[np.ndarray], conf_threshold: Union[float, Sequence[float]] = 0.5,
+                     columnar: Union[bool, Sequence[bool]] = False) -> List[Dict[str, Any]]:
+        """
+        Run detection on several images in a single forward pass
+        
+        The model runs once at the lowest threshold; each image's detections
+        are then filtered to its own threshold before they are formatted.
+        
+        Args:
+            images: List of OpenCV images (BGR format)
+            conf_threshold: Confidence threshold, either one for all images or one per image
+            columnar: Return parallel arrays instead of detection objects, for all images or per image
+        
+        Returns:
+            List of detection result dictionaries, one per input image
+        """
         if self.model is None:
             raise RuntimeError("Model not loaded. Please load a model first.")
         
-        start_time = time.time()
+        thresholds = list(conf_threshold) if isinstance(conf_threshold, Sequence) else [conf_threshold] * len(images)
+        formats = list(columnar) if isinstance(columnar, Sequence) else [columnar] * len(images)
+        
+        start_time = time.perf_counter()
+        timings = {}
         
-        # Run inference
-        results = self.model(image, conf=conf_threshold, verbose=False)[0]
+        # Run inference as one batched forward pass
+        predictions = self._predict(images, min(thresholds, default=conf_threshold), timings)
         
         # Parse results
-        detections = []
+        format_start = time.perf_counter()
+        parsed = [
+            self._format_result(*prediction, conf_threshold=threshold, columnar=as_columns)
+            for prediction, threshold, as_columns in zip(predictions, thresholds, formats)
+        ]
+        timings['postprocess'] = timings.get('postprocess', 0.0) + time.perf_counter() - format_start
+        self._observe(timings)
+        
+        processing_time = (time.perf_counter() - start_time) * 1000  # Convert to ms
+        
+        return [
+            {
+                **result,
+                "image_width": image.shape[1],
+                "image_height": image.shape[0],
+                "processing_time_ms": round(processing_time, 2)
+            }
+            for image, result in zip(images, parsed)
+        ]
+    
+    def detect_tiled(self, image: np.ndarray, conf_threshold: float = 0.5, tile_size: int = 640,
+                     overlap: float = 0.2, batch_size: int = 8, max_tiles: int = 64,
+                     include_full_frame: bool = True, columnar: bool = False) -> Dict[str, Any]:
+        """
+        Run sliced inference on a large frame
+        
+        The frame is cut into overlapping tiles that are run through the model
+        in batches, so small symbols keep their resolution instead of being
+        downscaled with the whole frame. Tile detections are shifted back to
+        frame coordinates and duplicates across tiles are removed with NMS.
+        
+        Args:
+            image: OpenCV image (BGR format)
+            conf_threshold: Confidence threshold for detections
+            tile_size: Tile edge length in pixels
+            overlap: Fraction of each tile shared with its neighbour
+            batch_size: Number of tiles per forward pass
+            max_tiles: Upper bound on tiles per frame, to cap per-frame latency
+            include_full_frame: Also run the whole frame to catch symbols larger than a tile
+            columnar: Return parallel arrays instead of detection objects
+        
+        Returns:
+            Dictionary with detection results
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Please load a model first.")
+        
+        start_time = time.perf_counter()
+        timings = {}
+        
+        height, width = image.shape[:2]
+        windows = tile_grid(height, width, tile_size, overlap, max_tiles)
+        # Tiles are views into the frame, not copies
+        tiles = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+        offsets = [(x1, y1) for x1, y1, _, _ in windows]
+        
+        if include_full_frame and len(windows) > 1:
+            tiles.append(image)
+            offsets.append((0, 0))
+        
+        predictions = []
+        for start in range(0, len(tiles), max(1, batch_size)):
+            predictions.extend(self._predict(tiles[start:start + batch_size], conf_threshold, timings))
+        
+        merge_start = time.perf_counter()
+        xyxy, confidence, class_ids = merge_tile_predictions(predictions, offsets)
+        result = self._format_result(xyxy, confidence, class_ids, columnar=columnar)
+        timings['postprocess'] = timings.get('postprocess', 0.0) + time.perf_counter() - merge_start
+        self._observe(timings)
+        
+        processing_time = (time.perf_counter() - start_time) * 1000  # Convert to ms
+        
+        return {
+            **result,
+            "image_width": width,
+            "image_height": height,
+            "processing_time_ms": round(processing_time, 2),
+            "tiles": len(windows)
+        }
+    
+    def _predict(self, images: List[np.ndarray], conf_threshold: float,
+                 timings: Dict[str, float]) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Run the loaded backend on a batch of images
         
-        if results.boxes is not None:
+        Args:
+            images: List of OpenCV images (BGR format)
+            conf_threshold: Confidence threshold for detections
+            timings: Dict that "preprocess", "forward" and "postprocess" seconds are added to
+        
+        Returns:
+            Per-image tuples of (xyxy [N, 4], confidence [N], class_id [N]) in original pixels
+        """
+        if self.backend == 'onnx':
+            return self.model.predict(images, conf_threshold=conf_threshold, timings=timings)
+        
+        # ultralytics batches list inputs into one forward pass
+        results_list = self.model(images, conf=conf_threshold, verbose=False)
+        
+        # Results.speed holds per-image milliseconds averaged over the batch
+        speed = getattr(results_list[0], 'speed', None) if len(results_list) else None
+        for stage, key in (('preprocess', 'preprocess'), ('forward', 'inference'), ('postprocess', 'postprocess')):
+            if speed and speed.get(key) is not None:
+                timings[stage] = timings.get(stage, 0.0) + speed[key] * len(images) / 1000
+        
+        copy_start = time.perf_counter()
+        predictions = []
+        for results in results_list:
+            if results.boxes is None:
+                predictions.append((np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)))
+                continue
             boxes = results.boxes.cpu().numpy()
-            
-            for box in boxes:
-                # Extract box data
-                xyxy = box.xyxy[0]  # [x1, y1, x2, y2]
-                conf = float(box.conf[0])
-                cls = int(box.cls[0])
-                
-                # Convert to [x, y, width, height]
-                x1, y1, x2, y2 = xyxy
-                bbox = [
-                    float(x1),
-                    float(y1),
-                    float(x2 - x1),
-                    float(y2 - y1)
-                ]
-                
-                detection = {
-                    "class_name": self.class_names[cls],
-                    "confidence": conf,
-                    "bbox": bbox
-                }
-                
-                detections.append(detection)
-        
-        processing_time = (time.time() - start_time) * 1000  # Convert to ms
+            predictions.append((boxes.xyxy, boxes.conf, boxes.cls.astype(int)))
+        timings['postprocess'] = timings.get('postprocess', 0.0) + time.perf_counter() - copy_start
+        return predictions
+    
+    @staticmethod
+    def _observe(timings: Dict[str, float]):
+        """Report accumulated stage timings to the metrics registry"""
+        for stage, seconds in timings.items():
+            observe_stage(stage, seconds)
+    
+    def _format_result(self, xyxy: np.ndarray, confidence: np.ndarray, class_ids: np.ndarray,
+                       conf_threshold: Optional[float] = None, columnar: bool = False) -> Dict[str, Any]:
+        """
+        Convert detection arrays into the response layout with whole-array operations
+        
+        Args:
+            xyxy: Boxes as [N, 4] corner coordinates
+            confidence: Scores [N]
+            class_ids: Class indices [N]
+            conf_threshold: Drop detections at or below this score
+            columnar: Return parallel arrays ("boxes", "scores", "class_ids",
+                "class_names") instead of a list of detection objects
+        
+        Returns:
+            Dictionary holding either "detections" or the columnar arrays
+        """
+        xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        confidence = np.asarray(confidence, dtype=np.float64).reshape(-1)
+        class_ids = np.asarray(class_ids).astype(np.intp, copy=False).reshape(-1)
+        
+        if conf_threshold is not None:
+            keep = confidence > conf_threshold
+            if not keep.all():
+                xyxy, confidence, class_ids = xyxy[keep], confidence[keep], class_ids[keep]
+        
+        # Convert to [x, y, width, height]
+        bbox = xyxy.copy()
+        bbox[:, 2:] -= xyxy[:, :2]
         
+        boxes = bbox.tolist()
+        scores = confidence.tolist()
+        
+        if columnar:
+            return {
+                "boxes": boxes,
+                "scores": scores,
+                "class_ids": class_ids.tolist(),
+                "class_names": list(self.class_names)
+            }
+        
+        names = np.asarray(self.class_names, dtype=object)[class_ids].tolist()
         return {
-            "detections": detections,
-            "image_width": image.shape[1],
-            "image_height": image.shape[0],
-            "processing_time_ms": round(processing_time, 2)
+            "detections": [
+                {"class_name": name, "confidence": score, "bbox": box}
+                for name, score, box in zip(names, scores, boxes)
+            ]
         }
     
     def detect_with_visualization(self, image: np.ndarray, conf_threshold: float = 0.5) -> tuple:
@@ -0,0 +1,154 @@
+"""
+DroneAid 2026 - ONNX Runtime Backend
+Runs exported YOLOv8 models without importing torch or ultralytics
+"""
+
+import ast
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+from ops import letterbox_batch, postprocess_yolo, scale_boxes
+
+def shared_model_path(model_path: str, output_dir: Optional[str] = None) -> Path:
+    """Location of the shared-weights copy of a model written by `prepare_shared_model`"""
+    source = Path(model_path)
+    return Path(output_dir or source.parent) / f"{source.stem}.shared.onnx"
+
+def prepare_shared_model(model_path: str, output_dir: Optional[str] = None) -> Path:
+    """
+    Write a pre-optimized copy of a model with its weights in an external file
+    
+    ONNX Runtime memory-maps external weight files instead of copying them
+    onto the heap, so every process that loads the copy with
+    `shared_weights=True` reads the same page-cache pages. Graph
+    optimizations (including CPU-specific weight layouts) are applied once
+    here, so workers can load the copy without rewriting any weights.
+    
+    The copy is only rewritten when the source model is newer. Because
+    optimizations may target the current CPU, prepare the copy on the machine
+    that serves it.
+    
+    Args:
+        model_path: Path to the exported .onnx model
+        output_dir: Directory for the copy (defaults to the model's directory)
+    
+    Returns:
+        Path of the optimized model (its weights are stored next to it with a .data suffix)
+    """
+    target = shared_model_path(model_path, output_dir)
+    weights = target.with_name(target.name + ".data")
+    if (target.exists() and weights.exists() and
+            target.stat().st_mtime_ns >= Path(model_path).stat().st_mtime_ns):
+        return target
+    
+    target.parent.mkdir(parents=True, exist_ok=True)
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.optimized_model_filepath = str(target)
+    options.add_session_config_entry("session.optimized_model_external_initializers_file_name", weights.name)
+    options.add_session_config_entry("session.optimized_model_external_initializers_min_size_in_bytes", "1024")
+    ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+    return target
+
+class OnnxYoloModel:
+    """YOLOv8 detector backed by an ONNX Runtime session"""
+    
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 shared_weights: bool = False):
+        """
+        Create the inference session
+        
+        Args:
+            model_path: Path to the exported .onnx model
+            intra_op_threads: Threads used inside an operator (0 lets ONNX Runtime decide)
+            inter_op_threads: Threads used across operators (0 lets ONNX Runtime decide)
+            shared_weights: The model was written by `prepare_shared_model`; keep its
+                memory-mapped weights as they are instead of optimizing and repacking them
+        """
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        if shared_weights:
+            # Already optimized; prepacking would copy every weight into private memory
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            options.add_session_config_entry("session.disable_prepacking", "1")
+        else:
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider")
+                     if p in ort.get_available_providers()]
+        
+        self.model_path = Path(model_path)
+        self.session = ort.InferenceSession(str(model_path), sess_options=options, providers=providers)
+        
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_name = self.session.get_outputs()[0].name
+        
+        # A fixed leading dimension means the model was exported with a static batch
+        batch_dim = model_input.shape[0]
+        self.max_batch = batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else None
+        
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names: Dict[int, str] = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        self.imgsz = self._input_size(model_input.shape, metadata)
+    
+    @staticmethod
+    def _input_size(shape, metadata) -> Tuple[int, int]:
+        """Read the model input size from its static shape or export metadata"""
+        height, width = shape[2], shape[3]
+        if isinstance(height, int) and isinstance(width, int):
+            return height, width
+        if "imgsz" in metadata:
+            height, width = ast.literal_eval(metadata["imgsz"])
+            return height, width
+        return 640, 640
+    
+    def predict(self, images: List[np.ndarray], conf_threshold: float = 0.25,
+                iou_threshold: float = 0.7, max_det: int = 300,
+                timings: Optional[Dict[str, float]] = None) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Run detection on a list of images
+        
+        Args:
+            images: OpenCV images (BGR format)
+            conf_threshold: Confidence threshold for detections
+            iou_threshold: IoU threshold for NMS
+            max_det: Maximum detections per image
+            timings: Optional dict that "preprocess", "forward" and "postprocess" seconds are added to
+        
+        Returns:
+            Per-image tuples of (xyxy [K, 4], confidence [K], class_id [K]) in original pixels
+        """
+        step = self.max_batch or max(1, len(images))
+        outputs = []
+        elapsed = {"preprocess": 0.0, "forward": 0.0, "postprocess": 0.0}
+        
+        for start in range(0, len(images), step):
+            chunk = images[start:start + step]
+            t0 = time.perf_counter()
+            batch, transforms = letterbox_batch(chunk, self.imgsz)
+            if self.max_batch and batch.shape[0] < self.max_batch:
+                # Static-batch models need a full batch; padding rows are ignored below
+                padding = np.zeros((self.max_batch - batch.shape[0],) + batch.shape[1:], dtype=batch.dtype)
+                batch = np.concatenate([batch, padding])
+            t1 = time.perf_counter()
+            prediction = self.session.run([self.output_name], {self.input_name: batch})[0]
+            t2 = time.perf_counter()
+            
+            for image, transform, (boxes, conf, cls) in zip(
+                    chunk, transforms, postprocess_yolo(prediction, conf_threshold, iou_threshold, max_det)):
+                outputs.append((scale_boxes(boxes, transform, image.shape[:2]), conf, cls))
+            
+            elapsed["preprocess"] += t1 - t0
+            elapsed["forward"] += t2 - t1
+            elapsed["postprocess"] += time.perf_counter() - t2
+        
+        if timings is not None:
+            for stage, seconds in elapsed.items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+        return outputs
@@ -0,0 +1,177 @@
+"""
+DroneAid 2026 - Detection Ops
+NumPy pre/post-processing shared by the inference backends
+"""
+
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+# Letterbox padding value used by ultralytics
+PAD_VALUE = 114
+
+# Offset that separates classes for class-aware NMS in a single pass
+MAX_WH = 7680
+
+def letterbox_batch(images: List[np.ndarray], imgsz: Tuple[int, int]) -> Tuple[np.ndarray, List[Tuple[float, Tuple[float, float]]]]:
+    """
+    Resize and pad images into one normalized NCHW batch
+    
+    Each image is scaled to fit `imgsz` while keeping its aspect ratio and
+    centred on a grey canvas, matching ultralytics' LetterBox transform.
+    Channel swap, transpose and normalization run once over the whole batch.
+    
+    Args:
+        images: OpenCV images (BGR format)
+        imgsz: Model input size as (height, width)
+    
+    Returns:
+        Tuple of (float32 batch of shape [N, 3, H, W], per-image (gain, (pad_x, pad_y)))
+    """
+    height, width = imgsz
+    canvas = np.full((len(images), height, width, 3), PAD_VALUE, dtype=np.uint8)
+    transforms = []
+    
+    for i, image in enumerate(images):
+        h, w = image.shape[:2]
+        gain = min(height / h, width / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        pad_x, pad_y = (width - new_w) / 2, (height - new_h) / 2
+        left, top = int(round(pad_x - 0.1)), int(round(pad_y - 0.1))
+        
+        if (new_w, new_h) != (w, h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        canvas[i, top:top + new_h, left:left + new_w] = image
+        transforms.append((gain, (left, top)))
+    
+    # BGR -> RGB, NHWC -> NCHW, [0, 255] -> [0, 1]
+    batch = np.ascontiguousarray(canvas[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+    batch *= 1 / 255.0
+    return batch, transforms
+
+def xywh2xyxy(boxes: np.ndarray) -> np.ndarray:
+    """Convert [cx, cy, w, h] boxes to [x1, y1, x2, y2]"""
+    out = np.empty_like(boxes)
+    half_w = boxes[..., 2] / 2
+    half_h = boxes[..., 3] / 2
+    out[..., 0] = boxes[..., 0] - half_w
+    out[..., 1] = boxes[..., 1] - half_h
+    out[..., 2] = boxes[..., 0] + half_w
+    out[..., 3] = boxes[..., 1] + half_h
+    return out
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float, metric: str = "iou") -> np.ndarray:
+    """
+    Greedy non-maximum suppression
+    
+    Args:
+        boxes: Boxes as [N, 4] xyxy
+        scores: Scores as [N]
+        iou_threshold: Boxes overlapping a kept box by more than this are dropped
+        metric: "iou" (intersection over union) or "ios" (intersection over the
+            smaller box, which also catches partial boxes cut off at a tile edge)
+    
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        
+        inter_w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        inter_h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = inter_w * inter_h
+        if metric == "ios":
+            overlap = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        else:
+            overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        
+        order = rest[overlap <= iou_threshold]
+    
+    return np.asarray(keep, dtype=np.int64)
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of [N, 4] and [M, 4] xyxy boxes as an [N, M] matrix"""
+    inter_w = (np.minimum(boxes1[:, None, 2], boxes2[None, :, 2]) - np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])).clip(0)
+    inter_h = (np.minimum(boxes1[:, None, 3], boxes2[None, :, 3]) - np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])).clip(0)
+    inter = inter_w * inter_h
+    area1 = (boxes1[:, 2] - boxes1[:, 0]).clip(0) * (boxes1[:, 3] - boxes1[:, 1]).clip(0)
+    area2 = (boxes2[:, 2] - boxes2[:, 0]).clip(0) * (boxes2[:, 3] - boxes2[:, 1]).clip(0)
+    return inter / (area1[:, None] + area2[None, :] - inter + 1e-9)
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, iou_threshold: float,
+                metric: str = "iou") -> np.ndarray:
+    """Class-aware NMS: boxes of different classes never suppress each other"""
+    if boxes.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Shift each class into its own coordinate range (wide enough for full-resolution frames)
+    offset = max(MAX_WH, float(boxes.max()) + 1)
+    offsets = class_ids.astype(boxes.dtype)[:, None] * offset
+    return nms(boxes + offsets, scores, iou_threshold, metric)
+
+def postprocess_yolo(prediction: np.ndarray, conf_threshold: float, iou_threshold: float = 0.7,
+                     max_det: int = 300, max_nms: int = 30000) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Decode raw YOLOv8 output into filtered detections
+    
+    Mirrors ultralytics' non_max_suppression for single-label detection.
+    
+    Args:
+        prediction: Raw model output of shape [N, 4 + num_classes, num_anchors]
+        conf_threshold: Minimum class score for a candidate box
+        iou_threshold: IoU threshold for NMS
+        max_det: Maximum detections kept per image
+        max_nms: Maximum candidates passed to NMS per image
+    
+    Returns:
+        Per-image tuples of (xyxy [K, 4], confidence [K], class_id [K]) in model input coordinates
+    """
+    outputs = []
+    
+    for pred in prediction:
+        pred = pred.T  # [num_anchors, 4 + num_classes]
+        class_scores = pred[:, 4:]
+        class_ids = class_scores.argmax(1)
+        confidence = class_scores[np.arange(len(class_ids)), class_ids]
+        
+        mask = confidence > conf_threshold
+        boxes = xywh2xyxy(pred[mask, :4])
+        confidence = confidence[mask]
+        class_ids = class_ids[mask]
+        
+        if confidence.size > max_nms:
+            top = confidence.argsort()[::-1][:max_nms]
+            boxes, confidence, class_ids = boxes[top], confidence[top], class_ids[top]
+        
+        keep = batched_nms(boxes, confidence, class_ids, iou_threshold)[:max_det]
+        outputs.append((boxes[keep], confidence[keep], class_ids[keep]))
+    
+    return outputs
+
+def scale_boxes(boxes: np.ndarray, transform: Tuple[float, Tuple[float, float]], image_shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Map xyxy boxes from letterboxed model input back to original image pixels
+    
+    Args:
+        boxes: Boxes as [N, 4] xyxy in model input coordinates
+        transform: (gain, (pad_x, pad_y)) returned by `letterbox_batch`
+        image_shape: Original image shape as (height, width)
+    
+    Returns:
+        Boxes as [N, 4] xyxy clipped to the original image
+    """
+    gain, (pad_x, pad_y) = transform
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] -= pad_x
+    boxes[:, [1, 3]] -= pad_y
+    boxes /= gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+    return boxes
@@ -0,0 +1,137 @@
+"""
+DroneAid 2026 - Request Payloads
+Low-copy readers for raw and base64 image uploads
+"""
+
+import binascii
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+# Maximum accepted request body (matches the 50MB limit used by the webapp proxy)
+MAX_BODY_SIZE = 50 * 1024 * 1024
+
+# Base64 input is decoded in 4-byte-aligned slices of this size
+_B64_CHUNK = 1024 * 1024
+
+# Characters that stop base64 input from being decoded in aligned slices
+_B64_BREAKS = re.compile(rb"[\\\r\n ]")
+_B64_WHITESPACE = re.compile(rb"[\r\n ]")
+_QUOTE = re.compile(rb'"')
+
+class PayloadTooLargeError(ValueError):
+    """Raised when a request body exceeds MAX_BODY_SIZE"""
+
+async def read_body(request, max_size: int = MAX_BODY_SIZE) -> memoryview:
+    """
+    Stream a request body into a single preallocated buffer
+    
+    When the client sends Content-Length the buffer is allocated once at the
+    final size and chunks are copied straight into it; otherwise it grows as
+    chunks arrive. No intermediate list of chunks or joined copy is kept.
+    
+    Args:
+        request: Starlette request
+        max_size: Maximum accepted body size in bytes
+    
+    Returns:
+        Memoryview over the body bytes
+    
+    Raises:
+        PayloadTooLargeError: If the body exceeds max_size
+    """
+    declared = request.headers.get("content-length")
+    expected = int(declared) if declared and declared.isdigit() else None
+    if expected is not None and expected > max_size:
+        raise PayloadTooLargeError(f"Request body exceeds {max_size} bytes")
+    
+    buffer = bytearray(expected) if expected is not None else bytearray()
+    size = 0
+    
+    async for chunk in request.stream():
+        end = size + len(chunk)
+        if end > max_size:
+            raise PayloadTooLargeError(f"Request body exceeds {max_size} bytes")
+        if end > len(buffer):
+            buffer.extend(bytes(end - len(buffer)))
+        buffer[size:end] = chunk
+        size = end
+    
+    return memoryview(buffer)[:size]
+
+def decode_base64(data: memoryview) -> memoryview:
+    """
+    Decode base64 into a preallocated buffer without copying the input
+    
+    Args:
+        data: Base64 text, optionally prefixed with a data URL header ("data:...;base64,")
+    
+    Returns:
+        Memoryview over the decoded bytes
+    
+    Raises:
+        binascii.Error: If the data is not valid base64
+        ValueError: If the data URL header is malformed or the data decodes to nothing
+    """
+    data = memoryview(data)
+    if bytes(data[:5]) == b"data:":
+        comma = bytes(data[:256]).find(b",")
+        if comma < 0:
+            raise ValueError("Invalid data URL")
+        data = data[comma + 1:]
+    
+    # Strict mode rejects characters outside the alphabet instead of skipping them,
+    # so garbage such as "!!!!" is an error rather than an empty image
+    if _B64_BREAKS.search(data):
+        # Escaped or wrapped input cannot be sliced on 4-byte boundaries
+        cleaned = _B64_WHITESPACE.sub(b"", bytes(data).replace(b"\\n", b"").replace(b"\\/", b"/"))
+        output = binascii.a2b_base64(cleaned, strict_mode=True)
+        written = len(output)
+    else:
+        output = bytearray(len(data) // 4 * 3)
+        written = 0
+        for start in range(0, len(data), _B64_CHUNK):
+            chunk = binascii.a2b_base64(data[start:start + _B64_CHUNK], strict_mode=True)
+            output[written:written + len(chunk)] = chunk
+            written += len(chunk)
+    
+    if not written:
+        raise ValueError("Empty image data")
+    return memoryview(output)[:written]
+
+def split_base64_json(body: memoryview, field: str = "image_data") -> Tuple[Optional[memoryview], Dict[str, Any]]:
+    """
+    Locate a large base64 string field in a JSON body without parsing it
+    
+    The image string is returned as a view into the body, and only the
+    remaining (small) fields go through the JSON parser.
+    
+    Args:
+        body: Raw JSON request body
+        field: Name of the base64 field
+    
+    Returns:
+        Tuple of (view of the field's string value or None, other fields as a dict)
+    
+    Raises:
+        ValueError: If the body is not a valid JSON object
+    """
+    match = re.search(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"', body)
+    if match is None:
+        start = end = None
+        others = json.loads(bytes(body))
+    else:
+        start = match.end()
+        closing = _QUOTE.search(body, start)
+        if closing is None:
+            raise ValueError(f"unterminated {field} string")
+        end = closing.start()
+        # Parse the body with the image string cut out
+        others = json.loads(bytes(body[:start]) + bytes(body[end:]))
+    
+    if not isinstance(others, dict):
+        raise ValueError("expected a JSON object")
+    if start is None:
+        return None, others
+    others.pop(field, None)
+    return body[start:end], others
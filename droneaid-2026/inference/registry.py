@@ -0,0 +1,229 @@
+"""
+DroneAid 2026 - Model Registry
+Hot model reload and percentage-based A/B routing between two loaded models
+"""
+
+import asyncio
+import random
+import time
+import weakref
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from batching import percentile
+from metrics import MODEL_RELOADS
+from model import DroneAidDetector
+
+class ModelStats:
+    """Request, latency and detection counters for one loaded model"""
+    
+    def __init__(self, window: int = 2048):
+        self.requests = 0
+        self.detections = 0
+        self.errors = 0
+        self._latencies_ms = deque(maxlen=window)
+    
+    def record(self, latency_ms: float, detections: int):
+        self.requests += 1
+        self.detections += detections
+        self._latencies_ms.append(latency_ms)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "detections": self.detections,
+            "detections_per_request": round(self.detections / self.requests, 3) if self.requests else None,
+            "latency_ms": {
+                "p50": percentile(self._latencies_ms, 50),
+                "p99": percentile(self._latencies_ms, 99),
+            },
+        }
+
+class ModelRegistry:
+    """
+    Holds the serving model and an optional candidate model
+    
+    Requests pick a model with `select()` and keep that reference until they
+    finish, so swapping models is a single attribute assignment: requests
+    already running complete on the model they started with, and the old
+    model is released once the last of them is done.
+    
+    New models are loaded and warmed up on a background thread before they are
+    swapped in, so requests never wait for a load.
+    """
+    
+    def __init__(self, detector: DroneAidDetector, warmup: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the registry
+        
+        Args:
+            detector: Detector serving traffic at startup
+            warmup: Keyword arguments for `DroneAidDetector.warmup` on newly loaded models
+        """
+        self.primary = detector
+        self.warmup = warmup or {}
+        self.candidate: Optional[DroneAidDetector] = None
+        self.candidate_percent = 0.0
+        
+        self._lock = asyncio.Lock()
+        # Statistics disappear together with the model they describe
+        self._stats: "weakref.WeakKeyDictionary[DroneAidDetector, ModelStats]" = weakref.WeakKeyDictionary()
+        self.last_reload: Optional[Dict[str, Any]] = None
+    
+    def select(self) -> DroneAidDetector:
+        """Pick the model for one request, honouring the candidate traffic split"""
+        candidate = self.candidate
+        if candidate is not None and random.random() * 100 < self.candidate_percent:
+            return candidate
+        return self.primary
+    
+    def is_candidate(self, detector: DroneAidDetector) -> bool:
+        return detector is self.candidate and detector is not self.primary
+    
+    def record(self, detector: DroneAidDetector, latency_ms: float, result: Optional[Dict[str, Any]] = None):
+        """Record one request served by detector (result None records an error)"""
+        stats = self._stats.setdefault(detector, ModelStats())
+        if result is None:
+            stats.errors += 1
+            return
+        count = len(result["scores"]) if "scores" in result else len(result.get("detections", ()))
+        stats.record(latency_ms, count)
+    
+    def _load(self, model_path: str) -> DroneAidDetector:
+        """Load and warm up a detector (runs on a worker thread)"""
+        detector = DroneAidDetector(model_path)
+        detector.warmup(**self.warmup)
+        return detector
+    
+    async def _load_in_background(self, model_path: Optional[str],
+                                  load: Optional[Callable[[str], Awaitable[DroneAidDetector]]] = None
+                                  ) -> DroneAidDetector:
+        start = time.perf_counter()
+        try:
+            model_path = model_path or DroneAidDetector.find_model()
+            if not model_path or not Path(model_path).exists():
+                raise FileNotFoundError(f"Model not found: {model_path}")
+            detector = await (load(model_path) if load is not None else asyncio.to_thread(self._load, model_path))
+        except Exception as e:
+            MODEL_RELOADS.inc(result="failed")
+            self.last_reload = {"model_path": model_path, "error": str(e), "at": time.time()}
+            raise
+        MODEL_RELOADS.inc(result="loaded")
+        self.last_reload = {
+            "model_path": str(detector.model_path),
+            "model_id": detector.model_id,
+            "load_ms": round((time.perf_counter() - start) * 1000, 1),
+            "at": time.time(),
+        }
+        return detector
+    
+    async def reload(self, model_path: Optional[str] = None,
+                     load: Optional[Callable[[str], Awaitable[DroneAidDetector]]] = None) -> DroneAidDetector:
+        """
+        Load a model in the background and make it the serving model
+        
+        Args:
+            model_path: Model to load (defaults to the standard model search)
+            load: Optional coroutine function that loads and warms up the model
+                at the given path elsewhere (e.g. in worker processes) and
+                returns the detector to register, instead of loading it in
+                this process; if it raises, the current model keeps serving
+        
+        Returns:
+            The new serving detector
+        
+        Raises:
+            FileNotFoundError: If no model file is found
+            Exception: Whatever the backend raises for a model it cannot load;
+                the current model keeps serving in that case
+        """
+        async with self._lock:
+            detector = await self._load_in_background(model_path, load)
+            self.primary = detector
+            return detector
+    
+    async def load_candidate(self, model_path: str, percent: float) -> DroneAidDetector:
+        """Load a second model and route `percent` of requests to it"""
+        async with self._lock:
+            detector = await self._load_in_background(model_path)
+            self.candidate = detector
+            self.candidate_percent = min(100.0, max(0.0, float(percent)))
+            return detector
+    
+    def set_split(self, percent: float):
+        """Change the share of requests routed to the candidate"""
+        self.candidate_percent = min(100.0, max(0.0, float(percent)))
+    
+    async def promote(self) -> DroneAidDetector:
+        """Make the candidate the serving model and stop splitting traffic"""
+        async with self._lock:
+            if self.candidate is None:
+                raise ValueError("No candidate model loaded")
+            self.primary, self.candidate = self.candidate, None
+            self.candidate_percent = 0.0
+            return self.primary
+    
+    def drop_candidate(self):
+        """Stop routing traffic to the candidate and release it"""
+        self.candidate = None
+        self.candidate_percent = 0.0
+    
+    def _describe(self, detector: DroneAidDetector) -> Dict[str, Any]:
+        return {
+            "model_path": str(detector.model_path) if detector.model_path else None,
+            "model_id": detector.model_id,
+            "backend": detector.backend,
+            **self._stats.get(detector, ModelStats()).to_dict(),
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Describe the loaded models with their per-model request statistics"""
+        return {
+            "primary": self._describe(self.primary),
+            "candidate": self._describe(self.candidate) if self.candidate else None,
+            "candidate_percent": self.candidate_percent,
+            "last_reload": self.last_reload,
+        }
+
+async def watch_model_file(path: str, reload: Callable[[str], Awaitable], interval_s: float = 5.0):
+    """
+    Call reload(path) whenever the file at path changes
+    
+    A change is acted on once the file's size and modification time have been
+    stable for one polling interval, so a model that is still being copied
+    into place is not loaded half-written.
+    
+    Args:
+        path: Model file to watch
+        reload: Coroutine function that loads and swaps in the model
+        interval_s: Polling interval in seconds
+    """
+    def signature():
+        try:
+            stat = Path(path).stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+    
+    loaded = signature()
+    pending = None
+    
+    while True:
+        await asyncio.sleep(interval_s)
+        current = signature()
+        if current is None or current == loaded:
+            pending = None
+            continue
+        if current != pending:
+            # Changed since the last poll; wait until it settles
+            pending = current
+            continue
+        
+        print(f"Model file {path} changed, reloading...")
+        try:
+            await reload(path)
+        except Exception as e:
+            print(f"Model reload failed, keeping the current model: {e}")
+        loaded, pending = current, None
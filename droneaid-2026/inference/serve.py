@@ -0,0 +1,205 @@
+"""
+DroneAid 2026 - Multi-process Server
+Runs several inference server processes on one listening socket
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """Parse a CPU list such as "0-3,6" into [0, 1, 2, 3, 6]"""
+    cpus = []
+    for part in filter(None, spec.split(',')):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+def plan_affinity(workers: int, spec: str) -> List[Optional[List[int]]]:
+    """
+    Decide which CPUs each worker is pinned to
+    
+    Args:
+        workers: Number of worker processes
+        spec: "none" (no pinning), "auto" (split the available CPUs into equal
+            contiguous groups) or explicit per-worker CPU lists separated by
+            ";" (e.g. "0-3;4-7")
+    
+    Returns:
+        One CPU list per worker, or None for workers that are not pinned
+    """
+    if spec == 'none' or not hasattr(os, 'sched_setaffinity'):
+        return [None] * workers
+    
+    if spec == 'auto':
+        available = sorted(os.sched_getaffinity(0))
+        if len(available) < workers:
+            # More workers than CPUs: pinning would stack workers on the same cores
+            return [None] * workers
+        size = len(available) // workers
+        return [available[i * size:(i + 1) * size] for i in range(workers)]
+    
+    groups = [parse_cpu_list(group) for group in spec.split(';')]
+    if len(groups) != workers:
+        raise ValueError(f"WORKER_CPU_AFFINITY lists {len(groups)} CPU groups for {workers} workers")
+    return groups
+
+def prepare_model(model_path: Optional[str], shared_dir: Optional[str]) -> Dict[str, str]:
+    """
+    Pick the model before forking and prepare a shared-weights copy for ONNX models
+    
+    Both run in a short-lived spawned process, so the parent never imports
+    numpy, OpenCV or ONNX Runtime: libraries it had initialised, thread pools
+    included, would be inherited by every forked worker before `run_worker`
+    could size them.
+    
+    Returns:
+        Environment variables the workers should load the model with
+    """
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_prepare_model, model_path, shared_dir).result()
+
+def _prepare_model(model_path: Optional[str], shared_dir: Optional[str]) -> Dict[str, str]:
+    """Body of `prepare_model` (runs in the spawned process)"""
+    from model import DroneAidDetector
+    
+    model_path = model_path or DroneAidDetector.find_model()
+    if not model_path:
+        return {}
+    
+    backend = (os.getenv('INFERENCE_BACKEND') or
+               ('onnx' if Path(model_path).suffix == '.onnx' else 'ultralytics')).lower()
+    if backend != 'onnx':
+        print(f"Model {model_path} uses the {backend} backend; each worker loads its own copy "
+              "(export to ONNX to share weights between workers)")
+        return {'MODEL_PATH': model_path}
+    
+    from onnx_backend import prepare_shared_model
+    shared_path = prepare_shared_model(model_path, shared_dir)
+    
+    print(f"Workers share memory-mapped weights from {shared_path}")
+    return {'MODEL_PATH': str(shared_path), 'INFERENCE_BACKEND': 'onnx', 'ORT_SHARED_WEIGHTS': '1'}
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create the listening socket shared by all workers"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(index: int, sock: socket.socket, cpus: Optional[List[int]], threads: int,
+               env: Dict[str, str], log_level: str):
+    """Configure and run one server process (called in the forked child)"""
+    # Thread counts are read when numpy, OpenCV, torch and ONNX Runtime are first imported;
+    # the parent never imports them (see prepare_model), so they take effect in this child
+    os.environ.update(env)
+    for name in ('ORT_INTRA_OP_THREADS', 'OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(threads)
+    os.environ.setdefault('ORT_INTER_OP_THREADS', '1')
+    os.environ.setdefault('INFERENCE_WORKERS', str(threads))
+    
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    
+    import cv2
+    cv2.setNumThreads(threads)
+    
+    import uvicorn
+    from main import app
+    
+    print(f"Worker {index} (pid {os.getpid()}) serving with {threads} threads"
+          + (f" on CPUs {cpus}" if cpus else ""))
+    config = uvicorn.Config(app, log_level=log_level, timeout_graceful_shutdown=10)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the DroneAid inference API with several worker processes')
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', '0')) or None,
+                        help='Worker processes (default: one per 4 CPUs)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WORKER_THREADS', '0')) or None,
+                        help='Inference threads per worker (default: CPUs divided by workers)')
+    parser.add_argument('--affinity', default=os.getenv('WORKER_CPU_AFFINITY', 'none'),
+                        help='"none", "auto" or per-worker CPU lists like "0-3;4-7"')
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH'))
+    parser.add_argument('--shared-dir', default=os.getenv('SHARED_MODEL_DIR'),
+                        help="Directory for the shared-weights model copy (default: next to the model)")
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+    
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    workers = args.workers or max(1, cpu_count // 4)
+    affinity = plan_affinity(workers, args.affinity)
+    threads = [args.threads or (len(cpus) if cpus else max(1, cpu_count // workers)) for cpus in affinity]
+    
+    env = prepare_model(args.model, args.shared_dir)
+    sock = bind_socket(args.host, args.port)
+    print(f"Listening on {args.host}:{args.port} with {workers} workers")
+    
+    children: Dict[int, int] = {}
+    stopping = False
+    
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(index, sock, affinity[index], threads[index], env, args.log_level)
+            finally:
+                os._exit(0)
+        children[pid] = index
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    
+    for index in range(workers):
+        spawn(index)
+    
+    started = time.monotonic()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        if time.monotonic() - started < 10:
+            # Workers that die right after start would only crash again
+            print(f"Worker {index} exited during startup (status {status}); shutting down")
+            stop(signal.SIGTERM, None)
+            continue
+        print(f"Worker {index} (pid {pid}) exited with status {status}; restarting")
+        spawn(index)
+    
+    sock.close()
+    sys.exit(0 if stopping else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+DroneAid 2026 - Startup
+Readiness state and startup-time profile of the inference service
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import STARTUP_SECONDS
+
+def parse_shapes(spec: str) -> List[Tuple[int, int]]:
+    """Parse frame sizes such as "1920x1080,640x640" into [(1920, 1080), (640, 640)]"""
+    shapes = []
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        width, _, height = part.lower().partition('x')
+        shapes.append((int(width), int(height or width)))
+    return shapes
+
+class StartupState:
+    """
+    Tracks whether the service is ready to serve and how long startup took
+    
+    Phases are recorded in the order they run. A phase list for a typical
+    cold start reads: import (application modules), backend_import
+    (ultralytics/torch or ONNX Runtime), model_load, first_inference, warmup
+    and ready (total time from the start of the import to readiness).
+    """
+    
+    def __init__(self, started: Optional[float] = None):
+        """
+        Initialize the state
+        
+        Args:
+            started: perf_counter() value at which startup began (default: now)
+        """
+        self.started = started if started is not None else time.perf_counter()
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.phases: Dict[str, float] = {}
+    
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+    
+    def record(self, phase: str, seconds: float):
+        """Record the duration of one startup phase"""
+        self.phases[phase] = round(seconds, 3)
+        STARTUP_SECONDS.set(seconds, phase=phase)
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one startup phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+    
+    def mark_ready(self):
+        self.record("ready", time.perf_counter() - self.started)
+        self.status = "ready"
+        self.error = None
+        print("Startup profile: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases.items()))
+    
+    def mark_failed(self, error: str):
+        self.status = "failed"
+        self.error = error
+        print(f"Startup failed: {error}")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "phases_s": dict(self.phases),
+        }
@@ -0,0 +1,91 @@
+"""
+DroneAid 2026 - Streaming Sessions
+Latest-frame-wins buffering for continuous video feeds over WebSocket
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+class FrameSession:
+    """
+    Holds at most one pending frame for a streaming client
+    
+    Frames arrive faster than inference can keep up with on slow nodes. Instead
+    of queueing them (and letting latency grow), a newer frame replaces the one
+    still waiting, so the detector always works on the freshest frame and
+    end-to-end latency stays bounded by one inference.
+    """
+    
+    def __init__(self, fps_window_s: float = 5.0):
+        """
+        Initialize the session
+        
+        Args:
+            fps_window_s: Sliding window used to compute the processed frame rate
+        """
+        self.fps_window_s = fps_window_s
+        self.started = time.monotonic()
+        
+        self._pending: Optional[Tuple[int, bytes, float]] = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._completed = deque()
+        
+        # Statistics
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+    
+    def offer(self, data: bytes):
+        """Accept a new frame, replacing (and dropping) any frame still pending"""
+        if self._pending is not None:
+            self.dropped += 1
+        self.received += 1
+        self._pending = (self.received, data, time.monotonic())
+        self._ready.set()
+    
+    def close(self):
+        """Signal that no more frames will arrive"""
+        self._closed = True
+        self._ready.set()
+    
+    async def next_frame(self) -> Optional[Tuple[int, bytes, float]]:
+        """
+        Wait for the newest pending frame
+        
+        Returns:
+            (sequence number, frame bytes, arrival time), or None once the session is closed
+        """
+        while self._pending is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        
+        frame, self._pending = self._pending, None
+        return frame
+    
+    def mark_processed(self):
+        """Record a completed frame for the FPS counter"""
+        now = time.monotonic()
+        self.processed += 1
+        self._completed.append(now)
+        while self._completed and now - self._completed[0] > self.fps_window_s:
+            self._completed.popleft()
+    
+    @property
+    def fps(self) -> float:
+        """Frames processed per second over the sliding window"""
+        window = min(self.fps_window_s, time.monotonic() - self.started)
+        return round(len(self._completed) / window, 2) if window > 0 else 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return per-session frame counters and FPS"""
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "fps": self.fps,
+        }
@@ -0,0 +1,77 @@
+"""
+Model reload after a failed startup
+"""
+
+import importlib
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+from onnx import TensorProto, helper
+
+from fastapi.testclient import TestClient
+
+INPUT_SIZE = 64
+CLASS_NAMES = {0: "sos", 1: "water"}
+
+def write_model(path):
+    """Write a YOLOv8-shaped ONNX model that always predicts one "sos" box"""
+    prediction = np.zeros((1, 4 + len(CLASS_NAMES), 1), dtype=np.float32)
+    prediction[0, :5, 0] = [32, 32, 16, 16, 0.9]
+    graph = helper.make_graph(
+        [helper.make_node("Constant", [], ["output0"], value=onnx.numpy_helper.from_array(prediction))],
+        "droneaid",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, INPUT_SIZE, INPUT_SIZE])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, list(prediction.shape))],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8)
+    helper.set_model_props(model, {"names": str(CLASS_NAMES)})
+    onnx.save(model, str(path))
+
+def wait_for_startup(client):
+    for _ in range(100):
+        response = client.get("/ready")
+        if response.json()["status"] != "starting":
+            return response
+        time.sleep(0.05)
+    raise TimeoutError("startup did not finish")
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    """A fresh main module started without any model in reach"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MODEL_PATH", str(tmp_path / "missing.onnx"))
+    for name in ("DECODE_TARGET_SIZE", "INFERENCE_BACKEND", "INFERENCE_EXECUTOR", "MODEL_WATCH",
+                 "ADMIN_TOKEN", "GEOSTORE_PATH"):
+        monkeypatch.delenv(name, raising=False)
+    sys.modules.pop("main", None)
+    yield importlib.import_module("main")
+    sys.modules.pop("main", None)
+
+def test_reload_after_failed_startup(main, tmp_path):
+    model_path = tmp_path / "droneaid.onnx"
+    image = cv2.imencode(".jpg", np.full((48, 48, 3), 127, dtype=np.uint8))[1].tobytes()
+    
+    with TestClient(main.app) as client:
+        response = wait_for_startup(client)
+        assert response.status_code == 503
+        assert response.json()["status"] == "failed"
+        assert client.post("/detect/raw", content=image).status_code == 503
+        
+        write_model(model_path)
+        response = client.post("/admin/reload", json={"model_path": str(model_path)})
+        assert response.status_code == 200
+        
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["error"] is None
+        assert main.DECODE_TARGET_SIZE == INPUT_SIZE
+        
+        response = client.post("/detect/raw", content=image)
+        assert response.status_code == 200
+        assert [d["class_name"] for d in response.json()["detections"]] == ["sos"]
@@ -0,0 +1,79 @@
+"""
+DroneAid 2026 - Sliced Inference
+Splits large aerial frames into overlapping tiles and merges the detections
+"""
+
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from ops import batched_nms
+
+def _axis_offsets(length: int, tile: int, overlap: float) -> List[int]:
+    """Evenly spaced tile starts along one axis, with the last tile flush to the edge"""
+    if length <= tile:
+        return [0]
+    stride = max(1, int(tile * (1 - overlap)))
+    count = math.ceil((length - tile) / stride) + 1
+    return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+def tile_grid(height: int, width: int, tile_size: int = 640, overlap: float = 0.2,
+              max_tiles: int = 64) -> List[Tuple[int, int, int, int]]:
+    """
+    Compute overlapping tile windows covering an image
+    
+    If the grid would exceed `max_tiles`, the tile size is grown until it fits,
+    trading small-object resolution for a bounded per-frame cost.
+    
+    Args:
+        height: Image height in pixels
+        width: Image width in pixels
+        tile_size: Tile edge length in pixels
+        overlap: Fraction of each tile shared with its neighbour (0.0-0.9)
+        max_tiles: Upper bound on the number of tiles per frame
+    
+    Returns:
+        List of (x1, y1, x2, y2) tile windows
+    """
+    overlap = min(max(overlap, 0.0), 0.9)
+    tile = max(32, int(tile_size))
+    
+    while True:
+        xs = _axis_offsets(width, tile, overlap)
+        ys = _axis_offsets(height, tile, overlap)
+        if len(xs) * len(ys) <= max(1, max_tiles):
+            break
+        tile = int(tile * 1.25)
+    
+    return [(x, y, min(x + tile, width), min(y + tile, height)) for y in ys for x in xs]
+
+def merge_tile_predictions(predictions: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                           offsets: List[Tuple[int, int]], iou_threshold: float = 0.5,
+                           metric: str = "ios") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Shift per-tile detections into frame coordinates and remove cross-tile duplicates
+    
+    Args:
+        predictions: Per-tile (xyxy, confidence, class_id) arrays in tile pixels
+        offsets: Per-tile (x, y) origin in frame pixels
+        iou_threshold: Overlap above which a lower-scoring box of the same class is dropped
+        metric: Overlap metric passed to NMS ("ios" merges boxes clipped at tile edges)
+    
+    Returns:
+        (xyxy [N, 4], confidence [N], class_id [N]) in frame pixels
+    """
+    boxes, scores, classes = [], [], []
+    for (xyxy, conf, cls), (dx, dy) in zip(predictions, offsets):
+        if len(conf) == 0:
+            continue
+        boxes.append(np.asarray(xyxy, dtype=np.float32) + np.array([dx, dy, dx, dy], dtype=np.float32))
+        scores.append(np.asarray(conf, dtype=np.float32))
+        classes.append(np.asarray(cls, dtype=np.int64))
+    
+    if not boxes:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+    
+    boxes, scores, classes = np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes)
+    keep = batched_nms(boxes, scores, classes, iou_threshold, metric)
+    return boxes[keep], scores[keep], classes[keep]
@@ -0,0 +1,260 @@
+"""
+DroneAid 2026 - Detection Tracking
+Associates detections across video frames into persistent tracks and reports only what changed
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ops import box_iou
+
+def _detection_arrays(result: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(xywh boxes [N, 4], confidences [N], class names [N]) from either result layout"""
+    if "boxes" in result:
+        boxes = np.asarray(result["boxes"], dtype=np.float64).reshape(-1, 4)
+        confidence = np.asarray(result["scores"], dtype=np.float64)
+        names = np.asarray(result["class_names"], dtype=object)[np.asarray(result["class_ids"], dtype=np.intp)]
+    else:
+        detections = result.get("detections", [])
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float64).reshape(-1, 4)
+        confidence = np.array([d["confidence"] for d in detections], dtype=np.float64)
+        names = np.array([d["class_name"] for d in detections], dtype=object)
+    return boxes, confidence, names
+
+def _xyxy(boxes: np.ndarray) -> np.ndarray:
+    """[x, y, w, h] (top-left corner) boxes to [x1, y1, x2, y2]"""
+    return np.concatenate([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]], axis=1)
+
+def _paired_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """IoU of each [x, y, w, h] box with the box at the same position in the other [N, 4] array"""
+    inter_w = (np.minimum(boxes1[:, 0] + boxes1[:, 2], boxes2[:, 0] + boxes2[:, 2]) - np.maximum(boxes1[:, 0], boxes2[:, 0])).clip(0)
+    inter_h = (np.minimum(boxes1[:, 1] + boxes1[:, 3], boxes2[:, 1] + boxes2[:, 3]) - np.maximum(boxes1[:, 1], boxes2[:, 1])).clip(0)
+    inter = inter_w * inter_h
+    return inter / (boxes1[:, 2] * boxes1[:, 3] + boxes2[:, 2] * boxes2[:, 3] - inter + 1e-9)
+
+class Track:
+    """One symbol followed across frames"""
+    
+    __slots__ = ("track_id", "class_name", "box", "velocity", "confidence", "hits", "misses", "first_frame",
+                 "last_frame", "confirmed", "reported_box", "reported_confidence")
+    
+    def __init__(self, track_id: int, class_name: str, box: np.ndarray, confidence: float, frame: int):
+        self.track_id = track_id
+        self.class_name = class_name
+        self.box = box
+        self.velocity = np.zeros(2)
+        self.confidence = confidence
+        self.hits = 1
+        self.misses = 0
+        self.first_frame = frame
+        self.last_frame = frame
+        self.confirmed = False
+        self.reported_box = box
+        self.reported_confidence = confidence
+    
+    def predicted(self) -> np.ndarray:
+        """Box expected in the next frame, moving at the track's velocity"""
+        box = self.box.copy()
+        box[:2] += self.velocity * (self.misses + 1)
+        return box
+    
+    def observe(self, box: np.ndarray, confidence: float, frame: int):
+        # Smoothed per-frame motion, mostly the camera's; spread over the frames the track was missed
+        step = (box[:2] - self.box[:2]) / (self.misses + 1)
+        self.velocity = 0.5 * self.velocity + 0.5 * step
+        self.box, self.confidence = box, confidence
+        self.hits += 1
+        self.misses = 0
+        self.last_frame = frame
+    
+    def to_dict(self, event: str) -> Dict[str, Any]:
+        return {
+            "track_id": self.track_id,
+            "event": event,
+            "class_name": self.class_name,
+            "confidence": round(self.confidence, 4),
+            "bbox": [round(v, 2) for v in self.box.tolist()],
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "hits": self.hits,
+        }
+
+class DetectionTracker:
+    """
+    Gives detections persistent track IDs across the frames of one stream
+    
+    Each frame's detections are matched to the existing tracks of the same
+    class by IoU with the track's predicted box. Low frame rates or fast
+    flights can move a symbol further than its own size between frames, so
+    pairs that do not overlap may still match when their centers are close
+    (within `max_distance` box diagonals), ranked below any overlapping pair.
+    The whole tracks x detections cost matrix is computed in one NumPy pass
+    and matched greedily, best pair first.
+    
+    `update` returns events instead of detections:
+    
+    - "new" once a track has been seen in `min_hits` consecutive frames
+      (single-frame false positives never produce an event)
+    - "updated" when a confirmed track's confidence has changed by
+      `change_confidence` since it was last reported, or (with `change_iou`
+      set) it has moved so far that its IoU with the reported box is below it
+    - "lost" when a confirmed track has not been seen for `max_age` frames
+    
+    A symbol in view for a thousand frames thus produces a handful of
+    events, and the number of tracks per class is a stable count of the
+    symbols seen. Movement is not reported by default: from a moving drone
+    every box moves in every frame.
+    """
+    
+    def __init__(self, iou_threshold: float = 0.3, max_distance: float = 2.0, max_age: int = 30, min_hits: int = 2,
+                 change_iou: float = 0.0, change_confidence: float = 0.15):
+        """
+        Initialize the tracker
+        
+        Args:
+            iou_threshold: Minimum IoU for an overlap match
+            max_distance: Center distance, in mean box diagonals, still accepted without overlap (0 disables)
+            max_age: Frames a confirmed track survives without a match
+            min_hits: Consecutive frames before a track is confirmed and reported
+            change_iou: IoU with the last reported box below which a track is reported again (0 disables)
+            change_confidence: Confidence change that reports a track again
+        """
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.min_hits = max(1, int(min_hits))
+        self.change_iou = change_iou
+        self.change_confidence = change_confidence
+        
+        self.tracks: List[Track] = []
+        self._next_id = 1
+        
+        # Statistics
+        self.frames = 0
+        self.detections = 0
+        self.events = 0
+        self.totals: Counter = Counter()
+    
+    def _associate(self, boxes: np.ndarray, names: np.ndarray) -> List[Tuple[int, int]]:
+        """Greedy best-first (track index, detection index) matches"""
+        if not self.tracks or not len(boxes):
+            return []
+        predicted = np.array([track.predicted() for track in self.tracks])
+        track_names = np.array([track.class_name for track in self.tracks], dtype=object)
+        
+        iou = box_iou(_xyxy(predicted), _xyxy(boxes))
+        score = np.where(iou >= self.iou_threshold, iou, 0.0)
+        if self.max_distance > 0:
+            centers = predicted[:, None, :2] + predicted[:, None, 2:] / 2 - boxes[None, :, :2] - boxes[None, :, 2:] / 2
+            diagonal = (np.hypot(predicted[:, None, 2], predicted[:, None, 3]) + np.hypot(boxes[None, :, 2], boxes[None, :, 3])) / 2
+            distance = np.hypot(centers[..., 0], centers[..., 1]) / np.maximum(diagonal, 1e-9)
+            # Always below iou_threshold, so an overlapping pair wins over a nearby one
+            nearby = self.iou_threshold * (1 - distance / self.max_distance)
+            score = np.where((score == 0) & (distance < self.max_distance), nearby, score)
+        score[track_names[:, None] != names[None, :]] = 0
+        
+        matches, used_tracks, used_detections = [], set(), set()
+        columns = score.shape[1]
+        for flat in np.argsort(-score, axis=None, kind="stable"):
+            if score.flat[flat] <= 0:
+                break
+            t, d = divmod(int(flat), columns)
+            if t not in used_tracks and d not in used_detections:
+                matches.append((t, d))
+                used_tracks.add(t)
+                used_detections.add(d)
+        return matches
+    
+    def _changed(self, tracks: List[Track]) -> np.ndarray:
+        """Which of these tracks moved off or changed confidence since they were last reported"""
+        confidence = np.array([track.confidence for track in tracks])
+        reported_confidence = np.array([track.reported_confidence for track in tracks])
+        changed = np.abs(confidence - reported_confidence) >= self.change_confidence
+        if self.change_iou > 0:
+            boxes = np.array([track.box for track in tracks])
+            reported_boxes = np.array([track.reported_box for track in tracks])
+            changed |= _paired_iou(boxes, reported_boxes) < self.change_iou
+        return changed
+    
+    def _report(self, track: Track, event: str, events: List[Dict[str, Any]]):
+        track.reported_box, track.reported_confidence = track.box, track.confidence
+        events.append(track.to_dict(event))
+    
+    def update(self, result: Dict[str, Any], frame: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Add one frame's detections
+        
+        Args:
+            result: Detection result of the frame (either layout), as returned by DroneAidDetector.detect
+            frame: Frame number to record on the tracks (default: frames seen so far)
+        
+        Returns:
+            Track events ("new", "updated", "lost") caused by this frame; usually empty
+        """
+        boxes, confidence, names = _detection_arrays(result)
+        self.frames += 1
+        self.detections += len(boxes)
+        frame = self.frames if frame is None else frame
+        events: List[Dict[str, Any]] = []
+        
+        matches = self._associate(boxes, names)
+        matched_tracks = {t for t, _ in matches}
+        matched_detections = {d for _, d in matches}
+        
+        confirmed = []
+        for t, d in matches:
+            track = self.tracks[t]
+            track.observe(boxes[d], float(confidence[d]), frame)
+            if track.confirmed:
+                confirmed.append(track)
+            elif track.hits >= self.min_hits:
+                track.confirmed = True
+                self.totals[track.class_name] += 1
+                self._report(track, "new", events)
+        if confirmed:
+            for track, changed in zip(confirmed, self._changed(confirmed)):
+                if changed:
+                    self._report(track, "updated", events)
+        
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                # Tentative tracks must be seen in consecutive frames
+                if not track.confirmed or track.misses > self.max_age:
+                    if track.confirmed:
+                        events.append(track.to_dict("lost"))
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+        
+        for d in range(len(boxes)):
+            if d not in matched_detections:
+                track = Track(self._next_id, names[d], boxes[d], float(confidence[d]), frame)
+                self._next_id += 1
+                self.tracks.append(track)
+                if self.min_hits <= 1:
+                    track.confirmed = True
+                    self.totals[track.class_name] += 1
+                    self._report(track, "new", events)
+        
+        self.events += len(events)
+        return events
+    
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Confirmed tracks per class: currently followed ("active") and since the start ("total")"""
+        return {
+            "active": dict(Counter(track.class_name for track in self.tracks if track.confirmed)),
+            "total": dict(self.totals),
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "events": self.events,
+            "tracks": sum(self.totals.values()),
+            "events_per_detection": round(self.events / self.detections, 4) if self.detections else None,
+        }
@@ -0,0 +1,243 @@
+"""
+DroneAid 2026 - Inference Worker Pool
+Runs blocking decode and inference work off the asyncio event loop
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from batching import percentile
+from imaging import decode_for_model, decode_image, restore_scale
+from metrics import capture_stages
+
+# Detector owned by a worker process (process mode only)
+_worker_detector = None
+
+def _init_worker(model_path: Optional[str]):
+    """Load a detector once per worker process"""
+    global _worker_detector
+    from model import DroneAidDetector
+    _worker_detector = DroneAidDetector(model_path)
+
+def detect_bytes(data: bytes, conf_threshold: float = 0.5, tiling: Optional[Dict[str, Any]] = None,
+                 decode_size: int = 0, columnar: bool = False) -> Tuple[Dict[str, Any], List[Tuple[str, float]]]:
+    """
+    Decode and run detection inside a worker process
+    
+    Sliced inference runs when tiling options are given; otherwise the image is
+    decoded at reduced size when decode_size allows it (see `decode_for_model`).
+    
+    Returns:
+        Tuple of (detection result, stage timings for `metrics.record_stages`)
+    """
+    with capture_stages() as stages:
+        if tiling is not None:
+            image = decode_image(data)
+            return _worker_detector.detect_tiled(image, conf_threshold=conf_threshold, columnar=columnar,
+                                                 **tiling), stages
+        image, original_size = decode_for_model(data, decode_size)
+        result = _worker_detector.detect(image, conf_threshold=conf_threshold, columnar=columnar)
+        return restore_scale(result, image.shape, original_size), stages
+
+def _worker_ready(warmup: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Warm up the detector of a worker process and describe its model (see `DroneAidDetector.describe`)"""
+    if _worker_detector is None or _worker_detector.model is None:
+        return None
+    _worker_detector.warmup(**(warmup or {}))
+    return _worker_detector.describe()
+
+def _timed_call(fn, args):
+    """Run fn(*args) and report when it actually started executing"""
+    started = time.monotonic()
+    return started, fn(*args)
+
+class QueueFullError(Exception):
+    """Raised when the admission queue is full and a request is rejected"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+class InferencePool:
+    """
+    Bounded executor for decode and inference work
+    
+    At most `max_workers + max_queue` requests are admitted at once. Further
+    requests are rejected immediately with `QueueFullError`, so latency stays
+    bounded under overload instead of growing with an unbounded backlog.
+    
+    In "thread" mode work shares the application's detector (and its
+    micro-batcher). In "process" mode each worker process loads its own
+    detector and runs decode + inference for a whole request.
+    """
+    
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None,
+                 max_queue: int = 32, model_path: Optional[str] = None,
+                 stats_window: int = 2048):
+        """
+        Initialize the pool
+        
+        Args:
+            mode: "thread" or "process"
+            max_workers: Number of workers (defaults to min(4, CPU count))
+            max_queue: Number of admitted requests allowed to wait for a worker
+            model_path: Model loaded by each worker process (process mode only)
+            stats_window: Number of recent requests kept for wait-time percentiles
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max(0, int(max_queue))
+        self.executor = self._create_executor(model_path)
+        
+        # Statistics
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self._waits_ms = deque(maxlen=stats_window)
+        self._service_s = deque(maxlen=stats_window)
+    
+    def _create_executor(self, model_path: Optional[str]):
+        if self.mode == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(model_path,),
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference",
+        )
+    
+    async def _warm(self, executor, warmup: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # One task per worker; each task keeps its process busy, so the
+        # executor starts every worker instead of reusing the first one
+        loop = asyncio.get_running_loop()
+        descriptions = await asyncio.gather(*(loop.run_in_executor(executor, _worker_ready, warmup)
+                                              for _ in range(self.max_workers)))
+        if descriptions[0] is None:
+            raise RuntimeError("Worker processes have no model loaded")
+        return descriptions[0]
+    
+    async def warmup(self, warmup: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Start the worker processes and warm up their models (process mode only)
+        
+        Args:
+            warmup: Keyword arguments for `DroneAidDetector.warmup`
+        
+        Returns:
+            The workers' model description (see `DroneAidDetector.describe`), or None in thread mode
+        
+        Raises:
+            RuntimeError: If the workers could not load a model
+        """
+        if self.mode == "process":
+            return await self._warm(self.executor, warmup)
+        return None
+    
+    async def reload(self, model_path: str, warmup: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Replace the worker processes with ones serving a new model (process mode only)
+        
+        New workers are started and warmed up before they take traffic; the old
+        workers finish the requests already handed to them and then exit.
+        
+        Args:
+            model_path: Model the new workers load
+            warmup: Keyword arguments for `DroneAidDetector.warmup`
+        
+        Returns:
+            The new workers' model description, or None in thread mode
+        
+        Raises:
+            BrokenProcessPool: If the new workers crash while loading the model
+            RuntimeError: If the new workers could not load the model
+        """
+        if self.mode != "process":
+            return None
+        
+        executor = self._create_executor(model_path)
+        try:
+            description = await self._warm(executor, warmup)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        
+        previous, self.executor = self.executor, executor
+        previous.shutdown(wait=False)
+        return description
+    
+    @property
+    def capacity(self) -> int:
+        """Maximum number of requests admitted at once"""
+        return self.max_workers + self.max_queue
+    
+    @property
+    def queue_depth(self) -> int:
+        """Admitted requests that are waiting for a free worker"""
+        return max(0, self.admitted - self.max_workers)
+    
+    def retry_after(self) -> int:
+        """Estimate in seconds until a slot frees up, for the Retry-After header"""
+        if not self._service_s:
+            return 1
+        mean_service = sum(self._service_s) / len(self._service_s)
+        return max(1, math.ceil(mean_service * self.admitted / self.max_workers))
+    
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Reserve a slot for one request for the duration of the block
+        
+        Raises:
+            QueueFullError: If the pool is already at capacity
+        """
+        if self.admitted >= self.capacity:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+        
+        self.admitted += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.admitted -= 1
+            self.completed += 1
+            self._service_s.append(time.monotonic() - start)
+    
+    async def run(self, fn, *args) -> Any:
+        """Run a blocking callable on the pool and record how long it waited"""
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        started, result = await loop.run_in_executor(self.executor, _timed_call, fn, args)
+        self._waits_ms.append((started - submitted) * 1000)
+        return result
+    
+    def shutdown(self):
+        """Stop the workers"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, capacity and wait-time percentiles"""
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.admitted,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms": {
+                "p50": percentile(self._waits_ms, 50),
+                "p99": percentile(self._waits_ms, 99),
+            },
+        }
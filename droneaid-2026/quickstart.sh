@@ -94,9 +94,13 @@ sleep 10
 echo ""
 echo "Checking service status..."
 
-# Check inference API
-if curl -s http://localhost:8000/health > /dev/null; then
-    echo "✓ Inference API is running"
+# Check inference API (/ready succeeds once the model is loaded and warmed up)
+for _ in $(seq 1 30); do
+    curl -sf http://localhost:8000/ready > /dev/null && break
+    sleep 2
+done
+if curl -sf http://localhost:8000/ready > /dev/null; then
+    echo "✓ Inference API is ready"
 else
     echo "⚠ Inference API may not be ready yet"
 fi
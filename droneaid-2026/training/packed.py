@@ -0,0 +1,115 @@
+"""
+DroneAid 2026 - Packed Dataset Splits
+One memory-mappable file per split holding every JPEG, with a small index of names, shapes and labels
+"""
+
+from io import BytesIO
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# JPEGs are stored back to back, each starting on an aligned offset
+ALIGNMENT = 64
+
+def pack_paths(packed_dir, split):
+    """(data file, index file) of one packed split"""
+    return Path(packed_dir) / f'{split}.pack', Path(packed_dir) / f'{split}.index.npz'
+
+def pack_split(dataset_dir, split, packed_dir):
+    """
+    Pack the images and labels of one split
+    
+    The JPEG bytes are copied as they are (no re-encoding), so packing costs
+    one read per file. Files are written under temporary names and renamed,
+    so a reader never sees a half-written pack.
+    
+    Args:
+        dataset_dir: Dataset directory with images/<split> and labels/<split>
+        split: Split to pack ('train' or 'val')
+        packed_dir: Directory for <split>.pack and <split>.index.npz
+    
+    Returns:
+        Number of images packed
+    """
+    images_dir = Path(dataset_dir) / 'images' / split
+    labels_dir = Path(dataset_dir) / 'labels' / split
+    data_path, index_path = pack_paths(packed_dir, split)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    names, offsets, lengths, shapes = [], [], [], []
+    label_rows, label_offsets = [], [0]
+    offset = 0
+    temp_data = data_path.with_suffix('.pack.tmp')
+    with open(temp_data, 'wb') as f:
+        for image_path in sorted(images_dir.glob('*.jpg')):
+            data = image_path.read_bytes()
+            padding = -offset % ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            
+            f.write(data)
+            names.append(str(image_path))
+            offsets.append(offset)
+            lengths.append(len(data))
+            # Only the JPEG header is parsed
+            width, height = Image.open(BytesIO(data)).size
+            shapes.append((height, width))
+            offset += len(data)
+            
+            label_path = labels_dir / f'{image_path.stem}.txt'
+            lines = label_path.read_text().split('\n') if label_path.exists() else []
+            rows = np.array([line.split() for line in lines if line.strip()], dtype=np.float32).reshape(-1, 5)
+            label_rows.append(rows)
+            label_offsets.append(label_offsets[-1] + len(rows))
+    
+    temp_index = index_path.with_suffix('.tmp.npz')
+    np.savez(
+        temp_index,
+        names=np.array(names),
+        offsets=np.array(offsets, dtype=np.int64),
+        lengths=np.array(lengths, dtype=np.int64),
+        shapes=np.array(shapes, dtype=np.int32).reshape(-1, 2),
+        labels=np.concatenate(label_rows).astype(np.float32) if label_rows else np.zeros((0, 5), np.float32),
+        label_offsets=np.array(label_offsets, dtype=np.int64),
+    )
+    temp_data.replace(data_path)
+    temp_index.replace(index_path)
+    return len(names)
+
+class PackedSplit:
+    """
+    Read access to a packed split
+    
+    The data file is memory-mapped, so dataloader workers forked after it
+    is opened share the page cache, and reading an image is a slice and a
+    JPEG decode with no file opened.
+    """
+    
+    def __init__(self, packed_dir, split):
+        data_path, index_path = pack_paths(packed_dir, split)
+        with np.load(index_path) as index:
+            self.names = [str(name) for name in index['names']]
+            self.offsets = index['offsets']
+            self.lengths = index['lengths']
+            self.shapes = index['shapes']
+            self._labels = index['labels']
+            self._label_offsets = index['label_offsets']
+        self.data = np.memmap(data_path, dtype=np.uint8, mode='r') if len(self.names) else np.zeros(0, np.uint8)
+    
+    @staticmethod
+    def exists(packed_dir, split) -> bool:
+        return all(path.exists() for path in pack_paths(packed_dir, split))
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def image(self, i):
+        """Decode image i (BGR)"""
+        start = self.offsets[i]
+        return cv2.imdecode(self.data[start:start + self.lengths[i]], cv2.IMREAD_COLOR)
+    
+    def labels(self, i):
+        """YOLO label rows (class, x_center, y_center, width, height) of image i"""
+        return self._labels[self._label_offsets[i]:self._label_offsets[i + 1]]
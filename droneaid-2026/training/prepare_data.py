@@ -3,15 +3,22 @@ DroneAid 2026 - Data Preparation Script
 Prepares the DroneAid symbol icons for YOLOv8 training
 """
 
+import contextlib
+import hashlib
+import itertools
+import json
+import multiprocessing
 import os
 import shutil
 from pathlib import Path
 import yaml
-from PIL import Image, ImageDraw, ImageFilter, ImageEnhance
 import random
 import numpy as np
 import cv2
 
+from packed import PackedSplit, pack_paths, pack_split
+from synthesis import IconAtlas, Synthesizer
+
 # Symbol classes
 CLASSES = [
     'children',
@@ -24,11 +31,184 @@ CLASSES = [
     'water'
 ]
 
-def create_synthetic_dataset(icons_dir, output_dir, num_images_per_class=100):
+# Bumped when the manifest layout changes; older manifests are ignored
+MANIFEST_VERSION = 1
+
+# Source files whose contents are part of every shard key
+GENERATOR_FILES = ('prepare_data.py', 'synthesis.py')
+
+# Renderer owned by this process (each worker builds its icon pyramids and canvas once)
+_synthesizer = None
+
+def _init_worker(atlas=None):
+    global _synthesizer
+    # One OpenCV thread per worker; parallelism comes from the processes
+    cv2.setNumThreads(1)
+    _synthesizer = Synthesizer(atlas=atlas)
+
+def image_seed(seed, class_idx, index):
+    """Seed for one image, derived only from its (class, index) so any worker count gives the same output"""
+    return np.random.SeedSequence([seed, class_idx, index])
+
+def _rngs(sequence):
+    """(random.Random for augmentation choices, numpy Generator for pixel noise) from one SeedSequence"""
+    return random.Random(int(sequence.generate_state(1)[0])), np.random.default_rng(sequence)
+
+def render_image(synthesizer, icon_path, class_idx, sequence):
+    """
+    Render one single-icon sample
+    
+    Returns:
+        Tuple of (BGR image view, [(class_idx, x_center, y_center, width, height)])
+        with the box in YOLO format (normalized 0-1)
+    """
+    rng, np_rng = _rngs(sequence)
+    image, (x, y, icon_width, icon_height) = synthesizer.render(icon_path, rng, np_rng)
+    bg_height, bg_width = image.shape[:2]
+    
+    # Large icons overhang the bottom/right edge; label only the visible part,
+    # since YOLO rejects images whose coordinates fall outside 0-1
+    icon_width = min(icon_width, bg_width - x)
+    icon_height = min(icon_height, bg_height - y)
+    
+    # Calculate YOLO format bounding box
+    # YOLO format: class_id x_center y_center width height (all normalized 0-1)
+    bbox_width = icon_width / bg_width
+    bbox_height = icon_height / bg_height
+    bbox_x_center = (x + icon_width / 2) / bg_width
+    bbox_y_center = (y + icon_height / 2) / bg_height
+    return image, [(class_idx, bbox_x_center, bbox_y_center, bbox_width, bbox_height)]
+
+def render_scene(synthesizer, icons, sequence, symbols_per_scene):
+    """
+    Render one multi-symbol scene
+    
+    Returns:
+        Tuple of (BGR image view, [(class_idx, x_center, y_center, width, height), ...])
+        with one YOLO format box per symbol; scene symbols always lie fully inside the image
+    """
+    rng, np_rng = _rngs(sequence)
+    image, boxes = synthesizer.compose(icons, rng.randint(*symbols_per_scene), rng, np_rng)
+    bg_height, bg_width = image.shape[:2]
+    return image, [
+        (class_idx, (x + width / 2) / bg_width, (y + height / 2) / bg_height, width / bg_width, height / bg_height)
+        for class_idx, x, y, width, height in boxes
+    ]
+
+def _write_sample(image, boxes, image_path, label_path):
+    image_path.write_bytes(cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1])
+    with open(label_path, 'w') as f:
+        f.writelines(f'{class_idx} {x:.6f} {y:.6f} {width:.6f} {height:.6f}\n'
+                     for class_idx, x, y, width, height in boxes)
+
+def generate_image(task):
+    """
+    Render one synthetic image and write it with its YOLO label
+    
+    Args:
+        task: (icon_path, class_idx, class_name, index, split, images_dir, labels_dir, seed)
+    
+    Returns:
+        Image filename
+    """
+    icon_path, class_idx, class_name, i, split, images_dir, labels_dir, seed = task
+    image, boxes = render_image(_synthesizer, icon_path, class_idx, image_seed(seed, class_idx, i))
+    
+    img_filename = f'{class_name}_{i:04d}.jpg'
+    _write_sample(image, boxes, images_dir / split / img_filename, labels_dir / split / f'{class_name}_{i:04d}.txt')
+    return img_filename
+
+def generate_scene(task):
+    """
+    Render one scene with several symbols and write it with its multi-line YOLO label
+    
+    Args:
+        task: (icons, index, split, images_dir, labels_dir, seed, (min_symbols, max_symbols))
+            where icons is a list of (class_idx, icon_path)
+    
+    Returns:
+        Image filename
+    """
+    icons, i, split, images_dir, labels_dir, seed, symbols_per_scene = task
+    # Scenes draw from their own seed stream, after the per-class ones
+    image, boxes = render_scene(_synthesizer, icons, image_seed(seed, len(CLASSES), i), symbols_per_scene)
+    
+    img_filename = f'scene_{i:05d}.jpg'
+    _write_sample(image, boxes, images_dir / split / img_filename, labels_dir / split / f'scene_{i:05d}.txt')
+    return img_filename
+
+def _run_task(task):
+    function, args = task
+    return function(args)
+
+def _file_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def _generator_hash():
+    """Hash of the generator code, so changing how images are rendered invalidates every shard"""
+    here = Path(__file__).resolve().parent
+    digest = hashlib.sha256()
+    for name in GENERATOR_FILES:
+        digest.update((here / name).read_bytes())
+    return digest.hexdigest()
+
+def _shard_key(**params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def _load_manifest(path):
+    try:
+        manifest = json.loads(Path(path).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
+
+def _save_manifest(path, manifest):
+    temp = Path(path).with_suffix('.tmp')
+    temp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    temp.replace(path)
+
+def _remove_shard_files(images_dir, labels_dir, name):
+    """Delete every image and label of a shard (files are named <shard>_<index>)"""
+    for split in ('train', 'val'):
+        for path in itertools.chain((images_dir / split).glob(f'{name}_*.jpg'),
+                                    (labels_dir / split).glob(f'{name}_*.txt')):
+            path.unlink()
+
+def create_synthetic_dataset(icons_dir, output_dir, num_images_per_class=100, workers=None, seed=0,
+                             num_scenes=0, symbols_per_scene=(2, 8), splits=('train', 'val'), rebuild=False):
     """
     Create a synthetic dataset by placing icons on various backgrounds
     with augmentations (rotation, scale, position, lighting, color fading, shape emphasis)
     Enhanced to detect both color AND shape features for robustness against faded/washed-out icons
+    
+    Besides the single-icon images, num_scenes scene images are generated,
+    each holding several small symbols of mixed classes as seen from altitude,
+    so every image contributes several labelled instances.
+    
+    Images are rendered by a pool of worker processes. Every image draws its
+    random numbers from its own seed, derived from (seed, class, index), so the
+    dataset is identical for any number of workers. The icons are loaded once
+    into an atlas shared by all workers.
+    
+    Builds are incremental: manifest.json records a key per shard (one per
+    class, one for the scenes) hashed from the icon files, the parameters and
+    the generator code. Shards whose key is unchanged and whose files are
+    present are kept; only missing or changed shards are rendered. Each
+    split is then packed into one memory-mappable file under packed/.
+    
+    Args:
+        icons_dir: Directory containing icon-<class>.png files
+        output_dir: Dataset directory to write images/ and labels/ into
+        num_images_per_class: Images generated per class (first 80% train, rest val)
+        workers: Worker processes (default: CPU count; 1 renders in this process)
+        seed: Base seed for the whole dataset
+        num_scenes: Multi-symbol scene images generated (first 80% train, rest val)
+        symbols_per_scene: (min, max) symbols placed in each scene
+        splits: Splits to write (e.g. only 'val' when training streams its samples)
+        rebuild: Ignore the manifest and regenerate every shard
+    
+    Returns:
+        Number of images rendered (reused images are not counted)
     """
     print("Creating synthetic training dataset...")
     print("Enhanced with shape detection and color degradation simulation...")
@@ -37,155 +217,118 @@ def create_synthetic_dataset(icons_dir, output_dir, num_images_per_class=100):
     images_dir = Path(output_dir) / 'images'
     labels_dir = Path(output_dir) / 'labels'
     
-    for split in ['train', 'val']:
+    for split in splits:
         (images_dir / split).mkdir(parents=True, exist_ok=True)
         (labels_dir / split).mkdir(parents=True, exist_ok=True)
     
-    # Background sizes
-    bg_sizes = [(640, 480), (800, 600), (1024, 768), (1280, 720)]
-    
-    img_count = 0
+    manifest_path = Path(output_dir) / 'manifest.json'
+    manifest = {} if rebuild else _load_manifest(manifest_path)
+    generator = _generator_hash()
+    present = {split: set(os.listdir(images_dir / split)) for split in splits}
     
+    # Every class is one shard, and the scenes are another; each shard's key covers its inputs
+    shards = {}
+    icons = []
     for class_idx, class_name in enumerate(CLASSES):
         icon_path = Path(icons_dir) / f'icon-{class_name}.png'
         
         if not icon_path.exists():
             print(f"Warning: Icon not found: {icon_path}")
             continue
+        icon_hash = _file_hash(icon_path)
+        icons.append((class_idx, str(icon_path), icon_hash))
         
-        # Load icon
-        icon = Image.open(icon_path).convert('RGBA')
-        
-        # Generate images for this class
+        files = {}
+        tasks = {}
         for i in range(num_images_per_class):
             # Determine train/val split (80/20)
             split = 'train' if i < num_images_per_class * 0.8 else 'val'
-            
-            # Random background size
-            bg_width, bg_height = random.choice(bg_sizes)
-            
-            # Create background (varying shades of gray, concrete, grass-like textures)
-            bg_type = random.choice(['solid', 'gradient', 'noisy'])
-            
-            if bg_type == 'solid':
-                bg_color = random.randint(40, 220)
-                background = Image.new('RGB', (bg_width, bg_height), (bg_color, bg_color, bg_color))
-            elif bg_type == 'gradient':
-                background = Image.new('RGB', (bg_width, bg_height))
-                pixels = np.zeros((bg_height, bg_width, 3), dtype=np.uint8)
-                for y in range(bg_height):
-                    color = int(100 + (y / bg_height) * 100)
-                    pixels[y, :] = [color, color, color]
-                background = Image.fromarray(pixels)
-            else:  # noisy
-                bg_base = random.randint(80, 180)
-                pixels = np.random.randint(-30, 30, (bg_height, bg_width, 3)) + bg_base
-                pixels = np.clip(pixels, 0, 255).astype(np.uint8)
-                background = Image.fromarray(pixels)
-            
-            # Random scale (50% to 150% of original size)
-            scale = random.uniform(0.5, 1.5)
-            new_size = (int(icon.width * scale), int(icon.height * scale))
-            scaled_icon = icon.resize(new_size, Image.LANCZOS)
-            
-            # === NEW: Color degradation simulation (50% of images) ===
-            # This simulates faded, washed-out, or sun-bleached icons
-            if random.random() < 0.5:
-                # Reduce saturation (desaturate to simulate fading)
-                saturation_factor = random.uniform(0.3, 0.7)  # 30-70% saturation
-                enhancer = ImageEnhance.Color(scaled_icon)
-                scaled_icon = enhancer.enhance(saturation_factor)
-                
-                # Adjust brightness (simulate sun bleaching or fading)
-                brightness_factor = random.uniform(0.7, 1.3)
-                enhancer = ImageEnhance.Brightness(scaled_icon)
-                scaled_icon = enhancer.enhance(brightness_factor)
-                
-                # Reduce contrast (washed out appearance)
-                if random.random() < 0.3:
-                    contrast_factor = random.uniform(0.5, 0.8)
-                    enhancer = ImageEnhance.Contrast(scaled_icon)
-                    scaled_icon = enhancer.enhance(contrast_factor)
-            
-            # Random rotation
-            angle = random.uniform(-30, 30)
-            rotated_icon = scaled_icon.rotate(angle, expand=True, fillcolor=(0, 0, 0, 0))
-            
-            # Random position (ensure icon fits)
-            max_x = max(0, bg_width - rotated_icon.width)
-            max_y = max(0, bg_height - rotated_icon.height)
-            x = random.randint(0, max_x) if max_x > 0 else 0
-            y = random.randint(0, max_y) if max_y > 0 else 0
-            
-            # Paste icon onto background
-            background.paste(rotated_icon, (x, y), rotated_icon)
-            
-            # === NEW: Weather/environmental effects (30% of images) ===
-            if random.random() < 0.3:
-                effect_type = random.choice(['fog', 'haze', 'sunglare'])
-                
-                if effect_type == 'fog':
-                    # Add white fog overlay
-                    fog_layer = Image.new('RGB', (bg_width, bg_height), (255, 255, 255))
-                    background = Image.blend(background, fog_layer, alpha=random.uniform(0.2, 0.4))
-                    
-                elif effect_type == 'haze':
-                    # Add gray haze
-                    haze_color = random.randint(180, 220)
-                    haze_layer = Image.new('RGB', (bg_width, bg_height), (haze_color, haze_color, haze_color))
-                    background = Image.blend(background, haze_layer, alpha=random.uniform(0.15, 0.35))
-                    
-                elif effect_type == 'sunglare':
-                    # Increase brightness in a gradient (sun glare effect)
-                    enhancer = ImageEnhance.Brightness(background)
-                    background = enhancer.enhance(random.uniform(1.2, 1.5))
-            
-            # Add slight blur or noise occasionally
-            if random.random() < 0.2:
-                background = background.filter(ImageFilter.GaussianBlur(radius=random.uniform(0.5, 2.0)))
-            
-            # === NEW: Add edge enhancement to emphasize shape (20% of images) ===
-            # This helps the model learn shape features, not just color
-            if random.random() < 0.2:
-                # Convert to numpy for OpenCV processing
-                bg_array = np.array(background)
-                
-                # Apply edge enhancement
-                edges = cv2.Canny(bg_array, 50, 150)
-                edges_colored = cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
-                
-                # Blend edges back into image (subtle)
-                bg_array = cv2.addWeighted(bg_array, 0.9, edges_colored, 0.1, 0)
-                background = Image.fromarray(bg_array)
-            
-            # Calculate YOLO format bounding box
-            # YOLO format: class_id x_center y_center width height (all normalized 0-1)
-            bbox_width = rotated_icon.width / bg_width
-            bbox_height = rotated_icon.height / bg_height
-            bbox_x_center = (x + rotated_icon.width / 2) / bg_width
-            bbox_y_center = (y + rotated_icon.height / 2) / bg_height
-            
-            # Save image
-            img_filename = f'{class_name}_{i:04d}.jpg'
-            img_path = images_dir / split / img_filename
-            background.convert('RGB').save(img_path, quality=85)
-            
-            # Save label
-            label_filename = f'{class_name}_{i:04d}.txt'
-            label_path = labels_dir / split / label_filename
-            with open(label_path, 'w') as f:
-                f.write(f'{class_idx} {bbox_x_center:.6f} {bbox_y_center:.6f} {bbox_width:.6f} {bbox_height:.6f}\n')
-            
+            files.setdefault(split, []).append(f'{class_name}_{i:04d}.jpg')
+            tasks.setdefault(split, []).append(
+                (generate_image, (str(icon_path), class_idx, class_name, i, split, images_dir, labels_dir, seed)))
+        key = _shard_key(generator=generator, icon=icon_hash, class_idx=class_idx,
+                         count=num_images_per_class, seed=seed)
+        shards[class_name] = (key, files, tasks)
+    
+    if icons:
+        scene_icons = [(class_idx, icon_path) for class_idx, icon_path, _ in icons]
+        files = {}
+        tasks = {}
+        for i in range(num_scenes):
+            split = 'train' if i < num_scenes * 0.8 else 'val'
+            files.setdefault(split, []).append(f'scene_{i:05d}.jpg')
+            tasks.setdefault(split, []).append(
+                (generate_scene, (scene_icons, i, split, images_dir, labels_dir, seed, symbols_per_scene)))
+        key = _shard_key(generator=generator, icons=[(class_idx, icon_hash) for class_idx, _, icon_hash in icons],
+                         count=num_scenes, symbols=list(symbols_per_scene), seed=seed)
+        shards['scene'] = (key, files, tasks)
+    
+    # Shards no longer produced (e.g. an icon was removed) are deleted with their files
+    for name in set(manifest.get('shards', {})) - set(shards):
+        _remove_shard_files(images_dir, labels_dir, name)
+        del manifest['shards'][name]
+    
+    # Reuse the splits of unchanged shards whose files are all present; regenerate the rest
+    pending = []
+    done = {}
+    for name, (key, files, tasks) in shards.items():
+        entry = manifest.get('shards', {}).get(name)
+        if entry is None or entry['key'] != key:
+            _remove_shard_files(images_dir, labels_dir, name)
+            entry = {'key': key, 'splits': []}
+        reused = [split for split in entry['splits']
+                  if split in splits and present[split].issuperset(files.get(split, ()))]
+        for split in splits:
+            if split not in reused:
+                pending.extend(tasks.get(split, ()))
+        done[name] = {'key': key, 'splits': sorted(set(entry['splits']) | set(splits))}
+        if reused:
+            print(f"  Reusing {name} ({', '.join(reused)})")
+    
+    # Decoded and pre-scaled once here; forked workers share it instead of each loading the icons
+    atlas = IconAtlas(icon_path for _, icon_path, _ in icons) if pending else None
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    
+    img_count = 0
+    with contextlib.ExitStack() as stack:
+        if workers == 1:
+            _init_worker(atlas)
+            results = (function(task) for function, task in pending)
+        else:
+            pool = stack.enter_context(multiprocessing.Pool(workers, initializer=_init_worker, initargs=(atlas,)))
+            # Small chunks keep workers busy without holding back progress reports
+            results = pool.imap_unordered(_run_task, pending, chunksize=4)
+        
+        for _ in results:
             img_count += 1
             if img_count % 100 == 0:
                 print(f"Generated {img_count} images...")
     
-    print(f"Dataset creation complete! Generated {img_count} total images.")
+    # Recorded only once every shard is complete, so an interrupted build is redone next time
+    manifest['version'] = MANIFEST_VERSION
+    manifest['shards'] = {**manifest.get('shards', {}), **done}
+    
+    # One packed file per split for the training dataloader, rebuilt when any of its shards changed
+    packed = manifest.setdefault('packed', {})
+    pack_key = _shard_key(shards={name: entry['key'] for name, entry in done.items()})
+    for split in splits:
+        if packed.get(split) != pack_key or not PackedSplit.exists(Path(output_dir) / 'packed', split):
+            count = pack_split(output_dir, split, Path(output_dir) / 'packed')
+            print(f"Packed {count} {split} images into {pack_paths(Path(output_dir) / 'packed', split)[0]}")
+            packed[split] = pack_key
+    _save_manifest(manifest_path, manifest)
+    
+    scene_count = sum(function is generate_scene for function, _ in pending)
+    print(f"Dataset creation complete! Generated {img_count} total images ({scene_count} multi-symbol scenes).")
     print("  - 50% with color degradation (faded/washed-out simulation)")
     print("  - 30% with weather effects (fog/haze/sunglare)")
     print("  - 20% with edge enhancement (shape emphasis)")
     return img_count
 
+def scene_symbols():
+    """(min, max) symbols per scene from SCENE_SYMBOLS_MIN/SCENE_SYMBOLS_MAX"""
+    return int(os.getenv('SCENE_SYMBOLS_MIN', '2')), int(os.getenv('SCENE_SYMBOLS_MAX', '8'))
+
 def create_dataset_yaml(output_dir):
     """Create the dataset YAML configuration file for YOLOv8"""
     
@@ -204,13 +347,24 @@ def create_dataset_yaml(output_dir):
     print(f"Dataset configuration saved to {yaml_path}")
     return yaml_path
 
-def main():
+def main(splits=('train', 'val')):
+    """Generate the dataset (only the given splits) and its YAML configuration"""
     # Paths
     icons_dir = Path('./assets/icons')
     output_dir = Path('./data/droneaid_dataset')
     
-    # Create dataset
-    num_images = create_synthetic_dataset(icons_dir, output_dir, num_images_per_class=150)
+    # Create dataset (DATA_WORKERS processes, default one per CPU; DATA_SEED fixes the output;
+    # DATA_SCENES multi-symbol scenes with SCENE_SYMBOLS_MIN-SCENE_SYMBOLS_MAX symbols each;
+    # unchanged shards are reused unless DATA_REBUILD=1)
+    num_images = create_synthetic_dataset(
+        icons_dir, output_dir, num_images_per_class=150,
+        workers=int(os.getenv('DATA_WORKERS', '0')) or None,
+        seed=int(os.getenv('DATA_SEED', '0')),
+        num_scenes=int(os.getenv('DATA_SCENES', '400')),
+        symbols_per_scene=scene_symbols(),
+        splits=splits,
+        rebuild=os.getenv('DATA_REBUILD', '0') == '1'
+    )
     
     # Create YAML config
     yaml_path = create_dataset_yaml(output_dir)
@@ -219,7 +373,8 @@ def main():
     print("Dataset preparation complete!")
     print(f"Total images generated: {num_images}")
     print(f"Dataset config: {yaml_path}")
-    print(f"Train images: {output_dir}/images/train/")
+    if 'train' in splits:
+        print(f"Train images: {output_dir}/images/train/")
     print(f"Val images: {output_dir}/images/val/")
     print("="*60)
 
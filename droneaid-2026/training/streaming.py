@@ -0,0 +1,242 @@
+"""
+DroneAid 2026 - Streaming and Packed Datasets
+Feeds YOLOv8 training from freshly synthesized samples or packed splits instead of thousands of small files
+"""
+
+import math
+import os
+from functools import partial
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils.torch_utils import de_parallel
+
+from packed import PackedSplit
+from prepare_data import CLASSES, render_image, render_scene
+from synthesis import IconAtlas, Synthesizer
+
+# Keeps streamed seeds apart from the on-disk dataset's (seed, class, index) streams
+STREAM_KEY = 1 << 16
+
+class SyntheticStream:
+    """
+    Source of synthetic training samples, shared by all dataloader workers
+    
+    The icon atlas is built once in the training process; the dataloader's
+    worker processes inherit it and each builds its own Synthesizer on first
+    use. Samples are drawn in the same mix as the on-disk dataset: single-icon
+    images and multi-symbol scenes in the ratio of their counts.
+    """
+    
+    def __init__(self, icons_dir, num_images_per_class=150, num_scenes=400, symbols_per_scene=(2, 8), seed=0):
+        self.icons = [(class_idx, str(Path(icons_dir) / f'icon-{name}.png'))
+                      for class_idx, name in enumerate(CLASSES)
+                      if (Path(icons_dir) / f'icon-{name}.png').exists()]
+        if not self.icons:
+            raise FileNotFoundError(f"No icons found in {icons_dir}")
+        self.atlas = IconAtlas(path for _, path in self.icons)
+        self.scene_fraction = num_scenes / (num_scenes + num_images_per_class * len(self.icons) or 1)
+        self.symbols_per_scene = symbols_per_scene
+        self.seed = seed
+        
+        self._pid = None
+        self._synthesizer = None
+        self._count = 0
+    
+    def sample(self):
+        """
+        Render the next sample of this process
+        
+        Seeds come from (seed, dataloader worker seed, sample count). PyTorch
+        gives every worker of every dataloader iterator its own seed, derived
+        from the training seed, so workers never repeat each other and a
+        restarted loader (e.g. when mosaic is closed) does not replay samples.
+        
+        Returns:
+            Tuple of (BGR image, [(class_idx, x_center, y_center, width, height), ...])
+        """
+        if self._pid != os.getpid():
+            # First call in this (forked) worker: its own canvas, the shared atlas
+            cv2.setNumThreads(1)
+            self._pid, self._synthesizer, self._count = os.getpid(), Synthesizer(atlas=self.atlas), 0
+        
+        worker = torch.utils.data.get_worker_info()
+        sequence = np.random.SeedSequence([self.seed, STREAM_KEY, worker.seed if worker else 0, self._count])
+        self._count += 1
+        choice = np.random.default_rng(sequence.spawn(1)[0])
+        if choice.random() < self.scene_fraction:
+            return render_scene(self._synthesizer, self.icons, sequence, self.symbols_per_scene)
+        class_idx, icon_path = self.icons[choice.integers(len(self.icons))]
+        return render_image(self._synthesizer, icon_path, class_idx, sequence)
+
+def resize_for_training(image, imgsz):
+    """Resize so the longest side is imgsz, as YOLODataset.load_image does (always returns a new array)"""
+    h0, w0 = image.shape[:2]
+    ratio = imgsz / max(h0, w0)
+    if ratio == 1:
+        return image.copy()
+    size = (min(math.ceil(w0 * ratio), imgsz), min(math.ceil(h0 * ratio), imgsz))
+    return cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+
+def _label(im_file, rows, shape=None):
+    """YOLODataset label dict from (class, x_center, y_center, width, height) rows"""
+    rows = np.asarray(rows, dtype=np.float32).reshape(-1, 5)
+    label = {
+        "im_file": im_file,
+        "cls": rows[:, :1].copy(),
+        "bboxes": rows[:, 1:].copy(),
+        "segments": [],
+        "keypoints": None,
+        "normalized": True,
+        "bbox_format": "xywh",
+    }
+    if shape is not None:
+        label["shape"] = shape
+    return label
+
+class StreamingDataset(YOLODataset):
+    """
+    YOLO training dataset whose samples are rendered on demand
+    
+    Indexes only set the epoch length: every item, including the extra images
+    pulled in by mosaic and mixup, is a new sample from the stream. Images are
+    resized in memory exactly as YOLODataset.load_image does for files, so the
+    augmentation pipeline is unchanged.
+    """
+    
+    def __init__(self, *args, stream: SyntheticStream, epoch_size: int, **kwargs):
+        self.stream = stream
+        self.epoch_size = epoch_size
+        super().__init__(*args, **kwargs)
+    
+    def get_img_files(self, img_path):
+        return [f'stream_{i:06d}' for i in range(self.epoch_size)]
+    
+    def get_labels(self):
+        # Placeholders sized to the epoch; real labels come with each sample
+        return [_label(im_file, (), shape=(self.imgsz, self.imgsz)) for im_file in self.im_files]
+    
+    def get_image_and_label(self, index):
+        image, boxes = self.stream.sample()
+        
+        # Mosaic draws its extra images from the buffer's indexes, as with files
+        if self.augment:
+            self.buffer.append(index)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                self.buffer.pop(0)
+        
+        # A new array: the stream's image is a view into its canvas, and mosaic renders more before using this one
+        h0, w0 = image.shape[:2]
+        image = resize_for_training(image, self.imgsz)
+        
+        label = _label(self.im_files[index], boxes)
+        label["img"], label["ori_shape"], label["resized_shape"] = image, (h0, w0), image.shape[:2]
+        label["ratio_pad"] = (label["resized_shape"][0] / h0, label["resized_shape"][1] / w0)
+        return self.update_labels_info(label)
+
+class PackedDataset(YOLODataset):
+    """
+    YOLO dataset read from a packed split (see packed.py)
+    
+    Names, shapes and labels come from the pack's index, and images are
+    decoded from the memory-mapped pack, so no image or label file is opened.
+    Everything else, including caching and rectangular validation batches,
+    is YOLODataset's.
+    """
+    
+    def __init__(self, *args, pack: PackedSplit, **kwargs):
+        self.pack = pack
+        super().__init__(*args, **kwargs)
+    
+    def get_img_files(self, img_path):
+        return list(self.pack.names)
+    
+    def get_labels(self):
+        return [_label(name, self.pack.labels(i), shape=tuple(int(v) for v in self.pack.shapes[i]))
+                for i, name in enumerate(self.pack.names)]
+    
+    def load_image(self, i, rect_mode=True):
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+        
+        image = self.pack.image(i)
+        if image is None:
+            raise FileNotFoundError(f"Image not decodable in pack: {self.im_files[i]}")
+        h0, w0 = image.shape[:2]
+        if rect_mode:
+            image = resize_for_training(image, self.imgsz)
+        elif not (h0 == w0 == self.imgsz):
+            image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+        
+        # Keep recent images for mosaic, as YOLODataset does
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = image, (h0, w0), image.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != "ram":
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return image, (h0, w0), image.shape[:2]
+
+class DroneAidTrainer(DetectionTrainer):
+    """
+    Detection trainer that reads packed splits and can stream its training samples
+    
+    The training split is streamed when a stream is given; otherwise each
+    split is read from its pack when one exists, and from the image files
+    when not.
+    
+    Ultralytics drops the dataloader workers to 0 on CPU and resets the
+    PyTorch thread count when it selects the device; `workers` and `threads`
+    given here are applied afterwards, because synthesizing and decoding
+    samples in the training process stalls the model's compute.
+    """
+    
+    def __init__(self, *args, stream: SyntheticStream = None, epoch_size: int = 0, packed_dir=None,
+                 workers: int = None, threads: int = None, **kwargs):
+        self.stream = stream
+        self.epoch_size = epoch_size
+        self.packed_dir = packed_dir
+        super().__init__(*args, **kwargs)
+        if workers is not None:
+            self.args.workers = workers
+        if threads:
+            torch.set_num_threads(threads)
+    
+    def build_dataset(self, img_path, mode="train", batch=None):
+        split = "train" if mode == "train" else "val"
+        if mode == "train" and self.stream is not None:
+            dataset_class, extra = StreamingDataset, {"stream": self.stream, "epoch_size": self.epoch_size}
+        elif self.packed_dir is not None and PackedSplit.exists(self.packed_dir, split):
+            dataset_class, extra = PackedDataset, {"pack": PackedSplit(self.packed_dir, split)}
+        else:
+            return super().build_dataset(img_path, mode, batch)
+        
+        # The arguments build_yolo_dataset passes for files
+        return dataset_class(
+            img_path=img_path,
+            imgsz=self.args.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=self.args,
+            rect=mode == "val",
+            cache=self.args.cache or None,
+            single_cls=self.args.single_cls,
+            stride=max(int(de_parallel(self.model).stride.max() if self.model else 0), 32),
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=f"{mode}: ",
+            task=self.args.task,
+            classes=self.args.classes,
+            data=self.data,
+            **extra,
+        )
+
+def make_trainer(stream: SyntheticStream = None, epoch_size: int = 0, packed_dir=None, workers: int = None,
+                 threads: int = None):
+    """Trainer class for `YOLO.train(trainer=...)`; see DroneAidTrainer"""
+    return partial(DroneAidTrainer, stream=stream, epoch_size=epoch_size, packed_dir=packed_dir,
+                   workers=workers, threads=threads)
@@ -0,0 +1,413 @@
+"""
+DroneAid 2026 - Synthesis Engine
+NumPy/OpenCV rendering of synthetic training images for prepare_data.py
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Background sizes (width, height)
+BG_SIZES = [(640, 480), (800, 600), (1024, 768), (1280, 720)]
+
+# Icon scales kept in each pyramid; every sample is warped from the smallest level at or above its scale.
+# The small levels serve scene icons, which are seen from altitude
+PYRAMID_SCALES = (0.0625, 0.125, 0.25, 0.5, 0.75, 1.0)
+
+# Scene icon size range in pixels (longest side before rotation); sizes are drawn log-uniformly
+SCENE_ICON_SIZES = (24, 160)
+
+# Minimum gap in pixels between the boxes of two icons in a scene
+SCENE_ICON_GAP = 4
+
+# Random positions tried per scene icon before it is left out
+SCENE_PLACEMENT_ATTEMPTS = 20
+
+# Render stages, in pipeline order, reported by Synthesizer.render
+STAGES = ('background', 'icon', 'degrade', 'paste', 'weather', 'blur', 'edges')
+
+# Luminance weights in BGR order (ITU-R 601, as used by PIL's "L" mode)
+GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+class IconPyramid:
+    """
+    Pre-scaled copies of one icon, built once per worker
+    
+    Levels are stored as BGRA with premultiplied alpha: interpolating them
+    does not bleed the color of transparent pixels into the icon's edge, and
+    compositing needs only a multiply and a saturating add.
+    """
+    
+    def __init__(self, path):
+        icon = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+        if icon is None:
+            raise FileNotFoundError(f"Icon not found: {path}")
+        if icon.shape[2] == 3:
+            icon = cv2.cvtColor(icon, cv2.COLOR_BGR2BGRA)
+        
+        self.width = icon.shape[1]
+        self.height = icon.shape[0]
+        
+        # Mean luminance over the whole icon, as used by the contrast reduction
+        self.mean_gray = float(cv2.cvtColor(icon[..., :3], cv2.COLOR_BGR2GRAY).mean())
+        
+        premultiplied = cv2.multiply(icon, cv2.merge([icon[..., 3]] * 3 + [np.full_like(icon[..., 3], 255)]),
+                                     scale=1 / 255)
+        self.levels = {}
+        for scale in PYRAMID_SCALES:
+            size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+            self.levels[scale] = (premultiplied if scale == 1.0 else
+                                  cv2.resize(premultiplied, size, interpolation=cv2.INTER_AREA))
+    
+    def level_for(self, scale):
+        """Return (level scale, image) of the smallest level that is at least `scale`"""
+        for level in PYRAMID_SCALES:
+            if level >= scale:
+                return level, self.levels[level]
+        return PYRAMID_SCALES[-1], self.levels[PYRAMID_SCALES[-1]]
+
+class IconAtlas:
+    """
+    Icon pyramids for a set of icons, packed into one contiguous buffer
+    
+    Built once in the parent process and handed to every worker: with the
+    fork start method the workers share the pages instead of each decoding
+    the PNGs and building its own pyramids.
+    """
+    
+    def __init__(self, icon_paths):
+        pyramids = {str(Path(path)): IconPyramid(path) for path in icon_paths}
+        
+        total = sum(level.nbytes for pyramid in pyramids.values() for level in pyramid.levels.values())
+        self.buffer = np.empty(total, dtype=np.uint8)
+        offset = 0
+        for pyramid in pyramids.values():
+            for scale, level in pyramid.levels.items():
+                view = self.buffer[offset:offset + level.nbytes].reshape(level.shape)
+                view[:] = level
+                pyramid.levels[scale] = view
+                offset += level.nbytes
+        self.pyramids = pyramids
+    
+    def __contains__(self, path):
+        return str(Path(path)) in self.pyramids
+    
+    def __getitem__(self, path) -> IconPyramid:
+        return self.pyramids[str(Path(path))]
+
+class SpatialGrid:
+    """
+    Uniform grid of occupied boxes for overlap tests during scene placement
+    
+    Each box is registered in every cell it touches, so testing a candidate
+    only looks at boxes in the cells it covers instead of every icon placed
+    so far.
+    """
+    
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self._cells = {}
+    
+    def _cells_for(self, x, y, width, height):
+        size = self.cell_size
+        for cell_x in range(x // size, (x + width - 1) // size + 1):
+            for cell_y in range(y // size, (y + height - 1) // size + 1):
+                yield cell_x, cell_y
+    
+    def overlaps(self, x, y, width, height, gap=0):
+        """Whether the box, grown by gap on every side, intersects a registered box"""
+        x, y, width, height = x - gap, y - gap, width + 2 * gap, height + 2 * gap
+        for cell in self._cells_for(x, y, width, height):
+            for other_x, other_y, other_width, other_height in self._cells.get(cell, ()):
+                if (x < other_x + other_width and other_x < x + width and
+                        y < other_y + other_height and other_y < y + height):
+                    return True
+        return False
+    
+    def insert(self, x, y, width, height):
+        box = (x, y, width, height)
+        for cell in self._cells_for(x, y, width, height):
+            self._cells.setdefault(cell, []).append(box)
+
+@contextmanager
+def _stage(timings, name):
+    """Add the seconds spent in the block to timings[name] (if timings is given)"""
+    start = time.perf_counter()
+    yield
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+class Synthesizer:
+    """
+    Renders one synthetic image at a time into a reused canvas
+    
+    Each worker process owns one Synthesizer. The canvas buffer is allocated
+    once for the largest background and every image is rendered into a
+    contiguous view of it, so the per-image work is writing pixels rather
+    than allocating full-size images. Icons are scaled and rotated by a
+    single affine warp from a cached pyramid level instead of a LANCZOS
+    resize of the full-size original followed by a rotation, and the
+    lighting and weather effects are applied in place with saturating
+    OpenCV arithmetic.
+    
+    `render` draws one full-size icon per image and `compose` draws a scene
+    of several small icons of mixed classes. Both return a view into the
+    canvas, which is only valid until the next call.
+    """
+    
+    def __init__(self, bg_sizes=BG_SIZES, atlas: IconAtlas = None):
+        self.bg_sizes = list(bg_sizes)
+        largest = max(width * height for width, height in self.bg_sizes)
+        self._buffer = np.empty(largest * 3, dtype=np.uint8)
+        self._gradients = {}
+        self._icons = dict(atlas.pyramids) if atlas is not None else {}
+        self._noise_luts = {}
+    
+    def icon(self, path) -> IconPyramid:
+        """Load an icon pyramid once (unless it is in the atlas) and reuse it for every later sample"""
+        key = str(Path(path))
+        pyramid = self._icons.get(key)
+        if pyramid is None:
+            pyramid = self._icons[key] = IconPyramid(key)
+        return pyramid
+    
+    def canvas(self, width, height):
+        """Contiguous (height, width, 3) view into the preallocated buffer"""
+        return self._buffer[:width * height * 3].reshape(height, width, 3)
+    
+    def _noise_lut(self, base):
+        # Maps uniform random bytes onto [base - 30, base + 30)
+        lut = self._noise_luts.get(base)
+        if lut is None:
+            lut = self._noise_luts[base] = (np.arange(256) * 60 // 256 + base - 30).astype(np.uint8)
+        return lut
+    
+    def _gradient(self, height):
+        rows = self._gradients.get(height)
+        if rows is None:
+            rows = (100 + (np.arange(height) / height) * 100).astype(np.uint8)
+            self._gradients[height] = rows = rows[:, None, None]
+        return rows
+    
+    def _background(self, rng, np_rng):
+        """Fill the canvas with a random background and return it"""
+        bg_width, bg_height = rng.choice(self.bg_sizes)
+        image = self.canvas(bg_width, bg_height)
+        
+        # Varying shades of gray, concrete, grass-like textures
+        bg_type = rng.choice(['solid', 'gradient', 'noisy'])
+        if bg_type == 'solid':
+            image.fill(rng.randint(40, 220))
+        elif bg_type == 'gradient':
+            image[:] = self._gradient(bg_height)
+        else:  # noisy
+            bg_base = rng.randint(80, 180)
+            # Raw random bytes mapped through a lookup table: far cheaper than bounded integers
+            noise = np.frombuffer(np_rng.bytes(image.size), dtype=np.uint8).reshape(image.shape)
+            cv2.LUT(noise, self._noise_lut(bg_base), dst=image)
+        return image
+    
+    @staticmethod
+    def _draw_icon_effects(rng):
+        """Draw (degrade factors or None, rotation angle) for one icon"""
+        # Lighting factors are drawn now but applied after the warp, which they commute with
+        degrade = None
+        if rng.random() < 0.5:
+            degrade = [rng.uniform(0.3, 0.7), rng.uniform(0.7, 1.3), None]
+            if rng.random() < 0.3:
+                degrade[2] = rng.uniform(0.5, 0.8)
+        return degrade, rng.uniform(-30, 30)
+    
+    def _stamp(self, image, pyramid, level, matrix, size, degrade, x, y, timings):
+        """Warp, fade and composite one icon at (x, y)"""
+        bg_height, bg_width = image.shape[:2]
+        
+        # Only the part of the icon that lands on the image is rendered
+        with _stage(timings, 'icon'):
+            visible_size = (min(size[0], bg_width - x), min(size[1], bg_height - y))
+            visible = cv2.warpAffine(level, matrix, visible_size, flags=cv2.INTER_LINEAR,
+                                     borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0, 0))
+        
+        with _stage(timings, 'degrade'):
+            if degrade is not None:
+                visible = cv2.transform(visible, self._degrade_matrix(pyramid.mean_gray, *degrade))
+        
+        with _stage(timings, 'paste'):
+            self._paste(image, visible, x, y)
+    
+    @staticmethod
+    def _effects(image, rng, timings):
+        """Apply the whole-image weather, blur and edge effects in place"""
+        # Weather/environmental effects (30% of images)
+        with _stage(timings, 'weather'):
+            if rng.random() < 0.3:
+                effect_type = rng.choice(['fog', 'haze', 'sunglare'])
+                if effect_type == 'fog':
+                    alpha = rng.uniform(0.2, 0.4)
+                    cv2.convertScaleAbs(image, dst=image, alpha=1 - alpha, beta=255 * alpha)
+                elif effect_type == 'haze':
+                    haze_color = rng.randint(180, 220)
+                    alpha = rng.uniform(0.15, 0.35)
+                    cv2.convertScaleAbs(image, dst=image, alpha=1 - alpha, beta=haze_color * alpha)
+                else:  # sunglare
+                    cv2.convertScaleAbs(image, dst=image, alpha=rng.uniform(1.2, 1.5))
+        
+        # Slight blur occasionally (20% of images)
+        with _stage(timings, 'blur'):
+            if rng.random() < 0.2:
+                cv2.GaussianBlur(image, (0, 0), sigmaX=rng.uniform(0.5, 2.0), dst=image)
+        
+        # Edge enhancement to emphasize shape (20% of images)
+        with _stage(timings, 'edges'):
+            if rng.random() < 0.2:
+                edges = cv2.cvtColor(cv2.Canny(image, 50, 150), cv2.COLOR_GRAY2BGR)
+                cv2.addWeighted(image, 0.9, edges, 0.1, 0, dst=image)
+    
+    def render(self, icon_path, rng, np_rng, timings=None):
+        """
+        Render one image with one icon
+        
+        Args:
+            icon_path: Icon PNG (with alpha)
+            rng: random.Random for all augmentation choices
+            np_rng: numpy Generator for pixel noise
+            timings: Optional dict to which seconds per stage are added
+        
+        Returns:
+            Tuple of (BGR image view, (x, y, icon_width, icon_height)) where
+            the box is the pasted icon's placement before clipping to the image
+        """
+        pyramid = self.icon(icon_path)
+        
+        with _stage(timings, 'background'):
+            image = self._background(rng, np_rng)
+        bg_height, bg_width = image.shape[:2]
+        
+        # Random scale (50% to 150% of original size)
+        scale = rng.uniform(0.5, 1.5)
+        degrade, angle = self._draw_icon_effects(rng)
+        level, matrix, (icon_width, icon_height) = self._placement(pyramid, scale, angle)
+        
+        # Random position (ensure icon fits)
+        max_x = max(0, bg_width - icon_width)
+        max_y = max(0, bg_height - icon_height)
+        x = rng.randint(0, max_x) if max_x > 0 else 0
+        y = rng.randint(0, max_y) if max_y > 0 else 0
+        
+        self._stamp(image, pyramid, level, matrix, (icon_width, icon_height), degrade, x, y, timings)
+        self._effects(image, rng, timings)
+        return image, (x, y, icon_width, icon_height)
+    
+    def compose(self, icons, count, rng, np_rng, timings=None):
+        """
+        Render one scene with up to `count` small icons of mixed classes
+        
+        Icons are sized as seen from altitude (SCENE_ICON_SIZES) and placed
+        fully inside the image without overlapping: each icon tries
+        SCENE_PLACEMENT_ATTEMPTS random positions, checked against a spatial
+        grid of the icons placed so far, and is left out if none is free.
+        
+        Args:
+            icons: List of (class_idx, icon_path) to draw each icon's class from
+            count: Number of icons to place
+            rng: random.Random for all augmentation choices
+            np_rng: numpy Generator for pixel noise
+            timings: Optional dict to which seconds per stage are added
+        
+        Returns:
+            Tuple of (BGR image view, [(class_idx, x, y, width, height), ...])
+        """
+        with _stage(timings, 'background'):
+            image = self._background(rng, np_rng)
+        bg_height, bg_width = image.shape[:2]
+        
+        # A cell the size of the largest icon keeps every lookup to a few cells
+        grid = SpatialGrid(SCENE_ICON_SIZES[1])
+        log_min, log_max = math.log(SCENE_ICON_SIZES[0]), math.log(SCENE_ICON_SIZES[1])
+        boxes = []
+        for _ in range(count):
+            class_idx, icon_path = rng.choice(icons)
+            pyramid = self.icon(icon_path)
+            scale = math.exp(rng.uniform(log_min, log_max)) / max(pyramid.width, pyramid.height)
+            degrade, angle = self._draw_icon_effects(rng)
+            level, matrix, (width, height) = self._placement(pyramid, scale, angle)
+            if width > bg_width or height > bg_height:
+                continue
+            
+            for _ in range(SCENE_PLACEMENT_ATTEMPTS):
+                x = rng.randint(0, bg_width - width)
+                y = rng.randint(0, bg_height - height)
+                if not grid.overlaps(x, y, width, height, SCENE_ICON_GAP):
+                    break
+            else:
+                continue
+            
+            grid.insert(x, y, width, height)
+            self._stamp(image, pyramid, level, matrix, (width, height), degrade, x, y, timings)
+            boxes.append((class_idx, x, y, width, height))
+        
+        self._effects(image, rng, timings)
+        return image, boxes
+    
+    @staticmethod
+    def _placement(pyramid: IconPyramid, scale, angle):
+        """
+        Plan scaling and rotating the icon as one affine warp
+        
+        Returns:
+            Tuple of (pyramid level, 2x3 warp matrix, (width, height)) where the
+            size is the rotated icon's bounding box, as with PIL's expand=True
+        """
+        level_scale, level = pyramid.level_for(scale)
+        width, height = int(pyramid.width * scale), int(pyramid.height * scale)
+        
+        radians = math.radians(angle)
+        cos, sin = abs(math.cos(radians)), abs(math.sin(radians))
+        out_width = max(1, math.ceil(width * cos + height * sin))
+        out_height = max(1, math.ceil(width * sin + height * cos))
+        
+        # Rotate about the level's center, then move that center to the output's center
+        center = ((level.shape[1] - 1) / 2, (level.shape[0] - 1) / 2)
+        matrix = cv2.getRotationMatrix2D(center, angle, scale / level_scale)
+        matrix[0, 2] += (out_width - 1) / 2 - center[0]
+        matrix[1, 2] += (out_height - 1) / 2 - center[1]
+        return level, matrix, (out_width, out_height)
+    
+    @staticmethod
+    def _degrade_matrix(mean_gray, saturation, brightness, contrast):
+        """
+        Color matrix that fades a premultiplied BGRA icon (alpha is left untouched)
+        
+        Reducing saturation (blending toward luminance), scaling brightness and
+        reducing contrast (blending toward the mean luminance) are all affine
+        in the color, so they collapse into one 4x4 matrix applied with a
+        single cv2.transform pass. The contrast offset is scaled by alpha,
+        which keeps the result premultiplied.
+        """
+        matrix = saturation * np.eye(3, dtype=np.float32) + (1 - saturation) * GRAY_WEIGHTS[None, :]
+        matrix *= brightness
+        offset = 0.0
+        if contrast is not None:
+            matrix *= contrast
+            offset = (1 - contrast) * mean_gray * brightness
+        
+        transform = np.zeros((4, 4), dtype=np.float32)
+        transform[:3, :3] = matrix
+        transform[:3, 3] = offset / 255
+        transform[3, 3] = 1
+        return transform
+    
+    @staticmethod
+    def _paste(image, icon, x, y):
+        """Composite a premultiplied BGRA icon onto the image at (x, y), in place"""
+        height, width = icon.shape[:2]
+        roi = image[y:y + height, x:x + width]
+        
+        # roi = icon + roi * (1 - alpha)
+        transparency = cv2.cvtColor(cv2.bitwise_not(cv2.extractChannel(icon, 3)), cv2.COLOR_GRAY2BGR)
+        cv2.multiply(roi, transparency, dst=roi, scale=1 / 255)
+        cv2.add(roi, cv2.cvtColor(icon, cv2.COLOR_BGRA2BGR), dst=roi)
@@ -1,50 +1,182 @@
 """
 DroneAid 2026 - Model Training Script
 Trains a YOLOv8 model on the DroneAid symbol dataset
+
+Usage:
+    python train.py                       # auto batch/workers, resumes an interrupted run
+    python train.py --epochs 50 --batch 8 --workers 2
+    python train.py --fresh --model yolov8s.pt
 """
 
+import argparse
+import json
 import os
+import resource
+import time
 from pathlib import Path
 from ultralytics import YOLO
 import torch
 
-def train_model():
+from tuning import auto_batch, auto_workers, available_cores, available_memory_mb, compute_threads
+
+RUN_DIR = Path('./models/droneaid')
+
+class EpochLog:
+    """
+    Appends one JSON line per epoch: wall time, training throughput, losses and validation metrics
+    
+    Lines carry a run id (the start time), so runs appended to the same file,
+    including resumed ones, can be told apart and compared.
+    """
+    
+    def __init__(self, path, **config):
+        self.path = Path(path)
+        self.run = time.strftime('%Y%m%d-%H%M%S')
+        self.config = config
+        self._epoch_start = self._train_end = None
+    
+    def attach(self, model):
+        model.add_callback('on_train_epoch_start', self.on_train_epoch_start)
+        model.add_callback('on_train_epoch_end', self.on_train_epoch_end)
+        model.add_callback('on_fit_epoch_end', self.on_fit_epoch_end)
+    
+    def on_train_epoch_start(self, trainer):
+        self._epoch_start = time.perf_counter()
+    
+    def on_train_epoch_end(self, trainer):
+        self._train_end = time.perf_counter()
+    
+    def on_fit_epoch_end(self, trainer):
+        # Runs after validation, once per epoch
+        if self._epoch_start is None:
+            return
+        now = time.perf_counter()
+        train_s = (self._train_end or now) - self._epoch_start
+        samples = len(trainer.train_loader.dataset)
+        record = {
+            "run": self.run,
+            "epoch": trainer.epoch + 1,
+            "epochs": trainer.epochs,
+            "wall_s": round(now - self._epoch_start, 2),
+            "train_s": round(train_s, 2),
+            "val_s": round(now - (self._train_end or now), 2),
+            "samples": samples,
+            "samples_per_s": round(samples / train_s, 2) if train_s else None,
+            "batch": trainer.batch_size,
+            "workers": trainer.args.workers,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            **self.config,
+            **({k: round(float(v), 5) for k, v in trainer.label_loss_items(trainer.tloss, prefix="train").items()}
+               if trainer.tloss is not None else {}),
+            **{k: round(float(v), 5) for k, v in (trainer.metrics or {}).items()},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self._epoch_start = self._train_end = None
+
+def resumable_checkpoint(run_dir=RUN_DIR):
+    """Path of the run's last.pt if it belongs to an unfinished run, else None"""
+    last = Path(run_dir) / 'weights' / 'last.pt'
+    if not last.exists():
+        return None
+    # Ultralytics strips the optimizer and sets epoch -1 once training completes
+    checkpoint = torch.load(last, map_location='cpu', weights_only=False)
+    if checkpoint.get('epoch', -1) < 0 or checkpoint.get('optimizer') is None:
+        return None
+    return last
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yolov8n.pt',
+                        help='Starting weights (yolov8n/s/m/l/x.pt; nano trains fastest)')
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=0, help='Batch size (default: from available memory)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Dataloader worker processes (default: from cores and memory)')
+    parser.add_argument('--device', default=None, help="'cpu', 'cuda' or a CUDA index (default: cuda if available)")
+    parser.add_argument('--patience', type=int, default=20, help='Early stopping patience (epochs)')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Start a new run even if an interrupted one can be resumed')
+    parser.add_argument('--stream', action='store_true', default=os.getenv('STREAM_DATASET', '0') == '1',
+                        help='Stream training samples instead of writing them (also STREAM_DATASET=1)')
+    parser.add_argument('--log', type=Path, default=RUN_DIR / 'epochs.jsonl', help='Per-epoch JSON lines log')
+    return parser.parse_args(argv)
+
+def train_model(args=None):
     """Train YOLOv8 model on DroneAid dataset"""
+    args = args or parse_args([])
     
     print("="*60)
     print("DroneAid 2026 - Model Training")
     print("="*60)
     
     # Check for GPU
-    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    device = args.device or ('cuda' if torch.cuda.is_available() else 'cpu')
+    device_type = 'cpu' if device == 'cpu' else 'cuda'
     print(f"\nUsing device: {device}")
-    if device == 'cuda':
+    if device_type == 'cuda':
         print(f"GPU: {torch.cuda.get_device_name(0)}")
     
-    # Prepare dataset first
+    # Size the run to this machine unless told otherwise
+    cores, memory_mb = available_cores(), available_memory_mb()
+    workers = args.workers if args.workers is not None else auto_workers(device_type, cores, memory_mb)
+    batch = args.batch or auto_batch(device_type, args.model, args.imgsz, workers, memory_mb)
+    threads = compute_threads(device_type, workers, cores) if device_type == 'cpu' else None
+    print(f"Cores: {cores}, available memory: {memory_mb:.0f} MB")
+    
+    # Prepare dataset first; when streaming (STREAM_DATASET=1) training samples are
+    # rendered on the fly by the dataloader workers and only the validation split is written
+    stream = args.stream
     print("\n[1/3] Preparing dataset...")
-    from prepare_data import main as prepare_dataset
-    prepare_dataset()
+    from prepare_data import main as prepare_dataset, scene_symbols
+    prepare_dataset(splits=('val',) if stream else ('train', 'val'))
+    
+    # Splits are read from their packed files (data/droneaid_dataset/packed) instead of one file per image
+    from streaming import SyntheticStream, make_trainer
+    source = None
+    if stream:
+        source = SyntheticStream(
+            './assets/icons', num_images_per_class=150,
+            num_scenes=int(os.getenv('DATA_SCENES', '400')),
+            symbols_per_scene=scene_symbols(),
+            seed=int(os.getenv('DATA_SEED', '0'))
+        )
+    # Samples per streamed epoch (default: as many as the on-disk training split holds)
+    trainer = make_trainer(source, epoch_size=int(os.getenv('STREAM_EPOCH_SIZE', '1280')),
+                           packed_dir='./data/droneaid_dataset/packed', workers=workers, threads=threads)
     
-    # Initialize YOLOv8 model
-    print("\n[2/3] Initializing YOLOv8 model...")
-    # Start with YOLOv8n (nano) for faster training, can use yolov8s/m/l for better accuracy
-    model = YOLO('yolov8n.pt')
+    # Initialize YOLOv8 model, or pick up an interrupted run where its last checkpoint left off
+    resume_from = None if args.fresh else resumable_checkpoint()
+    if resume_from:
+        print(f"\n[2/3] Resuming interrupted run from {resume_from}...")
+        model = YOLO(resume_from)
+    else:
+        print(f"\n[2/3] Initializing YOLOv8 model ({args.model})...")
+        model = YOLO(args.model)
     
     # Training parameters
     data_yaml = './data/droneaid_dataset/dataset.yaml'
-    epochs = 100
-    imgsz = 640
-    batch = 16  # Adjust based on available memory
+    epochs = args.epochs
+    imgsz = args.imgsz
     
     print("\n[3/3] Starting training...")
     print(f"  Epochs: {epochs}")
     print(f"  Image size: {imgsz}")
-    print(f"  Batch size: {batch}")
+    print(f"  Batch size: {'auto (GPU memory)' if batch == -1 else batch}")
+    print(f"  Workers: {workers}" + (f" (+{threads} compute threads)" if threads else ""))
     print(f"  Device: {device}")
+    print(f"  Training data: {'streamed' if stream else data_yaml}")
+    print(f"  Epoch log: {args.log}")
+    
+    EpochLog(args.log, device=device, imgsz=imgsz, stream=stream, resumed=bool(resume_from)).attach(model)
     
     # Train the model
+    # On resume Ultralytics restores the run's own settings, except image size, batch and device
     results = model.train(
+        trainer=trainer,
+        resume=bool(resume_from),
         data=data_yaml,
         epochs=epochs,
         imgsz=imgsz,
@@ -53,9 +185,9 @@ def train_model():
         project='./models',
         name='droneaid',
         exist_ok=True,
-        patience=20,  # Early stopping patience
+        patience=args.patience,  # Early stopping patience
         save=True,
-        plots=True,
+        plots=not stream,  # Label plots need the whole training set up front
         verbose=True,
         val=True,
         # Augmentation parameters
@@ -88,7 +220,7 @@ def train_model():
     print("Exporting model to ONNX format...")
     print("="*60)
     
-    best_model_path = Path('./models/droneaid/weights/best.pt')
+    best_model_path = RUN_DIR / 'weights' / 'best.pt'
     if best_model_path.exists():
         best_model = YOLO(best_model_path)
         onnx_path = best_model.export(format='onnx', imgsz=imgsz, simplify=True)
@@ -109,4 +241,4 @@ def train_model():
     return results
 
 if __name__ == '__main__':
-    train_model()
+    train_model(parse_args())
@@ -0,0 +1,80 @@
+"""
+DroneAid 2026 - Training Resource Tuning
+Picks batch size, dataloader workers and compute threads from the machine's RAM and cores
+"""
+
+import os
+from pathlib import Path
+
+# Approximate training memory per image at 640x640 (activations, gradients and
+# the batch itself, fp32), by YOLOv8 model size; scales with image area
+MB_PER_IMAGE_640 = {'n': 160, 's': 280, 'm': 520, 'l': 800, 'x': 1150}
+
+# Resident memory of the training process before the first batch (PyTorch, model, optimizer)
+BASE_MB = 1500
+
+# Memory per dataloader worker process (its copy-on-write pages and mosaic buffer)
+WORKER_MB = 400
+
+# Share of the available memory training may use
+MEMORY_FRACTION = 0.7
+
+BATCH_LIMITS = (1, 64)
+
+def available_memory_mb() -> float:
+    """Memory available to new allocations, from MemAvailable (falls back to free pages)"""
+    try:
+        for line in Path('/proc/meminfo').read_text().splitlines():
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+def available_cores() -> int:
+    """Cores this process may run on (honours CPU affinity and container cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def auto_workers(device: str, cores: int = None, memory_mb: float = None) -> int:
+    """
+    Dataloader worker processes
+    
+    On GPU the workers only have to keep up with the device, so up to one
+    per core. On CPU they compete with the model's compute threads, so a
+    quarter of the cores decode and augment (none below four cores). Either
+    way at most 8, and no more than a fifth of the available memory holds.
+    """
+    cores = cores or available_cores()
+    memory_mb = available_memory_mb() if memory_mb is None else memory_mb
+    workers = min(8, cores) if device != 'cpu' else (cores // 4 if cores >= 4 else 0)
+    return max(0, min(workers, int(memory_mb * 0.2 // WORKER_MB)))
+
+def auto_batch(device: str, model: str, imgsz: int, workers: int, memory_mb: float = None) -> int:
+    """
+    Training batch size
+    
+    On CUDA this returns -1, which lets Ultralytics' AutoBatch size the batch
+    to the GPU memory. On CPU the batch is the largest power of two whose
+    estimated memory (MB_PER_IMAGE_640 scaled to imgsz) fits in
+    MEMORY_FRACTION of the available RAM, after the process itself and its
+    dataloader workers.
+    """
+    if device == 'cuda':
+        return -1
+    memory_mb = available_memory_mb() if memory_mb is None else memory_mb
+    size = Path(model).stem.removeprefix('yolov8')[:1] or 'n'
+    per_image = MB_PER_IMAGE_640.get(size, MB_PER_IMAGE_640['n']) * (imgsz / 640) ** 2
+    budget = memory_mb * MEMORY_FRACTION - BASE_MB - workers * WORKER_MB
+    
+    batch = BATCH_LIMITS[0]
+    while batch * 2 <= BATCH_LIMITS[1] and batch * 2 * per_image <= budget:
+        batch *= 2
+    return batch
+
+def compute_threads(device: str, workers: int, cores: int = None) -> int:
+    """PyTorch intra-op threads for CPU training: the cores the dataloader workers leave free"""
+    cores = cores or available_cores()
+    return max(1, cores - workers) if device == 'cpu' else cores